@@ -0,0 +1,197 @@
+"""Request header parsing benchmarks
+
+Run from a checkout with ``python benchmarks/headers.py`` (with waitress
+importable, e.g. ``PYTHONPATH=src``).
+"""
+
+import time
+
+from waitress.adjustments import Adjustments
+from waitress.parser import HTTPRequestParser, header_key, header_keys, is_token
+from waitress.rfc7230 import FIELD_VALUE_BYTES, HEADER_FIELD_RE
+from waitress.task import environ_key, environ_keys
+
+# The headers of a page load by a browser, and of a call to a JSON API
+BROWSER_HEADERS = [
+    (b"Host", b"www.example.com"),
+    (b"Connection", b"keep-alive"),
+    (b"sec-ch-ua", b'"Chromium";v="118", "Google Chrome";v="118"'),
+    (b"sec-ch-ua-mobile", b"?0"),
+    (b"sec-ch-ua-platform", b'"Linux"'),
+    (b"Upgrade-Insecure-Requests", b"1"),
+    (
+        b"User-Agent",
+        b"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like "
+        b"Gecko) Chrome/118.0.0.0 Safari/537.36",
+    ),
+    (
+        b"Accept",
+        b"text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
+        b"image/webp,*/*;q=0.8",
+    ),
+    (b"Sec-Fetch-Site", b"same-origin"),
+    (b"Sec-Fetch-Mode", b"navigate"),
+    (b"Sec-Fetch-User", b"?1"),
+    (b"Sec-Fetch-Dest", b"document"),
+    (b"Referer", b"https://www.example.com/index.html"),
+    (b"Accept-Encoding", b"gzip, deflate, br"),
+    (b"Accept-Language", b"en-US,en;q=0.9,fr;q=0.8"),
+    (b"Cookie", b"session=5f2b8c0e9d1a4e7f; theme=dark; _ga=GA1.2.1234.5678"),
+]
+API_HEADERS = [
+    (b"Host", b"api.example.com"),
+    (b"User-Agent", b"python-requests/2.31.0"),
+    (b"Accept-Encoding", b"gzip, deflate"),
+    (b"Accept", b"application/json"),
+    (b"Connection", b"keep-alive"),
+    (b"Authorization", b"Bearer eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiIxMjM0In0.sig"),
+    (b"Content-Type", b"application/json"),
+    (b"Content-Length", b"0"),
+    (b"X-Request-Id", b"4b1c3f0e-8a2d-4c5e-9f7a-1d2e3f4a5b6c"),
+    (b"X-Forwarded-For", b"203.0.113.7"),
+    (b"X-Forwarded-Proto", b"https"),
+]
+HEADER_SETS = [("browser", BROWSER_HEADERS), ("API", API_HEADERS)]
+
+
+def make_request(headers):
+    lines = [b"GET /path?query=1 HTTP/1.1"]
+    lines.extend(name + b": " + value for name, value in headers)
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+def best_of(func, repeat=5):
+    """Return the shortest time ``func()`` took in ``repeat`` runs."""
+    best = None
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def bench_scan(sizes=(16384, 65536, 262144), piece=64):
+    """
+    Feed a header of each size to a parser in ``piece`` byte pieces, as a
+    slow client would send it. The time per KB stays the same up to
+    max_request_header_size when the search for its end is incremental.
+    """
+    print(f"header received in {piece} byte pieces")
+
+    for size in sizes:
+        # distinct names, so that the values aren't joined
+        lines = [
+            b"X-%06d: " % i + b"x" * (piece - 12) + b"\r\n"
+            for i in range(size // piece)
+        ]
+        pieces = [b"GET / HTTP/1.1\r\n"] + lines + [b"\r\n"]
+        adj = Adjustments(max_request_header_size=size * 2)
+
+        def run():
+            parser = HTTPRequestParser(adj)
+
+            for data in pieces:
+                parser.received(data)
+            assert parser.completed and parser.error is None
+
+        elapsed = best_of(run)
+        print(
+            f"  {size // 1024:4d}K: {elapsed:.4f}s"
+            f" ({elapsed * 1e6 / (size / 1024):.1f}us per KB)"
+        )
+
+
+def bench_keys(number=20000):
+    """
+    Translate the header names of each set to their environ keys, computing
+    them every time or looking them up in header_keys and environ_keys, and
+    parse the whole request for comparison.
+    """
+    print("header names to environ keys, per request")
+
+    for label, headers in HEADER_SETS:
+        names = [name for name, value in headers]
+
+        def computed():
+            for i in range(number):
+                for name in names:
+                    key = name.upper().replace(b"-", b"_").decode("latin-1")
+                    "HTTP_" + key
+
+        for name in names:
+            environ_key(header_key(name))
+
+        def cached():
+            for i in range(number):
+                for name in names:
+                    environ_keys.get(header_keys.get(name))
+
+        request = make_request(headers)
+        adj = Adjustments()
+
+        def parse():
+            for i in range(number):
+                HTTPRequestParser(adj).received(request)
+
+        print(f"  {label} ({len(names)} headers):")
+        for what, func in (("computed", computed), ("cached", cached)):
+            elapsed = best_of(func)
+            print(f"    {what:8s}: {elapsed * 1e6 / number:.2f}us")
+        elapsed = best_of(parse)
+        print(f"    {'parsed':8s}: {elapsed * 1e6 / number:.2f}us (whole request)")
+
+
+def bench_fields(number=20000):
+    """
+    Check the header fields of each set against the RFC 7230 rules, with
+    HEADER_FIELD_RE or with the character tables parse_header uses.
+    """
+    print("header fields checked, per request")
+
+    for label, headers in HEADER_SETS:
+        lines = [name + b": " + value for name, value in headers]
+        size = sum(len(line) for line in lines)
+
+        def regex():
+            for i in range(number):
+                for line in lines:
+                    header = HEADER_FIELD_RE.match(line)
+                    key, value = header.group("name", "value")
+                    value.strip(b" \t")
+
+        def tables():
+            for i in range(number):
+                for line in lines:
+                    key, colon, value = line.partition(b":")
+                    value = value.strip(b" \t")
+                    assert not (
+                        not colon
+                        or (key not in header_keys and not is_token(key))
+                        or value.translate(None, FIELD_VALUE_BYTES)
+                    )
+
+        for name, value in headers:
+            header_key(name)
+
+        print(f"  {label} ({len(lines)} headers, {size} bytes):")
+        for what, func in (("regex", regex), ("tables", tables)):
+            elapsed = best_of(func)
+            print(
+                f"    {what:8s}: {elapsed * 1e6 / number:.2f}us"
+                f" ({size * number / elapsed / 1e6:.0f}MB/s)"
+            )
+
+
+def main():
+    bench_scan()
+    bench_fields()
+    bench_keys()
+
+
+if __name__ == "__main__":
+    main()
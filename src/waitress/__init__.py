@@ -1,5 +1,6 @@
 import logging
 
+from waitress.prefork import serve_workers
 from waitress.server import create_server
 
 
@@ -7,9 +8,14 @@ def serve(app, **kw):
     _server = kw.pop("_server", create_server)  # test shim
     _quiet = kw.pop("_quiet", False)  # test shim
     _profile = kw.pop("_profile", False)  # test shim
+    _serve_workers = kw.pop("_serve_workers", serve_workers)  # test shim
     if not _quiet:  # pragma: no cover
         # idempotent if logging has already been set up
         logging.basicConfig()
+    if int(kw.get("workers") or 0):
+        # the master only supervises; every worker creates its own server
+        _serve_workers(lambda: app, _quiet=_quiet, **kw)
+        return
     server = _server(app, **kw)
     if not _quiet:  # pragma: no cover
         server.print_listen("Serving on http://{}:{}")
@@ -14,6 +14,7 @@
 """Adjustments are tunable parameters.
 """
 import getopt
+import os
 import socket
 import warnings
 
@@ -105,6 +106,10 @@ class Adjustments:
         ("ipv6", asbool),
         ("listen", aslist),
         ("threads", int),
+        ("event_loops", int),
+        ("workers", int),
+        ("worker_max_requests", int),
+        ("worker_max_memory", int),
         ("trusted_proxy", str_iftruthy),
         ("trusted_proxy_count", int),
         ("trusted_proxy_headers", asset),
@@ -113,21 +118,36 @@ class Adjustments:
         ("url_scheme", str),
         ("url_prefix", slash_fixed_str),
         ("backlog", int),
+        ("reuse_port", asbool),
+        ("tcp_defer_accept", int),
+        ("tcp_notsent_lowat", int),
+        ("tcp_quickack", asbool),
         ("recv_bytes", int),
         ("send_bytes", int),
         ("outbuf_overflow", int),
         ("outbuf_high_watermark", int),
         ("inbuf_overflow", int),
+        ("background_disk_io", asbool),
+        ("stream_request_body", asbool),
         ("connection_limit", int),
+        ("accept_budget", int),
         ("cleanup_interval", int),
         ("channel_timeout", int),
+        ("header_timeout", int),
+        ("body_timeout", int),
+        ("keepalive_timeout", int),
+        ("write_timeout", int),
         ("log_socket_errors", asbool),
         ("max_request_header_size", int),
+        ("lazy_headers", asbool),
         ("max_request_body_size", int),
         ("expose_tracebacks", asbool),
         ("ident", str_iftruthy),
+        ("backend", str),
         ("asyncore_loop_timeout", int),
         ("asyncore_use_poll", asbool),
+        ("asyncore_use_selector", asbool),
+        ("asyncio_use_uvloop", asbool),
         ("unix_socket", str),
         ("unix_socket_perms", asoctal),
         ("sockets", as_socket_list),
@@ -148,6 +168,22 @@ class Adjustments:
     # number of threads available for tasks
     threads = 4
 
+    # number of threads running a main loop (accepting, reading, parsing and
+    # flushing); accepted connections are spread across them
+    event_loops = 1
+
+    # number of processes forked by a master process to serve requests on
+    # the sockets it has bound; 0 serves from this process alone
+    workers = 0
+
+    # recycle a worker process once it has served this many requests (0
+    # means never)
+    worker_max_requests = 0
+
+    # recycle a worker process once its resident memory exceeds this many
+    # bytes (0 means never)
+    worker_max_memory = 0
+
     # Host allowed to overrid ``wsgi.url_scheme`` via header
     trusted_proxy = None
 
@@ -198,6 +234,24 @@ class Adjustments:
     # reattempt at connection succeeds."
     backlog = 1024
 
+    # set SO_REUSEPORT on the listening TCP sockets; when running several
+    # workers each one binds its own socket and the kernel balances
+    # connections between them
+    reuse_port = False
+
+    # set TCP_DEFER_ACCEPT to this many seconds on the listening TCP sockets,
+    # so that a connection is only accepted once the client sent data (0 to
+    # not set it)
+    tcp_defer_accept = 0
+
+    # set TCP_NOTSENT_LOWAT to this many bytes on accepted TCP connections,
+    # limiting how much unsent data the kernel buffers for each of them (0 to
+    # not set it)
+    tcp_notsent_lowat = 0
+
+    # set TCP_QUICKACK on accepted TCP connections
+    tcp_quickack = False
+
     # recv_bytes is the argument to pass to socket.recv().
     recv_bytes = 8192
 
@@ -219,6 +273,15 @@ class Adjustments:
     # is conservative.
     inbuf_overflow = 524288
 
+    # Write the output and input that overflowed to a tempfile, and read the
+    # output back, on a separate thread instead of the main loop's.
+    background_disk_io = False
+
+    # Start servicing a request once its headers are received, letting the
+    # application read the body from wsgi.input while it is received. At most
+    # inbuf_overflow bytes of it are buffered.
+    stream_request_body = False
+
     # Stop creating new channels if too many are already active (integer).
     # Each channel consumes at least one file descriptor, and, depending on
     # the input and output body sizes, potentially up to three.  The default
@@ -230,18 +293,44 @@ class Adjustments:
     # that.
     connection_limit = 100
 
-    # Minimum seconds between cleaning up inactive channels.
+    # Maximum number of connections to accept each time the main loop finds
+    # a listening socket readable.
+    accept_budget = 64
+
+    # No longer used: inactive channels are now closed as soon as they time
+    # out rather than by a periodic cleanup.
     cleanup_interval = 30
 
     # Maximum seconds to leave an inactive connection open.
     channel_timeout = 120
 
+    # Maximum seconds a client may take to send the headers of a request,
+    # counted from the first byte of the request (0 means channel_timeout).
+    header_timeout = 0
+
+    # Maximum seconds to wait for more of a request body (0 means
+    # channel_timeout).
+    body_timeout = 0
+
+    # Maximum seconds to keep an idle connection open between requests (0
+    # means channel_timeout).
+    keepalive_timeout = 0
+
+    # Maximum seconds to wait for a client to read more of a response before
+    # giving up on it (0 means channel_timeout).
+    write_timeout = 0
+
     # Boolean: turn off to not log premature client disconnects.
     log_socket_errors = True
 
     # maximum number of bytes of all request headers combined (256K default)
     max_request_header_size = 262144
 
+    # check the request headers in one pass over the header block and only
+    # decode the value of a header when it is looked up, instead of those of
+    # every header while parsing the request
+    lazy_headers = False
+
     # maximum number of bytes in request body (1GB default)
     max_request_body_size = 1073741824
 
@@ -261,12 +350,24 @@ class Adjustments:
         (socket.SOL_TCP, socket.TCP_NODELAY, 1),
     ]
 
+    # The main loop implementation: "asyncore" (waitress' own loop, which the
+    # asyncore_* settings apply to) or "asyncio"
+    backend = "asyncore"
+
     # The asyncore.loop timeout value
     asyncore_loop_timeout = 1
 
     # The asyncore.loop flag to use poll() instead of the default select().
     asyncore_use_poll = False
 
+    # The asyncore.loop flag to use a persistent selectors-based poller (epoll
+    # on Linux, kqueue on BSD/macOS) instead of select() or poll(). Takes
+    # precedence over asyncore_use_poll.
+    asyncore_use_selector = False
+
+    # Run the asyncio backend on uvloop's event loop (requires uvloop)
+    asyncio_use_uvloop = False
+
     # Enable IPv4 by default
     ipv4 = True
 
@@ -318,6 +419,37 @@ class Adjustments:
                 raise ValueError("Unknown adjustment %r" % k)
             setattr(self, k, self._param_map[k](v))
 
+        if self.event_loops < 1:
+            raise ValueError("event_loops must be at least 1")
+
+        if self.backend not in ("asyncore", "asyncio"):
+            raise ValueError('backend must be either "asyncore" or "asyncio"')
+
+        if self.accept_budget < 1:
+            raise ValueError("accept_budget must be at least 1")
+
+        if self.workers < 0:
+            raise ValueError("workers may not be negative")
+
+        if self.workers and not hasattr(os, "fork"):
+            raise ValueError("workers is not supported on this platform")
+
+        if self.reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("reuse_port is not supported on this platform")
+
+        for name, optname in (
+            ("tcp_defer_accept", "TCP_DEFER_ACCEPT"),
+            ("tcp_notsent_lowat", "TCP_NOTSENT_LOWAT"),
+            ("tcp_quickack", "TCP_QUICKACK"),
+        ):
+            if getattr(self, name) and not hasattr(socket, optname):
+                raise ValueError("%s is not supported on this platform" % name)
+
+        if self.tcp_defer_accept < 0 or self.tcp_notsent_lowat < 0:
+            raise ValueError(
+                "tcp_defer_accept and tcp_notsent_lowat may not be negative"
+            )
+
         if not isinstance(self.host, _str_marker) or not isinstance(
             self.port, _int_marker
         ):
@@ -450,7 +582,7 @@ class Adjustments:
         dictionary suitable for passing into __init__, where __init__ does the
         casting.
         """
-        long_opts = ["help", "call"]
+        long_opts = ["help", "call", "preload", "no-preload"]
         for opt, cast in cls._params:
             opt = opt.replace("_", "-")
             if cast is asbool:
@@ -462,6 +594,7 @@ class Adjustments:
         kw = {
             "help": False,
             "call": False,
+            "preload": True,
         }
 
         opts, args = getopt.getopt(argv, "", long_opts)
@@ -475,7 +608,7 @@ class Adjustments:
             if param.startswith("no_"):
                 param = param[3:]
                 kw[param] = "false"
-            elif param in ("help", "call"):
+            elif param in ("help", "call", "preload"):
                 kw[param] = True
             elif cls._param_map[param] is asbool:
                 kw[param] = "true"
@@ -0,0 +1,488 @@
+##############################################################################
+#
+# Copyright (c) 2024 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""A server running on an asyncio event loop instead of wasyncore.
+
+Requests are parsed by the same ``HTTPRequestParser`` and run by the same
+``WSGITask`` on a ``ThreadedTaskDispatcher`` as with the default server.
+Output written by the tasks is handed to the event loop with
+``loop.call_soon_threadsafe`` and buffered by the asyncio transport.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+
+from waitress.adjustments import Adjustments
+from waitress.buffers import ReadOnlyFileBasedBuffer
+from waitress.channel import ClientDisconnected, HTTPChannel
+from waitress.parser import HTTPRequestParser
+from waitress.task import ErrorTask, ThreadedTaskDispatcher, WSGITask
+from waitress.timers import TimerWheel
+from waitress.utilities import bind_sockets, lazy_attribute, logger
+
+from .proxy_headers import proxy_headers_middleware
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+
+class AsyncioHTTPChannel(asyncio.Protocol):
+    """The asyncio counterpart of ``HTTPChannel``.
+
+    The methods that run in task threads (``write_soon``, ``service``, ...)
+    keep the semantics of ``HTTPChannel``; the protocol callbacks run in the
+    event loop's thread.
+    """
+
+    task_class = WSGITask
+    error_task_class = ErrorTask
+    parser_class = HTTPRequestParser
+    logger = logger
+
+    transport = None
+    addr = None
+    connected = False
+    # A request that has not been received yet completely is stored here
+    request = None
+    # With stream_request_body, the request whose body is still being
+    # received while it is queued or being serviced (it is also self.request)
+    streaming_request = None
+    # The part of the WSGI environ that is the same for every request on this
+    # channel, set up by the first task
+    environ_template = None
+    last_activity = 0  # Time of last activity
+    request_started = 0  # Time the request being received was started
+    output_started = 0  # Time output was queued with none pending
+    will_close = False  # set to True to close the transport.
+    close_when_flushed = False  # set to True to close the transport when flushed
+    sent_continue = False  # used as a latch after sending 100 continue
+    total_outbufs_len = 0  # bytes written by tasks not yet given to transport
+    current_outbuf_count = 0  # only used by service()
+    reading_paused = False
+    writing_paused = False
+    flush_scheduled = False
+    watching_drain = False  # _watch_drain() is scheduled
+
+    # requests_lock used to push/pop requests and modify the request that
+    # is currently being created
+    requests_lock = lazy_attribute(threading.Lock)
+    # outbuf_lock guards outbufs and the writing flow control state
+    outbuf_lock = lazy_attribute(threading.Condition)
+
+    def __init__(self, server, adj, loop):
+        self.server = server
+        self.adj = adj
+        self.loop = loop
+        self.creation_time = self.last_activity = time.time()
+        self.outbufs = []
+        self.requests = []
+
+    #
+    # ASYNCHRONOUS METHODS (called in the event loop's thread)
+    #
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # the transport calls pause_writing() once it buffers more than this
+        transport.set_write_buffer_limits(high=self.adj.outbuf_high_watermark)
+        self.addr = self.server.fix_addr(transport.get_extra_info("peername"))
+        self.connected = True
+        self.server.active_channels[id(self)] = self
+        self.arm_timeout()
+
+    def connection_lost(self, exc):
+        self._abort_streaming_request()
+
+        with self.outbuf_lock:
+            self.connected = False
+            self.outbufs = []
+            self.total_outbufs_len = 0
+            self.outbuf_lock.notify_all()
+        self.server.active_channels.pop(id(self), None)
+        self.server.timers.cancel(self)
+
+    def data_received(self, data):
+        self.last_activity = time.time()
+        self.received(data)
+        streaming_request = self.streaming_request
+        if streaming_request is not None:
+            # keep reading the body the task reads as long as there is room
+            if streaming_request.body_stream.full():
+                self._pause_reading()
+        elif len(self.requests) > self.adj.channel_request_lookahead:
+            self._pause_reading()
+        elif self._body_full():
+            # until the DiskIO thread caught up with writing the body
+            self._pause_reading()
+
+    def eof_received(self):
+        # Client disconnected; returning a false value closes the transport.
+        self.connected = False
+        self._abort_streaming_request()
+
+    def pause_writing(self):
+        with self.outbuf_lock:
+            self.writing_paused = True
+
+    def resume_writing(self):
+        with self.outbuf_lock:
+            # the client is reading what the transport buffered
+            self.last_activity = time.time()
+            self.writing_paused = False
+            self.outbuf_lock.notify_all()
+
+    # Receives input and assigns one or more requests to the channel, exactly
+    # like HTTPChannel does.
+    received = HTTPChannel.received
+    _queue_request = HTTPChannel._queue_request
+    _abort_streaming_request = HTTPChannel._abort_streaming_request
+
+    def send_continue(self):
+        """
+        Send a 100-Continue header to the client. Called from ``received``
+        (in the event loop's thread) or at the end of ``service`` (in a task
+        thread).
+        """
+        self.request.expect_continue = False
+        self.sent_continue = True
+        self._queue_output(b"HTTP/1.1 100 Continue\r\n\r\n")
+        self.request.completed = False
+
+    def timeout_deadline(self):
+        if (
+            not self.total_outbufs_len
+            and self.transport is not None
+            and self.transport.get_write_buffer_size()
+        ):
+            # waiting for the client to read what the transport buffered
+            timeout = self.adj.write_timeout or self.adj.channel_timeout
+
+            return max(self.last_activity, self.output_started) + timeout
+
+        return HTTPChannel.timeout_deadline(self)
+
+    arm_timeout = HTTPChannel.arm_timeout
+
+    def mark_dirty(self):
+        # asyncio tracks the readiness of the transport's socket itself
+        pass
+
+    def _flush(self):
+        with self.outbuf_lock:
+            outbufs, self.outbufs = self.outbufs, []
+            self.total_outbufs_len = 0
+            self.flush_scheduled = False
+            if outbufs and self.connected and not self.transport.is_closing():
+                # a single send for everything the tasks wrote since the last
+                # time around the event loop
+                self.transport.writelines(outbufs)
+                self.last_activity = time.time()
+                self.arm_timeout()
+                if not self.watching_drain and self.transport.get_write_buffer_size():
+                    self.watching_drain = True
+                    self.loop.call_later(
+                        self.server.timers.resolution, self._watch_drain
+                    )
+            self.outbuf_lock.notify_all()
+
+    def _watch_drain(self):
+        # the transport doesn't tell when it has sent all that it buffered;
+        # look again until it has, and then re-arm the timer, as the channel
+        # may now time out sooner (after keepalive_timeout rather than
+        # write_timeout)
+        transport = self.transport
+        if transport.is_closing():
+            self.watching_drain = False
+        elif transport.get_write_buffer_size():
+            self.loop.call_later(self.server.timers.resolution, self._watch_drain)
+        else:
+            self.watching_drain = False
+            self.last_activity = time.time()
+            self.arm_timeout()
+
+    def _serviced(self):
+        # a task has finished servicing a request
+        if self.will_close or self.close_when_flushed:
+            # the transport writes out what it has buffered before closing
+            self.transport.close()
+        elif (
+            self.reading_paused
+            and self.streaming_request is None
+            and len(self.requests) <= self.adj.channel_request_lookahead
+            and not self._body_full()
+        ):
+            self.reading_paused = False
+            self.transport.resume_reading()
+
+    def _drained(self):
+        # the task made room in the body of the streaming request, or the
+        # DiskIO thread caught up with writing the body of the request being
+        # received
+        if not self.reading_paused or self.transport.is_closing():
+            return
+        streaming_request = self.streaming_request
+        if streaming_request is not None:
+            if streaming_request.body_stream.full():
+                return
+        elif len(self.requests) > self.adj.channel_request_lookahead:
+            return
+        elif self._body_full():
+            return
+        self.reading_paused = False
+        self.transport.resume_reading()
+
+    def _body_full(self):
+        request = self.request
+        return request is not None and request.body_full()
+
+    def _pause_reading(self):
+        if not self.reading_paused and not self.transport.is_closing():
+            self.reading_paused = True
+            self.transport.pause_reading()
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    def abort(self):
+        if self.transport is not None:
+            self.transport.abort()
+
+    #
+    # SYNCHRONOUS METHODS (called in task threads)
+    #
+
+    check_client_disconnected = HTTPChannel.check_client_disconnected
+
+    def _queue_output(self, data):
+        with self.outbuf_lock:
+            self.outbufs.append(data)
+            self.total_outbufs_len += len(data)
+            if not self.flush_scheduled:
+                self.flush_scheduled = True
+                self.loop.call_soon_threadsafe(self._flush)
+
+    def _body_drained(self):
+        # called from a task thread once it made room in the body of the
+        # streaming request, or from the DiskIO thread once it caught up with
+        # writing the body of the request being received
+        self.arm_timeout()
+        self.loop.call_soon_threadsafe(self._drained)
+
+    def pull_trigger(self):
+        """Tell the event loop a request has been serviced."""
+        self.loop.call_soon_threadsafe(self._serviced)
+
+    def write_soon(self, data):
+        if not self.connected:
+            # if the socket is closed then interrupt the task so that it
+            # can cleanup possibly before the app_iter is exhausted
+            raise ClientDisconnected
+
+        if data.__class__ is ReadOnlyFileBasedBuffer:
+            # they used wsgi.file_wrapper; read the file in this thread
+            # rather than the event loop's, and close it like HTTPChannel
+            # does once it has been sent
+            num_bytes = 0
+            try:
+                while True:
+                    chunk = data.get(data.block_size, skip=True)
+                    if not chunk:
+                        break
+                    num_bytes += self.write_soon(chunk)
+            finally:
+                data.close()
+            return num_bytes
+
+        if data:
+            # the event loop may be handing our output to the transport; we
+            # can block here waiting for it because we're in a task thread
+            with self.outbuf_lock:
+                self._flush_outbufs_below_high_watermark()
+
+                if not self.connected:
+                    raise ClientDisconnected
+                if not self.total_outbufs_len:
+                    self.output_started = time.time()
+                self._queue_output(data)
+                self.arm_timeout()
+
+            return len(data)
+
+        return 0
+
+    def _flush_outbufs_below_high_watermark(self):
+        with self.outbuf_lock:
+            while self.connected and (
+                self.writing_paused
+                or self.total_outbufs_len > self.adj.outbuf_high_watermark
+            ):
+                self.outbuf_lock.wait()
+
+    # Execute one request. If there are more, we add another task to the
+    # server at the end, exactly like HTTPChannel does.
+    service = HTTPChannel.service
+
+    def cancel(self):
+        """Cancels all pending / active requests"""
+        self.will_close = True
+        self.connected = False
+        self.last_activity = time.time()
+        self.requests = []
+        self.loop.call_soon_threadsafe(self.close)
+
+
+class AsyncioWSGIServer:
+    """A WSGI server running on an asyncio event loop (or uvloop's, if
+    ``asyncio_use_uvloop`` is set)."""
+
+    channel_class = AsyncioHTTPChannel
+    logger = logger
+    # The part of the WSGI environ that is the same for every request to this
+    # server, set up by the first task
+    environ_template = None
+
+    def __init__(
+        self,
+        application,
+        _start=True,  # test shim
+        dispatcher=None,  # dispatcher
+        adj=None,  # adjustments
+        **kw
+    ):
+        if adj is None:
+            adj = Adjustments(**kw)
+
+        if adj.trusted_proxy or adj.clear_untrusted_proxy_headers:
+            # wrap the application to deal with proxy headers
+            application = proxy_headers_middleware(
+                application,
+                trusted_proxy=adj.trusted_proxy,
+                trusted_proxy_count=adj.trusted_proxy_count,
+                trusted_proxy_headers=adj.trusted_proxy_headers,
+                clear_untrusted=adj.clear_untrusted_proxy_headers,
+                log_untrusted=adj.log_untrusted_proxy_headers,
+                logger=self.logger,
+            )
+
+        if adj.asyncio_use_uvloop:
+            if uvloop is None:
+                raise ValueError("asyncio_use_uvloop requires uvloop to be installed")
+            self.loop = uvloop.new_event_loop()
+        else:
+            self.loop = asyncio.new_event_loop()
+
+        self.application = application
+        self.adj = adj
+        self.server_name = adj.server_name
+        if dispatcher is None:
+            dispatcher = ThreadedTaskDispatcher()
+            dispatcher.set_thread_count(self.adj.threads)
+        self.task_dispatcher = dispatcher
+        self.active_channels = {}
+        self.timers = TimerWheel()
+        self.servers = []
+
+        self.sockets = bind_sockets(adj)
+        self.effective_listen = [self.getsockname(sock) for sock in self.sockets]
+        self.effective_host, self.effective_port = self.effective_listen[0]
+
+        if _start:
+            self.accept_connections()
+
+    def getsockname(self, sock):
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            # Return the IP address, port as numeric
+            return socket.getnameinfo(
+                sock.getsockname(), socket.NI_NUMERICHOST | socket.NI_NUMERICSERV
+            )
+        return ("unix", sock.getsockname())
+
+    def fix_addr(self, addr):
+        if isinstance(addr, tuple):
+            return addr[:2]
+        # AF_UNIX peers have no useful address
+        return ("localhost", None)
+
+    def accept_connections(self):
+        for sock in self.sockets:
+            if sock.family in (socket.AF_INET, socket.AF_INET6):
+                create = self.loop.create_server
+            else:
+                create = self.loop.create_unix_server
+            self.servers.append(
+                self.loop.run_until_complete(
+                    create(self.make_channel, sock=sock, backlog=self.adj.backlog)
+                )
+            )
+
+    def stop_accepting(self):
+        for server in self.servers:
+            server.close()
+        self.servers = []
+
+    def make_channel(self):
+        return self.channel_class(self, self.adj, self.loop)
+
+    def add_task(self, task):
+        self.task_dispatcher.add_task(task)
+
+    def maintenance(self):
+        """
+        Closes channels whose timer in ``self.timers`` has expired, like
+        ``BaseWSGIServer.maintenance`` does.
+        """
+        now = time.time()
+        for channel in self.timers.expire(now):
+            deadline = channel.timeout_deadline()
+            if deadline is None:
+                continue
+            if deadline > now:
+                self.timers.schedule(channel, deadline)
+                continue
+            channel.will_close = True
+            # don't wait for the client to read what the transport buffered
+            channel.abort()
+        self.loop.call_later(self.timers.resolution, self.maintenance)
+
+    def run(self):
+        self.loop.call_later(self.timers.resolution, self.maintenance)
+        try:
+            self.loop.run_forever()
+        except (SystemExit, KeyboardInterrupt):
+            self.task_dispatcher.shutdown()
+            self.close()
+
+    def print_listen(self, format_str):  # pragma: no cover
+        for l in self.effective_listen:
+            l = list(l)
+
+            if ":" in l[0]:
+                l[0] = f"[{l[0]}]"
+
+            self.logger.info(format_str.format(*l))
+
+    def close(self):
+        self.stop_accepting()
+        for channel in list(self.active_channels.values()):
+            channel.close()
+        if not self.loop.is_closed():
+            # let the transports finish closing
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+        for sock in self.sockets:
+            sock.close()
@@ -13,7 +13,17 @@
 ##############################################################################
 """Buffers
 """
+from collections import deque
+import io
 from io import BytesIO
+import itertools
+import mmap
+import os
+import stat
+import sys
+import threading
+
+from waitress.utilities import logger
 
 # copy_bytes controls the size of temp. strings for shuffling data around.
 COPY_BYTES = 1 << 18  # 256K
@@ -129,15 +139,423 @@ class BytesIOBasedBuffer(FileBasedBuffer):
         return BytesIO()
 
 
+class PositionalTempfileBasedBuffer:
+    """
+    A buffer backed by a temporary file that keeps its own read and write
+    offsets and uses os.pread() and os.pwrite() on the file's descriptor, so
+    that appending, getting and skipping data never seek. Only available
+    where the os module has pread() and pwrite().
+    """
+
+    reader = None  # the buffered file returned by getfile(), once called
+
+    def __init__(self, from_buffer=None):
+        self.file = self.newfile()
+        self.fileno = self.file.fileno()
+        self.read_pos = self.write_pos = 0
+        if from_buffer is not None:
+            from_file = from_buffer.getfile()
+            read_pos = from_file.tell()
+            from_file.seek(0)
+            while True:
+                data = from_file.read(COPY_BYTES)
+                if not data:
+                    break
+                self.append(data)
+            self.read_pos = read_pos
+            from_file.seek(read_pos)
+
+    def newfile(self):
+        from tempfile import TemporaryFile
+
+        # unbuffered, there is nothing to flush before a pread()
+        return TemporaryFile("w+b", buffering=0)
+
+    @property
+    def remain(self):
+        return self.write_pos - self.read_pos
+
+    def __len__(self):
+        return self.write_pos - self.read_pos
+
+    def __bool__(self):
+        return True
+
+    def append(self, s):
+        fileno = self.fileno
+        pos = self.write_pos
+        end = pos + len(s)
+        while pos < end:
+            written = os.pwrite(fileno, s, pos)
+            pos += written
+            if pos < end:
+                s = memoryview(s)[written:]
+        self.write_pos = end
+
+    def get(self, numbytes=-1, skip=False):
+        remain = self.write_pos - self.read_pos
+        if numbytes < 0 or numbytes > remain:
+            numbytes = remain
+        if not numbytes:
+            return b""
+        res = os.pread(self.fileno, numbytes, self.read_pos)
+        if skip:
+            self.read_pos += len(res)
+        return res
+
+    def skip(self, numbytes, allow_prune=0):
+        remain = self.write_pos - self.read_pos
+        if remain < numbytes:
+            raise ValueError(
+                "Can't skip %d bytes in buffer of %d bytes" % (numbytes, remain)
+            )
+        self.read_pos += numbytes
+
+    def prune(self):
+        if self.reader is not None or not self.write_pos:
+            return
+        if self.read_pos == self.write_pos:
+            # everything was read, start over at the beginning of the file
+            os.ftruncate(self.fileno, 0)
+            self.read_pos = self.write_pos = 0
+            return
+        oldfile = self.file
+        oldfileno = self.fileno
+        read_pos = self.read_pos
+        write_pos = self.write_pos
+        self.file = self.newfile()
+        self.fileno = self.file.fileno()
+        self.read_pos = self.write_pos = 0
+        while read_pos < write_pos:
+            data = os.pread(oldfileno, min(COPY_BYTES, write_pos - read_pos), read_pos)
+            if not data:
+                break
+            self.append(data)
+            read_pos += len(data)
+        oldfile.close()
+
+    def getfile(self):
+        # a buffered file positioned at the read offset, for wsgi.input
+        reader = self.reader
+        if reader is None:
+            self.file.seek(self.read_pos)
+            reader = self.reader = io.BufferedReader(self.file)
+        return reader
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+        self.file.close()
+        self.read_pos = self.write_pos = 0
+
+
+if hasattr(os, "pread") and hasattr(os, "pwrite"):
+    # the buffer that in-memory buffers overflow to
+    DiskBuffer = PositionalTempfileBasedBuffer
+else:  # pragma: no cover
+    DiskBuffer = TempfileBasedBuffer
+
+
+class DiskIO:
+    """
+    A thread running the file I/O of BackgroundDiskBuffer instances, in the
+    order it was submitted. The thread is started the first time a job is
+    submitted, and again if it isn't running anymore (e.g. after a fork).
+    """
+
+    thread = None
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.jobs = deque()
+
+    def submit(self, job):
+        with self.lock:
+            self.jobs.append(job)
+            thread = self.thread
+            if thread is None or not thread.is_alive():
+                thread = self.thread = threading.Thread(
+                    target=self.run, name="waitress-disk-io", daemon=True
+                )
+                thread.start()
+            self.lock.notify()
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.jobs:
+                    self.lock.wait()
+                job = self.jobs.popleft()
+            try:
+                job()
+            except Exception:
+                logger.exception("Exception in disk I/O")
+
+
+# the DiskIO used by the buffers created with background=True
+disk_io = DiskIO()
+
+
+class BackgroundDiskBuffer:
+    """
+    A DiskBuffer whose file is only read and written by a DiskIO thread.
+
+    Data appended to it is queued in memory for the thread to write, and
+    get() only returns data the thread has already read back into memory:
+    once get() or ready() has been called, the thread keeps up to
+    ``2 * prefetch_bytes`` read ahead. When ready() returns False,
+    ``on_ready`` is called from the thread as soon as there is data to get.
+    getfile() waits for the queued data to be written, it must not be used
+    once data has been read ahead. append() never waits for the thread: once
+    it fell ``backlog`` bytes behind, full() returns True and ``on_drained``
+    is called from the thread when it caught up.
+    """
+
+    prefetch_bytes = COPY_BYTES
+    buf = None  # the DiskBuffer, created by the thread
+    error = None  # the OSError the thread failed with, if any
+    scheduled = False  # a job is queued or running
+    reading = False  # data is read ahead for get()
+    wanted = False  # ready() or get() found nothing to return
+    drain_wanted = False  # full() returned True
+    closed = False
+
+    def __init__(self, io, backlog, on_ready=None, on_drained=None):
+        self.io = io
+        self.backlog = backlog
+        self.on_ready = on_ready
+        self.on_drained = on_drained
+        self.lock = threading.Condition()
+        self.pending = deque()  # appended, not written yet
+        self.pending_len = 0
+        self.prefetched = deque()  # read back from the file
+        self.prefetched_len = 0
+        self.offset = 0  # bytes of prefetched[0] that were already skipped
+        self.remain = 0
+
+    def __len__(self):
+        return self.remain
+
+    def __bool__(self):
+        return True
+
+    def append(self, s):
+        if not s:
+            return
+        if s.__class__ is not bytes:
+            s = bytes(s)
+        with self.lock:
+            self._check_error()
+            self.pending.append(s)
+            self.pending_len += len(s)
+            self.remain += len(s)
+            self._schedule()
+
+    def full(self):
+        """
+        Return True if the thread is ``backlog`` bytes or more behind writing
+        what was appended. If so, ``on_drained`` will be called once it isn't.
+        """
+        with self.lock:
+            if self.pending_len >= self.backlog:
+                self.drain_wanted = True
+                return True
+            return False
+
+    def ready(self):
+        """
+        Return True if get() has data to return. If not, ``on_ready`` will be
+        called once it has.
+        """
+        with self.lock:
+            return self._ready()
+
+    def _ready(self):
+        self._check_error()
+        self.reading = True
+        if self.prefetched_len:
+            return True
+        self.wanted = True
+        if self.remain:
+            self._schedule()
+        return False
+
+    def get(self, numbytes=-1, skip=False):
+        with self.lock:
+            if not self._ready():
+                return b""
+            first = self.prefetched[0]
+            start = self.offset
+            available = len(first) - start
+            if numbytes < 0 or numbytes > available:
+                numbytes = available
+            if start or numbytes < len(first):
+                res = memoryview(first)[start : start + numbytes]
+            else:
+                res = first
+            if skip:
+                self._skip(numbytes)
+            return res
+
+    def skip(self, numbytes, allow_prune=False):
+        with self.lock:
+            if self.prefetched_len < numbytes:
+                raise ValueError(
+                    "Can't skip %d bytes in buffer of %d bytes"
+                    % (numbytes, self.prefetched_len)
+                )
+            self._skip(numbytes)
+
+    def _skip(self, numbytes):
+        self.remain -= numbytes
+        self.prefetched_len -= numbytes
+        prefetched = self.prefetched
+        offset = self.offset + numbytes
+        while prefetched and offset >= len(prefetched[0]):
+            offset -= len(prefetched.popleft())
+        self.offset = offset
+        if self.remain > self.prefetched_len:
+            # read ahead what was made room for
+            self._schedule()
+
+    def _schedule(self):
+        if not self.scheduled:
+            self.scheduled = True
+            self.io.submit(self._work)
+
+    def _check_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def _work(self):
+        # Runs on the DiskIO thread: write what was appended, then read ahead
+        # what get() will need.
+        callback = drained = None
+        while True:
+            with self.lock:
+                buf = self.buf
+                if self.closed or self.error is not None:
+                    self._stop()
+                    if buf is not None:
+                        self.buf = None
+                        buf.close()
+                    break
+                if self.pending:
+                    if len(self.pending) == 1:
+                        data = self.pending[0]
+                    else:
+                        data = b"".join(self.pending)
+                    self.pending.clear()
+                    write = True
+                elif (
+                    self.reading
+                    and self.remain > self.prefetched_len
+                    and self.prefetched_len < 2 * self.prefetch_bytes
+                ):
+                    write = False
+                else:
+                    self._stop()
+                    if self.wanted and self.prefetched_len:
+                        self.wanted = False
+                        callback = self.on_ready
+                    break
+            try:
+                if buf is None:
+                    buf = self.buf = DiskBuffer()
+                if write:
+                    buf.append(data)
+                else:
+                    data = buf.get(self.prefetch_bytes, skip=True)
+            except OSError as why:
+                with self.lock:
+                    self.error = why
+                    self._stop()
+                    callback = self.on_ready
+                    if self.drain_wanted:
+                        # append() raises the error
+                        self.drain_wanted = False
+                        drained = self.on_drained
+                break
+            with self.lock:
+                if self.closed:
+                    continue
+                if write:
+                    self.pending_len -= len(data)
+                    if self.drain_wanted and self.pending_len < self.backlog:
+                        self.drain_wanted = False
+                        drained = self.on_drained
+                else:
+                    self.prefetched.append(data)
+                    self.prefetched_len += len(data)
+            if drained is not None:
+                # don't keep the reader waiting for the rest
+                drained()
+                drained = None
+        if drained is not None:
+            drained()
+        if callback is not None:
+            callback()
+
+    def _stop(self):
+        self.scheduled = False
+        self.lock.notify_all()
+
+    def prune(self):
+        # the file is pruned when the buffer is closed
+        pass
+
+    def getfile(self):
+        with self.lock:
+            while self.scheduled:
+                self.lock.wait()
+            self._check_error()
+            if self.buf is None:
+                self.buf = DiskBuffer()
+            return self.buf.getfile()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.pending.clear()
+            self.prefetched.clear()
+            self.pending_len = self.prefetched_len = self.remain = 0
+            if not self.scheduled and self.buf is not None:
+                # otherwise the thread closes it when it's done with it
+                self.buf.close()
+                self.buf = None
+
+
 def _is_seekable(fp):
     if hasattr(fp, "seekable"):
         return fp.seekable()
     return hasattr(fp, "seek") and hasattr(fp, "tell")
 
 
+def _sendfile_fileno(fp):
+    # The file descriptor to send fp from with os.sendfile, if it is a plain
+    # binary file object reading a regular file; wrappers that change the
+    # data they read (e.g. gzip.GzipFile) may still have a fileno().
+    if not hasattr(os, "sendfile"):  # pragma: no cover
+        return None
+    raw = fp
+    if fp.__class__ in (io.BufferedReader, io.BufferedRandom):
+        raw = fp.raw
+    if raw.__class__ is not io.FileIO:
+        return None
+    try:
+        fileno = raw.fileno()
+        if not stat.S_ISREG(os.fstat(fileno).st_mode):
+            return None
+    except (OSError, ValueError):
+        return None
+    return fileno
+
+
 class ReadOnlyFileBasedBuffer(FileBasedBuffer):
     # used as wsgi.file_wrapper
 
+    fileno = None  # set by prepare() if the file can be sent with os.sendfile
+
     def __init__(self, file, block_size=32768):
         self.file = file
         self.block_size = block_size  # for __iter__
@@ -163,6 +581,7 @@ class ReadOnlyFileBasedBuffer(FileBasedBuffer):
                 self.remain = fsize
             else:
                 self.remain = min(fsize, size)
+            self.fileno = _sendfile_fileno(self.file)
         return self.remain
 
     def get(self, numbytes=-1, skip=False):
@@ -323,3 +742,416 @@ class OverflowableBuffer:
         buf = self.buf
         if buf is not None:
             buf.close()
+
+
+class SegmentedBuffer:
+    """
+    An in-memory buffer holding the data appended to it as a deque of bytes
+    segments, so that appending doesn't copy what is already buffered and
+    get() can return a view of the first segment instead of a copy. Once it
+    holds ``overflow`` bytes or more the data is moved to a temporary file (a
+    DiskBuffer, or with ``background`` a BackgroundDiskBuffer that calls
+    ``on_ready`` when ready() returned False and there is data to get, and
+    ``on_drained`` when full() returned True and it caught up), and getfile()
+    moves it to a BytesIO.
+    """
+
+    overflowed = False
+    buf = None  # the file based buffer the data was moved to, if any
+    map = None  # the mmap returned by getview(), once called
+    # a deque while it holds data, the empty tuple while it is empty so that
+    # an idle buffer doesn't keep a deque (and its block) allocated
+    segments = ()
+
+    def __init__(self, overflow, background=False, on_ready=None, on_drained=None):
+        self.overflow = overflow
+        self.background = background
+        self.on_ready = on_ready
+        self.on_drained = on_drained
+        self.offset = 0  # bytes of segments[0] that were already skipped
+        self.remain = 0
+
+    def __len__(self):
+        buf = self.buf
+        if buf is not None:
+            # use buf.__len__ rather than len(buf) FBO of not getting
+            # OverflowError on 32-bit Python
+            return buf.__len__()
+        return self.remain
+
+    def __bool__(self):
+        return self.__len__() > 0
+
+    def append(self, s):
+        buf = self.buf
+        if buf is None:
+            if not s:
+                return
+            if s.__class__ is not bytes:
+                # don't hang on to a view of a buffer that may be reused
+                s = bytes(s)
+            if self.remain:
+                self.segments.append(s)
+            else:
+                self.segments = deque((s,))
+            self.remain += len(s)
+            if self.remain >= self.overflow:
+                self._set_large_buffer()
+            return
+        buf.append(s)
+        if not self.overflowed and buf.__len__() >= self.overflow:
+            self._set_large_buffer()
+
+    def get(self, numbytes=-1, skip=False):
+        buf = self.buf
+        if buf is not None:
+            return buf.get(numbytes, skip)
+        if numbytes < 0 or numbytes > self.remain:
+            numbytes = self.remain
+        if not numbytes:
+            return b""
+        segments = self.segments
+        first = segments[0]
+        start = self.offset
+        if len(first) - start >= numbytes:
+            if start or numbytes < len(first):
+                res = memoryview(first)[start : start + numbytes]
+            else:
+                res = first
+        else:
+            parts = [first[start:]]
+            needed = numbytes - len(parts[0])
+            for segment in itertools.islice(segments, 1, None):
+                if len(segment) >= needed:
+                    parts.append(segment[:needed])
+                    break
+                parts.append(segment)
+                needed -= len(segment)
+            res = b"".join(parts)
+        if skip:
+            self.skip(numbytes)
+        return res
+
+    def get_segments(self, numbytes, limit):
+        """
+        Return a list of up to ``limit`` segments (or views of them) holding
+        at most ``numbytes`` bytes from the start of the buffer, for a
+        vectored send. Nothing is skipped.
+        """
+        buf = self.buf
+        if buf is not None:
+            data = buf.get(numbytes)
+            return [data] if data else []
+        res = []
+        start = self.offset
+        for segment in self.segments:
+            if numbytes <= 0 or len(res) >= limit:
+                break
+            if start or len(segment) > numbytes:
+                segment = memoryview(segment)[start : start + numbytes]
+            res.append(segment)
+            numbytes -= len(segment)
+            start = 0
+        return res
+
+    def skip(self, numbytes, allow_prune=False):
+        buf = self.buf
+        if buf is not None:
+            buf.skip(numbytes, allow_prune)
+            return
+        if self.remain < numbytes:
+            raise ValueError(
+                "Can't skip %d bytes in buffer of %d bytes" % (numbytes, self.remain)
+            )
+        self.remain -= numbytes
+        segments = self.segments
+        offset = self.offset + numbytes
+        while segments and offset >= len(segments[0]):
+            offset -= len(segments.popleft())
+        self.offset = offset
+        if not self.remain:
+            self.segments = ()
+
+    def _take_segments(self):
+        segments = self.segments
+        data = b""
+        if segments:
+            segments[0] = segments[0][self.offset :]
+            data = b"".join(segments)
+        self.segments = ()
+        self.offset = self.remain = 0
+        return data
+
+    def _set_small_buffer(self):
+        self.buf = BytesIOBasedBuffer()
+        self.buf.append(self._take_segments())
+
+    def full(self):
+        """
+        Return True if a DiskIO thread fell behind writing the data to disk,
+        on_drained is then called once it caught up.
+        """
+        buf = self.buf
+        if buf is not None and buf.__class__ is BackgroundDiskBuffer:
+            return buf.full()
+        return False
+
+    def ready(self):
+        """
+        Return True unless the data is being read from disk by a DiskIO
+        thread, on_ready is then called once it can be sent.
+        """
+        buf = self.buf
+        if buf is not None and buf.__class__ is BackgroundDiskBuffer:
+            return buf.ready()
+        return True
+
+    def _set_large_buffer(self):
+        oldbuf = self.buf
+        if oldbuf is None and self.background:
+            buf = self.buf = BackgroundDiskBuffer(
+                disk_io, self.overflow, self.on_ready, self.on_drained
+            )
+            segments = self.segments
+            if segments:
+                segments[0] = segments[0][self.offset :]
+            for segment in segments:
+                buf.append(segment)
+            self.segments = ()
+            self.offset = self.remain = 0
+        elif oldbuf is None:
+            self.buf = DiskBuffer()
+            self.buf.append(self._take_segments())
+        else:
+            self.buf = DiskBuffer(oldbuf)
+            oldbuf.close()
+        self.overflowed = True
+
+    def prune(self):
+        buf = self.buf
+        if buf is not None:
+            buf.prune()
+        # skipped data isn't kept in memory
+
+    def getfile(self):
+        if self.buf is None:
+            self._set_small_buffer()
+        return self.buf.getfile()
+
+    def getview(self):
+        """
+        Return a read-only memoryview of the whole of the data written to the
+        buffer (for a request body, which is never skipped), without copying
+        it once it overflowed: the temporary file is then mapped into memory,
+        until close() is called.
+        """
+        file = self.getfile()
+        if not self.overflowed:
+            return memoryview(file.getvalue())
+        if self.map is None:
+            file.flush()
+            try:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # an empty file can't be mapped
+                return memoryview(b"")
+        return memoryview(self.map)
+
+    def close(self):
+        buf = self.buf
+        if buf is not None:
+            buf.close()
+        self.segments = ()
+        self.offset = self.remain = 0
+        map = self.map
+        if map is not None:
+            self.map = None
+            try:
+                map.close()
+            except BufferError:
+                # the application still holds a view of it, the mapping goes
+                # away along with the last of them
+                pass
+
+
+class StreamingBuffer(io.BufferedIOBase):
+    """
+    A bounded buffer that a request body is appended to as it is received,
+    while the application reads it from another thread as ``wsgi.input``.
+
+    append() never blocks, but full() returns True once the buffer holds
+    ``limit`` bytes or more, and ``on_drained`` is called by the reader when
+    it made room again. Reads block until they can be satisfied, the whole
+    body was received (finish()) or receiving it failed (abort(), reads that
+    can't be satisfied then raise the exception it was given). A read waiting
+    for more than the buffer holds while it is full takes what is buffered,
+    making room for the rest of it to be received.
+    """
+
+    finished = False
+    error = None
+
+    def __init__(self, limit, on_drained=None):
+        self.limit = limit
+        self.on_drained = on_drained
+        self.lock = threading.Condition()
+        self.segments = deque()
+        self.offset = 0  # bytes of segments[0] that were already read
+        self.remain = 0
+        self.received = 0
+
+    def __len__(self):
+        # the size of the body received so far, for the receivers
+        return self.received
+
+    def __bool__(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def append(self, s):
+        if not s:
+            return
+        with self.lock:
+            if self.finished or self.error is not None or self.closed:
+                # the application is done with the body
+                return
+            self.segments.append(bytes(s))
+            self.remain += len(s)
+            self.received += len(s)
+            self.lock.notify_all()
+
+    def full(self):
+        return self.remain >= self.limit
+
+    def finish(self):
+        with self.lock:
+            self.finished = True
+            self.lock.notify_all()
+
+    def abort(self, error):
+        with self.lock:
+            if not self.finished and self.error is None:
+                self.error = error
+                self.lock.notify_all()
+
+    def _wait(self, ready):
+        # wait until ready() returns how many bytes to take, or until they
+        # can't be waited for any longer, with the lock held; return the
+        # bytes to take and whether the read is complete with them
+        while True:
+            count = ready()
+            if count is not None:
+                return count, True
+            if self.finished:
+                return self.remain, True
+            if self.remain >= self.limit:
+                # nothing more is received until there is room again, the
+                # read takes what is buffered and waits for the rest
+                return self.remain, False
+            if self.error is not None:
+                raise self.error
+            if self.closed:
+                raise ValueError("I/O operation on closed file.")
+            self.lock.wait()
+
+    def _take(self, numbytes):
+        # remove and return up to numbytes bytes, with the lock held
+        was_full = self.remain >= self.limit
+        segments = self.segments
+        parts = []
+        needed = min(numbytes, self.remain)
+        self.remain -= needed
+        while needed:
+            segment = segments[0]
+            start = self.offset
+            available = len(segment) - start
+            if available > needed:
+                parts.append(segment[start : start + needed])
+                self.offset = start + needed
+                break
+            parts.append(segment[start:] if start else segment)
+            segments.popleft()
+            self.offset = 0
+            needed -= available
+        drained = was_full and self.remain < self.limit
+        if len(parts) == 1:
+            return parts[0], drained
+        return b"".join(parts), drained
+
+    def _read(self, size, make_ready):
+        # make_ready(size) returns the ready() function of _wait() for a read
+        # of up to size more bytes
+        parts = []
+        while True:
+            with self.lock:
+                count, done = self._wait(make_ready(size))
+                data, drained = self._take(min(count, size))
+            if drained and self.on_drained is not None:
+                self.on_drained()
+            parts.append(data)
+            size -= len(data)
+            if done or not size:
+                break
+        if len(parts) == 1:
+            return parts[0]
+        return b"".join(parts)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = sys.maxsize
+
+        def make_ready(size):
+            return lambda: size if self.remain >= size else None
+
+        return self._read(size, make_ready)
+
+    def read1(self, size=-1):
+        if size is None or size < 0:
+            size = sys.maxsize
+
+        def make_ready(size):
+            return lambda: self.remain or None
+
+        return self._read(size, make_ready)
+
+    def readinto(self, b):
+        with memoryview(b) as view, view.cast("B") as target:
+            data = self.read(len(target))
+            target[: len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        if size is None or size < 0:
+            size = sys.maxsize
+
+        def make_ready(size):
+            scanned = [0, 0]  # segments and bytes already searched for b"\n"
+
+            def ready():
+                segments = self.segments
+                while scanned[0] < len(segments):
+                    segment = segments[scanned[0]]
+                    start = self.offset if scanned[0] == 0 else 0
+                    index = segment.find(b"\n", start)
+                    if index >= 0:
+                        return scanned[1] + index - start + 1
+                    scanned[1] += len(segment) - start
+                    scanned[0] += 1
+                if self.remain >= size:
+                    return size
+
+            return ready
+
+        return self._read(size, make_ready)
+
+    def getfile(self):
+        return self
+
+    def close(self):
+        with self.lock:
+            self.segments.clear()
+            self.offset = self.remain = 0
+            super().close()
+            self.lock.notify_all()
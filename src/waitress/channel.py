@@ -11,18 +11,38 @@
 # FOR A PARTICULAR PURPOSE.
 #
 ##############################################################################
+import errno
 import socket
 import threading
 import time
 import traceback
 
-from waitress.buffers import OverflowableBuffer, ReadOnlyFileBasedBuffer
-from waitress.parser import HTTPRequestParser
+from waitress.buffers import ReadOnlyFileBasedBuffer, SegmentedBuffer
+from waitress.parser import HTTPRequestParser, ParsingError
 from waitress.task import ErrorTask, WSGITask
-from waitress.utilities import InternalServerError
+from waitress.utilities import InternalServerError, lazy_attribute
 
 from . import wasyncore
 
+# The most outbuf segments to send in a single sendmsg() call
+MAX_SENDMSG_SEGMENTS = 64
+
+# Bounds of the amount of output offered to a single send: it starts at the
+# socket's send buffer size, doubles while the socket takes all of it and
+# drops to what was sent when it doesn't
+MIN_SEND_CHUNK = 4096
+MAX_SEND_CHUNK = 1 << 20
+
+# os.sendfile errors that mean it can't be used for this file or socket
+_SENDFILE_UNSUPPORTED = frozenset(
+    {errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP, errno.ENOTSUP}
+)
+
+
+# The buffer each thread running a main loop receives data into; received()
+# is done with the data by the time the next channel reads.
+_recv_buffers = threading.local()
+
 
 class ClientDisconnected(Exception):
     """Raised when attempting to write to a closed socket."""
@@ -40,14 +60,37 @@ class HTTPChannel(wasyncore.dispatcher):
     error_task_class = ErrorTask
     parser_class = HTTPRequestParser
 
+    # readable() and writable() only depend on state that is changed by the
+    # methods below, all of which call mark_dirty() when they change it
+    tracks_readiness = True
+
+    # The server.EventLoop servicing this channel, None if it is serviced by
+    # the server's own main loop
+    loop = None
     # A request that has not been received yet completely is stored here
     request = None
+    # With stream_request_body, the request whose body is still being
+    # received while it is queued or being serviced (it is also self.request)
+    streaming_request = None
+    # The part of the WSGI environ that is the same for every request on this
+    # channel, set up by the first task
+    environ_template = None
     last_activity = 0  # Time of last activity
+    request_started = 0  # Time the request being received was started
+    output_started = 0  # Time output was queued with none pending
     will_close = False  # set to True to close the socket.
     close_when_flushed = False  # set to True to close the socket when flushed
     sent_continue = False  # used as a latch after sending 100 continue
     total_outbufs_len = 0  # total bytes ready to send
+    outbuf_waiting = False  # waiting for outbufs[0] to be read from disk
     current_outbuf_count = 0  # total bytes written to current outbuf
+    send_chunk_len = 0  # bytes to offer to the next send, 0 for sendbuf_len
+
+    # requests_lock used to push/pop requests and modify the request that is
+    # currently being created
+    requests_lock = lazy_attribute(threading.Lock)
+    # outbuf_lock used to access any outbuf (expected to use an RLock)
+    outbuf_lock = lazy_attribute(threading.Condition)
 
     #
     # ASYNCHRONOUS METHODS (including __init__)
@@ -56,20 +99,22 @@ class HTTPChannel(wasyncore.dispatcher):
     def __init__(self, server, sock, addr, adj, map=None):
         self.server = server
         self.adj = adj
-        self.outbufs = [OverflowableBuffer(adj.outbuf_overflow)]
+        self.outbufs = [self._new_outbuf()]
         self.creation_time = self.last_activity = time.time()
-        self.sendbuf_len = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
-
-        # requests_lock used to push/pop requests and modify the request that is
-        # currently being created
-        self.requests_lock = threading.Lock()
-        # outbuf_lock used to access any outbuf (expected to use an RLock)
-        self.outbuf_lock = threading.Condition()
+        # accepted sockets start with the send buffer size of the listening
+        # socket (and the same socket options), only ask for it once
+        sendbuf_len = server.sendbuf_len
+        if sendbuf_len is None:
+            sendbuf_len = server.sendbuf_len = sock.getsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF
+            )
+        self.sendbuf_len = sendbuf_len
 
         wasyncore.dispatcher.__init__(self, sock, map=map)
         self.connected = True
         self.addr = addr
         self.requests = []
+        self.arm_timeout()
 
     def check_client_disconnected(self):
         """
@@ -80,12 +125,71 @@ class HTTPChannel(wasyncore.dispatcher):
 
         return not self.connected
 
+    def timeout_deadline(self):
+        """
+        Return the time at which this channel times out in its current state,
+        or None if it can't time out while a task is servicing a request.
+        """
+        adj = self.adj
+
+        if self.total_outbufs_len:
+            # waiting for the client to read the response
+            timeout = adj.write_timeout or adj.channel_timeout
+
+            return max(self.last_activity, self.output_started) + timeout
+
+        streaming_request = self.streaming_request
+
+        if streaming_request is not None:
+            if streaming_request.body_stream.full():
+                # waiting for the task to read the body
+                return None
+
+            return self.last_activity + (adj.body_timeout or adj.channel_timeout)
+
+        if self.requests:
+            return None
+
+        request = self.request
+
+        if request is None:
+            # waiting for the next request
+            return self.last_activity + (adj.keepalive_timeout or adj.channel_timeout)
+
+        if not request.headers_finished:
+            return self.request_started + (adj.header_timeout or adj.channel_timeout)
+
+        if request.body_full():
+            # waiting for the DiskIO thread to write the body
+            return None
+
+        return self.last_activity + (adj.body_timeout or adj.channel_timeout)
+
+    def arm_timeout(self):
+        """
+        Make sure the server's timers will look at this channel no later than
+        when it times out. A deadline that has moved further away is only
+        picked up once the earlier one expires.
+        """
+        deadline = self.timeout_deadline()
+
+        if deadline is not None:
+            timers = self.server.timers
+            scheduled = timers.deadline(self)
+
+            if scheduled is None or deadline < scheduled:
+                timers.schedule(self, deadline)
+
     def writable(self):
         # if there's data in the out buffer or we've been instructed to close
         # the channel (possibly by our server maintenance logic), run
         # handle_write
 
-        return self.total_outbufs_len or self.will_close or self.close_when_flushed
+        return (
+            (self.total_outbufs_len and not self.outbuf_waiting)
+            or self.will_close
+            or self.close_when_flushed
+        )
 
     def handle_write(self):
         # Precondition: there's data in the out buffer to be sent, or
@@ -127,11 +231,13 @@ class HTTPChannel(wasyncore.dispatcher):
                 if self.adj.log_socket_errors:
                     self.logger.exception("Socket error")
                 self.will_close = True
+                self.mark_dirty()
 
                 return (False, True)
             except Exception:  # pragma: nocover
                 self.logger.exception("Unexpected exception when flushing")
                 self.will_close = True
+                self.mark_dirty()
 
                 return (False, True)
 
@@ -144,16 +250,34 @@ class HTTPChannel(wasyncore.dispatcher):
         # 4. There's no data in the output buffer that needs to be sent
         #    before we potentially create a new task.
 
+        streaming_request = self.streaming_request
+
+        if streaming_request is not None:
+            # 5. Unless the body of the request being serviced is being
+            #    received while the task reads it, in which case we read as
+            #    long as there is room for it.
+            return not (
+                self.will_close
+                or self.close_when_flushed
+                or streaming_request.body_stream.full()
+            )
+
+        # 6. And the DiskIO thread keeps up with writing the body of the
+        #    request being received to disk.
+        request = self.request
+
         return not (
             self.will_close
             or self.close_when_flushed
             or len(self.requests) > self.adj.channel_request_lookahead
             or self.total_outbufs_len
+            or (request is not None and request.body_full())
         )
 
     def handle_read(self):
+        buf = self._recv_buffer()
         try:
-            data = self.recv(self.adj.recv_bytes)
+            nbytes = self.recv_into(buf)
         except OSError:
             if self.adj.log_socket_errors:
                 self.logger.exception("Socket error")
@@ -161,12 +285,24 @@ class HTTPChannel(wasyncore.dispatcher):
 
             return
 
-        if data:
+        if nbytes:
             self.last_activity = time.time()
-            self.received(data)
+            # the parser and the receivers copy what they keep, so they can
+            # work on a view of the buffer rather than a new bytes object
+            self.received(memoryview(buf)[:nbytes])
         else:
             # Client disconnected.
             self.connected = False
+            self._abort_streaming_request()
+
+    def _recv_buffer(self):
+        size = self.adj.recv_bytes
+        buf = getattr(_recv_buffers, "buf", None)
+
+        if buf is None or len(buf) != size:
+            buf = _recv_buffers.buf = bytearray(size)
+
+        return buf
 
     def send_continue(self):
         """
@@ -199,6 +335,10 @@ class HTTPChannel(wasyncore.dispatcher):
             while data:
                 if self.request is None:
                     self.request = self.parser_class(self.adj)
+                    self.request_started = self.last_activity
+
+                    if self.adj.stream_request_body or self.adj.background_disk_io:
+                        self.request.body_drained = self._body_drained
                 n = self.request.received(data)
 
                 # if there are requests queued, we can not send the continue
@@ -216,23 +356,55 @@ class HTTPChannel(wasyncore.dispatcher):
                     # The request (with the body) is ready to use.
                     self.sent_continue = False
 
-                    if not self.request.empty:
-                        self.requests.append(self.request)
-
-                        if len(self.requests) == 1:
-                            # self.requests was empty before so the main thread
-                            # is in charge of starting the task. Otherwise,
-                            # service() will add a new task after each request
-                            # has been processed
-                            self.server.add_task(self)
+                    if self.request is self.streaming_request:
+                        # it was queued when its headers were received
+                        self.streaming_request = None
+                    elif not self.request.empty:
+                        self._queue_request(self.request)
                     self.request = None
+                elif (
+                    self.request.body_stream is not None
+                    and self.request is not self.streaming_request
+                ):
+                    # The headers are in, the task can read the body while
+                    # it is received.
+                    self.streaming_request = self.request
+                    self._queue_request(self.request)
 
                 if n >= len(data):
                     break
                 data = data[n:]
 
+        self.arm_timeout()
+        self.mark_dirty()
+
         return True
 
+    def _queue_request(self, request):
+        self.requests.append(request)
+
+        if len(self.requests) == 1:
+            # self.requests was empty before so the main thread
+            # is in charge of starting the task. Otherwise,
+            # service() will add a new task after each request
+            # has been processed
+            self.server.add_task(self)
+
+    def _abort_streaming_request(self):
+        streaming_request = self.streaming_request
+
+        if streaming_request is not None:
+            # don't leave the task waiting for the rest of the body
+            streaming_request.body_stream.abort(ClientDisconnected())
+
+    def _body_drained(self):
+        # called from a task thread once it made room in the body of the
+        # streaming request, or from the DiskIO thread once it caught up with
+        # writing the body of the request being received
+        self.arm_timeout()
+        self.mark_dirty()
+        self.pull_trigger()
+
     def _flush_some_if_lockable(self, do_close=True):
         # Since our task may be appending to the outbuf, we try to acquire
         # the lock, but we don't block if we can't.
@@ -250,7 +422,6 @@ class HTTPChannel(wasyncore.dispatcher):
         # Send as much data as possible to our client
 
         sent = 0
-        dobreak = False
 
         while True:
             outbuf = self.outbufs[0]
@@ -258,21 +429,7 @@ class HTTPChannel(wasyncore.dispatcher):
             # OverflowError on 32-bit Python
             outbuflen = outbuf.__len__()
 
-            while outbuflen > 0:
-                chunk = outbuf.get(self.sendbuf_len)
-                num_sent = self.send(chunk, do_close=do_close)
-
-                if num_sent:
-                    outbuf.skip(num_sent, True)
-                    outbuflen -= num_sent
-                    sent += num_sent
-                    self.total_outbufs_len -= num_sent
-                else:
-                    # failed to write anything, break out entirely
-                    dobreak = True
-
-                    break
-            else:
+            if outbuflen <= 0:
                 # self.outbufs[-1] must always be a writable outbuf
 
                 if len(self.outbufs) > 1:
@@ -281,21 +438,150 @@ class HTTPChannel(wasyncore.dispatcher):
                         toclose.close()
                     except Exception:
                         self.logger.exception("Unexpected error when closing an outbuf")
+
+                    continue
+
+                # caught up, done flushing for now
+                break
+
+            if outbuf.__class__ is SegmentedBuffer:
+                # set first, _outbuf_ready() may be called as soon as ready()
+                # returns
+                self.outbuf_waiting = True
+
+                if outbuf.ready():
+                    self.outbuf_waiting = False
                 else:
-                    # caught up, done flushing for now
-                    dobreak = True
+                    # its data is being read from disk in the background
+                    self.mark_dirty()
+
+                    break
+
+            num_sent = None
+
+            if (
+                outbuf.__class__ is ReadOnlyFileBasedBuffer
+                and outbuf.fileno is not None
+            ):
+                # wsgi.file_wrapper around a regular file, let the kernel
+                # copy it to the socket
+                num_sent = self._sendfile(outbuf, outbuflen, do_close)
+
+                if num_sent:
+                    outbuf.skip(num_sent, True)
 
-            if dobreak:
+            if num_sent is None:
+                num_sent = self._send_outbufs(do_close)
+
+            if not num_sent:
+                # failed to write anything, break out entirely
                 break
 
+            sent += num_sent
+            self.total_outbufs_len -= num_sent
+
         if sent:
             self.last_activity = time.time()
+            # once the output is sent the channel may time out sooner, e.g.
+            # after keepalive_timeout rather than write_timeout
+            self.arm_timeout()
+            self.mark_dirty()
 
             return True
 
         return False
 
+    def _send_outbufs(self, do_close=True):
+        # Send the beginning of the outbufs, gathering up to send_chunk_len
+        # bytes from as many of them (and of their segments) as possible into
+        # a single sendmsg() call, and skip what was sent.
+        limit = self.send_chunk_len or self.sendbuf_len
+        gather = hasattr(self.socket, "sendmsg")
+        segments = []
+        chunks = []
+        size = 0
+
+        for outbuf in self.outbufs:
+            if chunks and outbuf.__class__ is ReadOnlyFileBasedBuffer:
+                # don't read a file that may not get sent this time around
+                break
+            outbuflen = outbuf.__len__()
+
+            if gather and outbuf.__class__ is SegmentedBuffer:
+                # send its segments as they are rather than joining them
+                parts = outbuf.get_segments(
+                    limit - size, MAX_SENDMSG_SEGMENTS - len(chunks)
+                )
+            else:
+                chunk = outbuf.get(limit - size)
+                parts = [chunk] if chunk else []
+            taken = sum(len(part) for part in parts)
+
+            if taken:
+                segments.append((outbuf, taken))
+                chunks.extend(parts)
+                size += taken
+
+            if (
+                not gather
+                or taken < outbuflen
+                or size >= limit
+                or len(chunks) >= MAX_SENDMSG_SEGMENTS
+            ):
+                break
+
+        if len(chunks) > 1:
+            num_sent = self.sendmsg(chunks, do_close=do_close)
+        else:
+            num_sent = self.send(chunks[0] if chunks else b"", do_close=do_close)
+
+        if num_sent >= limit:
+            # the socket took all that it was offered, offer more next time
+            self.send_chunk_len = min(limit * 2, max(MAX_SEND_CHUNK, self.sendbuf_len))
+        elif 0 < num_sent < size:
+            # it only had room for part of it
+            self.send_chunk_len = max(num_sent, min(MIN_SEND_CHUNK, self.sendbuf_len))
+
+        remain = num_sent
+
+        for outbuf, chunklen in segments:
+            if not remain:
+                break
+            n = min(remain, chunklen)
+            outbuf.skip(n, True)
+            remain -= n
+
+        return num_sent
+
+    def _new_outbuf(self):
+        return SegmentedBuffer(
+            self.adj.outbuf_overflow,
+            background=self.adj.background_disk_io,
+            on_ready=self._outbuf_ready,
+        )
+
+    def _outbuf_ready(self):
+        # called from the DiskIO thread once data of an outbuf that was
+        # being read from disk can be sent
+        self.outbuf_waiting = False
+        self.mark_dirty()
+        self.pull_trigger()
+
+    def _sendfile(self, outbuf, count, do_close=True):
+        # Returns None if os.sendfile can't be used for this outbuf, it is
+        # then read and sent like any other
+        try:
+            return self.sendfile(outbuf.fileno, outbuf.file.tell(), count, do_close)
+        except OSError as why:
+            if why.args[0] not in _SENDFILE_UNSUPPORTED:
+                raise
+            outbuf.fileno = None
+
+            return None
+
     def handle_close(self):
+        self._abort_streaming_request()
+
         with self.outbuf_lock:
             for outbuf in self.outbufs:
                 try:
@@ -309,6 +595,16 @@ class HTTPChannel(wasyncore.dispatcher):
             self.outbuf_lock.notify()
         wasyncore.dispatcher.close(self)
 
+    def handle_timeout(self):
+        """
+        Close the channel because it timed out; called by the loop servicing
+        it. The client may have stopped reading, so this doesn't wait for
+        ``handle_write`` to find the socket writable.
+        """
+        if self.socket is not None:
+            self.will_close = True
+            self.handle_close()
+
     def add_channel(self, map=None):
         """See wasyncore.dispatcher
 
@@ -328,11 +624,20 @@ class HTTPChannel(wasyncore.dispatcher):
 
         if fd in ac:
             del ac[fd]
+        self.server.timers.cancel(self)
 
     #
     # SYNCHRONOUS METHODS
     #
 
+    def pull_trigger(self):
+        """Wake up the main loop that is servicing this channel."""
+        loop = self.loop
+        if loop is None:
+            self.server.pull_trigger()
+        else:
+            loop.pull_trigger()
+
     def write_soon(self, data):
         if not self.connected:
             # if the socket is closed then interrupt the task so that it
@@ -349,22 +654,32 @@ class HTTPChannel(wasyncore.dispatcher):
                     raise ClientDisconnected
                 num_bytes = len(data)
 
+                if not self.total_outbufs_len:
+                    self.output_started = time.time()
+
                 if data.__class__ is ReadOnlyFileBasedBuffer:
                     # they used wsgi.file_wrapper
                     self.outbufs.append(data)
-                    nextbuf = OverflowableBuffer(self.adj.outbuf_overflow)
+                    nextbuf = self._new_outbuf()
                     self.outbufs.append(nextbuf)
                     self.current_outbuf_count = 0
                 else:
                     if self.current_outbuf_count >= self.adj.outbuf_high_watermark:
                         # rotate to a new buffer if the current buffer has hit
-                        # the watermark to avoid it growing unbounded
-                        nextbuf = OverflowableBuffer(self.adj.outbuf_overflow)
-                        self.outbufs.append(nextbuf)
+                        # the watermark to avoid it growing unbounded; one
+                        # that was sent entirely and never overflowed to a
+                        # file holds nothing and is reused instead
+                        outbuf = self.outbufs[-1]
+
+                        if outbuf or outbuf.overflowed:
+                            nextbuf = self._new_outbuf()
+                            self.outbufs.append(nextbuf)
                         self.current_outbuf_count = 0
                     self.outbufs[-1].append(data)
                     self.current_outbuf_count += num_bytes
                 self.total_outbufs_len += num_bytes
+                self.arm_timeout()
+                self.mark_dirty()
 
                 if self.total_outbufs_len >= self.adj.send_bytes:
                     (flushed, exception) = self._flush_exception(
@@ -376,7 +691,7 @@ class HTTPChannel(wasyncore.dispatcher):
                         or not flushed
                         or self.total_outbufs_len >= self.adj.send_bytes
                     ):
-                        self.server.pull_trigger()
+                        self.pull_trigger()
 
             return num_bytes
 
@@ -393,7 +708,7 @@ class HTTPChannel(wasyncore.dispatcher):
                     # An exception happened while flushing, wake up the main
                     # thread, then wait for it to decide what to do next
                     # (probably close the socket, and then just return)
-                    self.server.pull_trigger()
+                    self.pull_trigger()
                     self.outbuf_lock.wait()
 
                     return
@@ -402,7 +717,7 @@ class HTTPChannel(wasyncore.dispatcher):
                     self.connected
                     and self.total_outbufs_len > self.adj.outbuf_high_watermark
                 ):
-                    self.server.pull_trigger()
+                    self.pull_trigger()
                     self.outbuf_lock.wait()
 
     def service(self):
@@ -424,6 +739,17 @@ class HTTPChannel(wasyncore.dispatcher):
         except ClientDisconnected:
             self.logger.info("Client disconnected while serving %s" % task.request.path)
             task.close_on_finish = True
+        except ParsingError:
+            # the body of a streaming request was invalid
+            task.close_on_finish = True
+
+            if not task.wrote_header:
+                task = self.error_task_class(self, request)
+                try:
+                    task.service()
+                except ClientDisconnected:
+                    pass
+                task.close_on_finish = True
         except Exception:
             self.logger.exception("Exception while serving %s" % task.request.path)
 
@@ -451,9 +777,15 @@ class HTTPChannel(wasyncore.dispatcher):
             else:
                 task.close_on_finish = True
 
+        with self.requests_lock:
+            if request is self.streaming_request:
+                # the rest of the body is not going to be read
+                task.close_on_finish = True
+
         if task.close_on_finish:
             with self.requests_lock:
                 self.close_when_flushed = True
+                self.streaming_request = None
 
                 for request in self.requests:
                     request.close()
@@ -474,7 +806,8 @@ class HTTPChannel(wasyncore.dispatcher):
             # next request to create a new outbuf to avoid sharing
             # outbufs across requests which can cause outbufs to
             # not be deallocated regularly when a connection is open
-            # for a long time
+            # for a long time; write_soon reuses the current outbuf
+            # if it was sent entirely by then
 
             if self.current_outbuf_count > 0:
                 self.current_outbuf_count = self.adj.outbuf_high_watermark
@@ -487,26 +820,33 @@ class HTTPChannel(wasyncore.dispatcher):
 
                 if self.connected and self.requests:
                     self.server.add_task(self)
-                elif (
+
+                if (
                     self.connected
                     and self.request is not None
                     and self.request.expect_continue
                     and self.request.headers_finished
                     and not self.sent_continue
+                    and (not self.requests or self.requests[0] is self.request)
                 ):
                     # A request waits for a signal to continue, but we could
                     # not send it until now because requests were being
                     # processed and the output needs to be kept in order
                     self.send_continue()
 
+        self.mark_dirty()
+
         if self.connected:
-            self.server.pull_trigger()
+            self.pull_trigger()
 
         self.last_activity = time.time()
+        self.arm_timeout()
 
     def cancel(self):
         """Cancels all pending / active requests"""
         self.will_close = True
         self.connected = False
         self.last_activity = time.time()
+        self._abort_streaming_request()
         self.requests = []
+        self.mark_dirty()
@@ -16,14 +16,17 @@
 This server uses asyncore to accept connections and do initial
 processing but threads to do work.
 """
+from collections.abc import MutableMapping
+import functools
 from io import BytesIO
 import re
+import sys
 from urllib import parse
 from urllib.parse import unquote_to_bytes
 
-from waitress.buffers import OverflowableBuffer
+from waitress.buffers import SegmentedBuffer, StreamingBuffer
 from waitress.receiver import ChunkedReceiver, FixedStreamReceiver
-from waitress.rfc7230 import HEADER_FIELD_RE, ONLY_DIGIT_RE
+from waitress.rfc7230 import FIELD_VALUE_BYTES, ONLY_DIGIT_RE, TCHAR_BYTES
 from waitress.utilities import (
     BadRequest,
     RequestEntityTooLarge,
@@ -57,6 +60,7 @@ class HTTPRequestParser:
     expect_continue = False  # client sent "Expect: 100-continue" header
     headers_finished = False  # True when headers have been read
     header_plus = b""
+    header_scanned = 0  # bytes of header_plus searched for the end of it
     chunked = False
     content_length = 0
     header_bytes_received = 0
@@ -65,6 +69,12 @@ class HTTPRequestParser:
     version = "1.0"
     error = None
     connection_close = False
+    # With stream_request_body, the StreamingBuffer the body is received
+    # into while a task reads it
+    body_stream = None
+    # the callable the body buffer calls when body_full() returned True and
+    # it can take more data
+    body_drained = None
 
     # Other attributes: first_line, header, headers, command, uri, version,
     # path, query, fragment
@@ -95,8 +105,20 @@ class HTTPRequestParser:
             # In header.
             max_header = self.adj.max_request_header_size
 
-            s = self.header_plus + data
-            index = find_double_newline(s)
+            s = self.header_plus
+
+            if s:
+                # Accumulate a header received in several pieces in place
+                # and only search what wasn't searched yet, backing up
+                # enough to find a CRLFCRLF split between two pieces.
+                s += data
+                index = s.find(b"\r\n\r\n", max(self.header_scanned - 3, 0))
+
+                if index >= 0:
+                    index += 4
+            else:
+                s = bytes(data)
+                index = find_double_newline(s)
             consumed = 0
 
             if index >= 0:
@@ -124,7 +146,12 @@ class HTTPRequestParser:
 
             if index >= 0:
                 # Header finished.
-                header_plus = s[:index]
+                if s.__class__ is bytearray:
+                    del s[index:]
+                    header_plus = bytes(s)
+                    self.header_plus = b""
+                else:
+                    header_plus = s[:index]
 
                 # Remove preceding blank lines. This is suggested by
                 # https://tools.ietf.org/html/rfc7230#section-3.5 to support
@@ -165,7 +192,10 @@ class HTTPRequestParser:
                 return consumed
 
             # Header not finished yet.
+            if s.__class__ is not bytearray:
+                s = bytearray(s)
             self.header_plus = s
+            self.header_scanned = len(s)
 
             return datalen
         else:
@@ -183,6 +213,8 @@ class HTTPRequestParser:
                 self.error = br.error
                 self.completed = True
             elif br.completed:
+                if self.body_stream is not None:
+                    self.body_stream.finish()
                 # The request (with the body) is ready to use.
                 self.completed = True
 
@@ -195,6 +227,10 @@ class HTTPRequestParser:
                     # request with a valid content-length.
                     self.headers["CONTENT_LENGTH"] = str(br.__len__())
 
+            if self.error is not None and self.body_stream is not None:
+                # the task reading the body gets the error
+                self.body_stream.abort(ParsingError(self.error.body))
+
             return consumed
 
     def parse_header(self, header_plus):
@@ -215,27 +251,36 @@ class HTTPRequestParser:
 
         self.first_line = first_line  # for testing
 
-        lines = get_header_lines(header)
-
-        headers = self.headers
+        if self.adj.lazy_headers and not FOLDED_RE.search(header):
+            self.headers = headers = LazyHeaders(header)
+            lines = ()
+        else:
+            lines = get_header_lines(header)
+            headers = self.headers
 
         for line in lines:
-            header = HEADER_FIELD_RE.match(line)
+            key, colon, value = line.partition(b":")
 
-            if not header:
-                raise ParsingError("Invalid header")
+            # Only strip off whitespace that is considered valid whitespace by
+            # RFC7230, don't strip the rest
+            value = value.strip(b" \t")
 
-            key, value = header.group("name", "value")
+            if (
+                not colon
+                or (key not in header_keys and not is_token(key))
+                or value.translate(None, FIELD_VALUE_BYTES)
+            ):
+                raise ParsingError("Invalid header")
 
             if b"_" in key:
                 # TODO(xistence): Should we drop this request instead?
 
                 continue
 
-            # Only strip off whitespace that is considered valid whitespace by
-            # RFC7230, don't strip the rest
-            value = value.strip(b" \t")
-            key1 = key.upper().replace(b"-", b"_").decode("latin-1")
+            try:
+                key1 = header_keys[key]
+            except KeyError:
+                key1 = header_key(key)
             # If a header already exists, we append subsequent values
             # separated by a comma. Applications already need to handle
             # the comma separated values, as HTTP front ends might do
@@ -245,16 +290,9 @@ class HTTPRequestParser:
             except KeyError:
                 headers[key1] = value.decode("latin-1")
 
-        # command, uri, version will be bytes
-        command, uri, version = crack_first_line(first_line)
-        if command == uri == version == b"":
-            raise ParsingError("Start line is invalid")
-
         # self.request_uri is like nginx's request_uri:
         # "full original request URI (with arguments)"
-        self.request_uri = uri.decode("latin-1")
-        version = version.decode("latin-1")
-        command = command.decode("latin-1")
+        command, version, self.request_uri, parts = parse_first_line(first_line)
         self.command = command
         self.version = version
         (
@@ -263,7 +301,7 @@ class HTTPRequestParser:
             self.path,
             self.query,
             self.fragment,
-        ) = split_uri(uri)
+        ) = parts
         self.url_scheme = self.adj.url_scheme
         connection = headers.get("CONNECTION", "")
 
@@ -305,8 +343,7 @@ class HTTPRequestParser:
 
             if encodings and encodings[-1] == "chunked":
                 self.chunked = True
-                buf = OverflowableBuffer(self.adj.inbuf_overflow)
-                self.body_rcv = ChunkedReceiver(buf)
+                self.body_rcv = ChunkedReceiver(self._body_buffer())
             elif encodings:  # pragma: nocover
                 raise TransferEncodingNotImplemented(
                     "Transfer-Encoding requested is not supported."
@@ -328,8 +365,22 @@ class HTTPRequestParser:
             self.content_length = cl
 
             if cl > 0:
-                buf = OverflowableBuffer(self.adj.inbuf_overflow)
-                self.body_rcv = FixedStreamReceiver(cl, buf)
+                self.body_rcv = FixedStreamReceiver(cl, self._body_buffer())
+
+    def _body_buffer(self):
+        adj = self.adj
+
+        if adj.stream_request_body:
+            buf = StreamingBuffer(adj.inbuf_overflow, self.body_drained)
+            self.body_stream = buf
+        else:
+            buf = SegmentedBuffer(
+                adj.inbuf_overflow,
+                background=adj.background_disk_io,
+                on_drained=self.body_drained,
+            )
+
+        return buf
 
     def get_body_stream(self):
         body_rcv = self.body_rcv
@@ -339,6 +390,27 @@ class HTTPRequestParser:
         else:
             return BytesIO()
 
+    def get_body_view(self):
+        body_rcv = self.body_rcv
+
+        if self.body_stream is not None:
+            raise ValueError("The request body is being streamed")
+
+        if body_rcv is not None:
+            return body_rcv.getbuf().getview()
+        else:
+            return memoryview(b"")
+
+    def body_full(self):
+        """
+        Return True if the body being received can't take more data until
+        ``body_drained`` is called: the task didn't read enough of a streamed
+        body yet, or the DiskIO thread fell behind writing it to disk.
+        """
+        body_rcv = self.body_rcv
+
+        return body_rcv is not None and body_rcv.getbuf().full()
+
     def close(self):
         body_rcv = self.body_rcv
 
@@ -359,7 +431,13 @@ def split_uri(uri):
     # https://github.com/python/cpython/blob/8c9e9b0cd5b24dfbf1424d1f253d02de80e8f5ef/Lib/urllib/parse.py#L465-L468
     # and https://github.com/Pylons/waitress/issues/260
 
-    if uri[:2] == b"//":
+    if uri[:1] == b"/" and uri[:2] != b"//" and uri.isascii() and b"\t" not in uri:
+        # The origin-form ("/path?query") used by nearly every request; this
+        # gives the same result as urlsplit, which only needs to handle the
+        # others.
+        path, _, fragment = uri.partition(b"#")
+        path, _, query = path.partition(b"?")
+    elif uri[:2] == b"//":
         path = uri
 
         if b"#" in path:
@@ -382,6 +460,126 @@ def split_uri(uri):
     )
 
 
+def is_token(name):
+    """Return whether a header name is a valid RFC 7230 token."""
+    return bool(name) and not name.translate(None, TCHAR_BYTES)
+
+
+# Header names as received -> the keys of HTTPRequestParser.headers, shared
+# by every parser. Clients send a few dozen different names at most, but
+# nothing stops one from sending random ones, so the number of names kept is
+# bounded. Only valid names are remembered.
+header_keys = {}
+MAX_HEADER_KEYS = 1024
+
+
+def header_key(name):
+    """
+    Translate a header name to its key in ``HTTPRequestParser.headers``
+    (uppercase, with dashes turned into underscores), remembering it in
+    ``header_keys`` while there is room.
+    """
+    key = sys.intern(name.upper().replace(b"-", b"_").decode("latin-1"))
+
+    if len(header_keys) < MAX_HEADER_KEYS:
+        header_keys[bytes(name)] = key
+
+    return key
+
+
+# obs-fold: a header line continued on the next one
+FOLDED_RE = re.compile(rb"(?:^|\r\n)[ \t]")
+
+# The bytes allowed in a header block without obs-folds: header names are
+# tokens, which are all allowed in a value, and so is the colon after them
+HEADER_BLOCK_BYTES = FIELD_VALUE_BYTES + b"\r\n"
+
+
+class LazyHeaders(MutableMapping):
+    """
+    The headers of a request, keyed like ``HTTPRequestParser.headers``, whose
+    values are only split out of the header block and decoded when they are
+    first looked up.
+
+    The whole block is checked when the headers are parsed, with the same
+    rules as the eager parser, and for each header the offsets of its values
+    in the block are kept until it is looked up. Headers continued on several
+    lines are not supported.
+    """
+
+    def __init__(self, block):
+        crlfs = block.count(b"\r\n")
+
+        if block.count(b"\r") != crlfs or block.count(b"\n") != crlfs:
+            raise ParsingError("Bare CR or LF found in header")
+
+        # every value is valid if no byte of the block is outside of those
+        # allowed in a value, CR and LF only being found as line endings
+        if block.translate(None, HEADER_BLOCK_BYTES):
+            raise ParsingError("Invalid header")
+        self.block = block
+        # key -> decoded value, or (start, end, start, end, ...) offsets of
+        # its value(s) in block
+        self.values = values = {}
+        start = 0
+        size = len(block)
+
+        while start < size:
+            end = block.find(b"\r\n", start)
+
+            if end < 0:
+                end = size
+
+            if end > start:
+                colon = block.find(b":", start, end)
+
+                if colon < 0:
+                    raise ParsingError("Invalid header")
+
+                name = block[start:colon]
+                key = header_keys.get(name)
+
+                if key is None:
+                    if not is_token(name):
+                        raise ParsingError("Invalid header")
+                    key = header_key(name)
+
+                if b"_" not in name:
+                    values[key] = values.get(key, ()) + (colon + 1, end)
+            start = end + 2
+
+    def __getitem__(self, key):
+        value = self.values[key]
+
+        if value.__class__ is tuple:
+            block = self.block
+            parts = [
+                block[value[i] : value[i + 1]].strip(b" \t")
+                for i in range(0, len(value), 2)
+            ]
+            value = self.values[key] = b", ".join(parts).decode("latin-1")
+
+        return value
+
+    def __setitem__(self, key, value):
+        self.values[key] = value
+
+    def __delitem__(self, key):
+        del self.values[key]
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, list(self.values))
+
+
 def get_header_lines(header):
     """
     Splits the header into lines, putting multi-line headers together.
@@ -440,3 +638,36 @@ def crack_first_line(line):
         raise ParsingError('Malformed HTTP method "%s"' % str(method, "latin-1"))
 
     return method, uri, version
+
+
+def _parse_first_line(line):
+    # command, uri, version will be bytes
+    command, uri, version = crack_first_line(line)
+
+    if command == uri == version == b"":
+        raise ParsingError("Start line is invalid")
+
+    return (
+        command.decode("latin-1"),
+        version.decode("latin-1"),
+        uri.decode("latin-1"),
+        split_uri(uri),
+    )
+
+
+# Remember what the most recently used first lines were parsed to, as long as
+# they are short enough; requests such as health checks and polling are made
+# over and over again.
+_cached_parse_first_line = functools.lru_cache(maxsize=256)(_parse_first_line)
+MAX_CACHED_FIRST_LINE = 1024
+
+
+def parse_first_line(line):
+    """
+    Parse the first line of a request into its method, HTTP version and URI,
+    and the parts of the URI as returned by split_uri().
+    """
+    if len(line) > MAX_CACHED_FIRST_LINE:
+        return _parse_first_line(line)
+
+    return _cached_parse_first_line(line)
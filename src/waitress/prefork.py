@@ -0,0 +1,357 @@
+##############################################################################
+#
+# Copyright (c) 2024 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Pre-fork multi-process mode.
+
+The master process binds the listening sockets, forks ``workers`` child
+processes which each run an ordinary server on those sockets, and restarts
+any child that exits.  Workers may be recycled after serving a number of
+requests or once they use too much memory.
+"""
+
+import itertools
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from waitress.adjustments import Adjustments
+from waitress.aioserver import AsyncioWSGIServer
+from waitress.server import BaseWSGIServer, create_server
+from waitress.utilities import bind_sockets, logger
+
+# Exit status of a worker that could not load the application or create its
+# server.  The master shuts down instead of respawning it over and over.
+WORKER_BOOT_ERROR = 3
+
+# Adjustments telling the master where to listen.  Workers are handed the
+# master's bound ``sockets`` instead.
+LISTEN_ADJUSTMENTS = (
+    "host",
+    "port",
+    "listen",
+    "unix_socket",
+    "unix_socket_perms",
+    "sockets",
+)
+
+# Adjustments only the master acts upon; ``workers`` is passed on, the
+# workers' servers set wsgi.multiprocess from it.
+WORKER_ADJUSTMENTS = ("worker_max_requests", "worker_max_memory")
+
+
+def get_rss():
+    """Return the resident set size of this process in bytes, or ``None``
+    if it can not be determined."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+    # not the current but the peak usage, which is the best we can do here
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # pragma: no cover
+        return rss
+    return rss * 1024  # pragma: no cover
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+class WorkerMonitor:
+    """WSGI middleware counting the requests served by a worker, and the
+    thread that recycles the worker once it has served
+    ``worker_max_requests`` or its memory use exceeds ``worker_max_memory``.
+
+    Recycling stops accepting connections, gives the requests in progress
+    up to ``graceful_timeout`` seconds to finish and then stops the server.
+    """
+
+    # test shims
+    get_rss = staticmethod(get_rss)
+    kill = staticmethod(os.kill)
+    sleep = staticmethod(time.sleep)
+
+    # seconds between checks
+    interval = 1
+
+    def __init__(self, application, max_requests=0, max_memory=0, graceful_timeout=30):
+        self.application = application
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.graceful_timeout = graceful_timeout
+        self.requests = 0
+        self._counter = itertools.count(1)
+
+    def __call__(self, environ, start_response):
+        self.requests = next(self._counter)
+        return self.application(environ, start_response)
+
+    def start(self, server):
+        thread = threading.Thread(
+            target=self.run, args=(server,), name="waitress-worker-monitor"
+        )
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def should_recycle(self):
+        if self.max_requests and self.requests >= self.max_requests:
+            logger.info(
+                "Worker (pid: %s) recycling after %s requests",
+                os.getpid(),
+                self.requests,
+            )
+            return True
+        if self.max_memory:
+            rss = self.get_rss()
+            if rss is not None and rss > self.max_memory:
+                logger.info(
+                    "Worker (pid: %s) recycling at %s bytes of memory",
+                    os.getpid(),
+                    rss,
+                )
+                return True
+        return False
+
+    def run(self, server):
+        while not self.should_recycle():
+            self.sleep(self.interval)
+        self.recycle(server)
+
+    def recycle(self, server):
+        # the other workers keep accepting connections on the shared sockets
+        if isinstance(server, AsyncioWSGIServer):
+            listeners = [server]
+            server.loop.call_soon_threadsafe(server.stop_accepting)
+        else:
+            if isinstance(server, BaseWSGIServer):
+                listeners = [server]
+            else:
+                listeners = [
+                    obj
+                    for obj in server.map.values()
+                    if isinstance(obj, BaseWSGIServer)
+                ]
+            for listener in listeners:
+                listener.accepting = False
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.busy(listeners) and time.monotonic() < deadline:
+            self.sleep(0.1)
+        # raises SystemExit in the main thread, which shuts the server down
+        self.kill(os.getpid(), signal.SIGTERM)
+
+    def busy(self, listeners):
+        for listener in listeners:
+            for channel in list(listener.active_channels.values()):
+                if channel.requests or channel.total_outbufs_len:
+                    return True
+        return False
+
+
+class Arbiter:
+    """Forks ``workers`` processes serving the application on the sockets
+    bound by this (master) process, restarts those that exit and stops them
+    all on SIGINT or SIGTERM.
+
+    ``app_factory`` is called without arguments to get the WSGI application,
+    once in the master if ``preload`` is true (so the workers share its
+    memory copy-on-write), or else in every worker after it is forked.
+    """
+
+    # test shims
+    osmod = os
+    server_factory = staticmethod(create_server)
+    worker_monitor = WorkerMonitor
+    sleep = staticmethod(time.sleep)
+
+    # seconds between checks of the workers
+    interval = 1
+
+    # seconds workers get to finish their requests when stopped or recycled
+    graceful_timeout = 30
+
+    quiet = False
+
+    def __init__(self, app_factory, preload=True, **kw):
+        self.adj = Adjustments(**kw)
+        self.app_factory = app_factory
+        self.preload = preload
+        self.application = None
+        self.sockets = []
+        self.workers = {}  # pid -> worker number
+        self.alive = True
+        self.worker_kw = {k: v for k, v in kw.items() if k not in WORKER_ADJUSTMENTS}
+        # with SO_REUSEPORT every worker binds its own socket and the kernel
+        # balances the connections between them
+        self.bind_in_workers = bool(
+            self.adj.reuse_port and not self.adj.unix_socket and not self.adj.sockets
+        )
+
+    def run(self):
+        if not self.bind_in_workers:
+            self.sockets = bind_sockets(self.adj)
+            for k in LISTEN_ADJUSTMENTS:
+                self.worker_kw.pop(k, None)
+            self.worker_kw["sockets"] = self.sockets
+        if not self.quiet:  # pragma: no cover
+            self.print_listen("Serving on http://{}:{}")
+        try:
+            if self.preload:
+                self.application = self.app_factory()
+            signal.signal(signal.SIGINT, self.handle_signal)
+            signal.signal(signal.SIGTERM, self.handle_signal)
+            while self.alive:
+                self.reap_workers()
+                if self.alive:
+                    self.spawn_workers()
+                self.sleep(self.interval)
+        finally:
+            self.stop()
+            for sock in self.sockets:
+                sock.close()
+
+    def handle_signal(self, signum, frame):
+        self.alive = False
+
+    def spawn_workers(self):
+        running = set(self.workers.values())
+        for number in range(1, self.adj.workers + 1):
+            if number not in running:
+                self.spawn_worker(number)
+
+    def spawn_worker(self, number):
+        pid = self.osmod.fork()
+        if pid:
+            self.workers[pid] = number
+            logger.info("Booted worker %s (pid: %s)", number, pid)
+            return pid
+        status = 1
+        try:
+            status = self.run_worker(number)
+        except BaseException:
+            logger.exception("Worker %s exited with an error", number)
+        finally:
+            self.osmod._exit(status)
+
+    def run_worker(self, number):
+        """Runs in the forked child; returns the child's exit status."""
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+        try:
+            application = self.application
+            if not self.preload:
+                application = self.app_factory()
+            monitor = None
+            if self.adj.worker_max_requests or self.adj.worker_max_memory:
+                application = monitor = self.worker_monitor(
+                    application,
+                    max_requests=self.adj.worker_max_requests,
+                    max_memory=self.adj.worker_max_memory,
+                    graceful_timeout=self.graceful_timeout,
+                )
+            server = self.server_factory(application, **self.worker_kw)
+        except Exception:
+            logger.exception("Worker %s failed to boot", number)
+            return WORKER_BOOT_ERROR
+        if monitor is not None:
+            monitor.start(server)
+        server.run()
+        return 0
+
+    def reap_workers(self):
+        while self.workers:
+            try:
+                pid, status = self.osmod.waitpid(-1, self.osmod.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                break
+            number = self.workers.pop(pid, None)
+            if number is None:
+                continue
+            if self.osmod.WIFSIGNALED(status):
+                logger.warning(
+                    "Worker %s (pid: %s) was killed by signal %s",
+                    number,
+                    pid,
+                    self.osmod.WTERMSIG(status),
+                )
+                continue
+            code = self.osmod.WEXITSTATUS(status)
+            if code == WORKER_BOOT_ERROR:
+                logger.error("Worker %s (pid: %s) failed to boot", number, pid)
+                self.alive = False
+            elif code and self.alive:
+                logger.warning(
+                    "Worker %s (pid: %s) exited with status %s", number, pid, code
+                )
+
+    def kill_workers(self, signum):
+        for pid in list(self.workers):
+            try:
+                self.osmod.kill(pid, signum)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+
+    def stop(self):
+        self.alive = False
+        self.kill_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while True:
+            self.reap_workers()
+            if not self.workers or time.monotonic() >= deadline:
+                break
+            self.sleep(0.1)
+        self.kill_workers(signal.SIGKILL)
+        for pid in list(self.workers):
+            try:
+                self.osmod.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            del self.workers[pid]
+
+    def print_listen(self, format_str):  # pragma: no cover
+        if self.bind_in_workers:
+            listen = [sockaddr[:2] for (_, _, _, sockaddr) in self.adj.listen]
+        else:
+            listen = []
+            for sock in self.sockets:
+                if sock.family in (socket.AF_INET, socket.AF_INET6):
+                    listen.append(
+                        socket.getnameinfo(
+                            sock.getsockname(),
+                            socket.NI_NUMERICHOST | socket.NI_NUMERICSERV,
+                        )
+                    )
+                else:
+                    listen.append(("unix", sock.getsockname()))
+        for host, port in listen:
+            if ":" in host:
+                host = f"[{host}]"
+            logger.info(format_str.format(host, port))
+
+
+def serve_workers(app_factory, preload=True, _quiet=False, **kw):
+    """Serve the application returned by ``app_factory`` from ``workers``
+    forked processes.  See :class:`Arbiter`."""
+    arbiter = Arbiter(app_factory, preload=preload, **kw)
+    arbiter.quiet = _quiet
+    arbiter.run()
@@ -73,3 +73,16 @@ HEADER_FIELD_RE = re.compile(
 QUOTED_PAIR_RE = re.compile(QUOTED_PAIR)
 QUOTED_STRING_RE = re.compile(QUOTED_STRING)
 CHUNK_EXT_RE = re.compile(("^" + CHUNK_EXT + "$").encode("latin-1"))
+
+
+def _bytes_in(char_class):
+    pattern = re.compile(char_class.encode("latin-1"))
+    return bytes(c for c in range(256) if pattern.match(bytes((c,))))
+
+
+# The bytes allowed in a header field's name (a token) and in its value,
+# including the whitespace in it and around it, for checking them with
+# bytes.translate(None, ...) instead of HEADER_FIELD_RE: whatever is left
+# over is invalid.
+TCHAR_BYTES = _bytes_in(TCHAR)
+FIELD_VALUE_BYTES = _bytes_in("[ \t" + VCHAR + OBS_TEXT + "]")
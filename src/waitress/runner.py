@@ -23,7 +23,8 @@ import re
 import sys
 
 from waitress import serve
-from waitress.adjustments import Adjustments
+from waitress.adjustments import Adjustments, asbool
+from waitress.prefork import serve_workers
 from waitress.utilities import logger
 
 HELP = """\
@@ -39,6 +40,10 @@ Standard options:
     --call
         Call the given object to get the WSGI application.
 
+    --no-preload
+        With --workers, import the application in each worker process after
+        it is forked instead of once in the master process before forking.
+
     --host=ADDR
         Hostname or IP address on which to listen, default is '0.0.0.0',
         which means "all IP addresses on this host".
@@ -112,9 +117,45 @@ Tuning options:
     --threads=INT
         Number of threads used to process application logic, default is 4.
 
+    --event-loops=INT
+        Number of threads running a main loop (accepting, reading, parsing
+        and flushing connections). Accepted connections are spread across
+        them. Default is 1.
+
+    --workers=INT
+        Number of worker processes forked by a master process, which binds
+        the listening sockets, supervises the workers and restarts those
+        that exit. Default is 0 (serve from a single process).
+
+    --worker-max-requests=INT
+        Recycle a worker process after it has served this many requests.
+        Default is 0 (never).
+
+    --worker-max-memory=INT
+        Recycle a worker process once its resident memory exceeds this
+        many bytes. Default is 0 (never).
+
     --backlog=INT
         Connection backlog for the server. Default is 1024.
 
+    --reuse-port
+        Set SO_REUSEPORT on the listening TCP sockets. With --workers, each
+        worker binds its own socket and the kernel balances connections
+        between them. Default is False.
+
+    --tcp-defer-accept=INT
+        Set TCP_DEFER_ACCEPT to this many seconds on the listening TCP
+        sockets, so that connections are only accepted once the client sent
+        data. Linux only. Default is 0 (not set).
+
+    --tcp-notsent-lowat=INT
+        Set TCP_NOTSENT_LOWAT to this many bytes on accepted TCP connections.
+        Default is 0 (not set).
+
+    --[no-]tcp-quickack
+        Toggle setting TCP_QUICKACK on accepted TCP connections. Linux only.
+        Off by default.
+
     --recv-bytes=INT
         Number of bytes to request when calling socket.recv(). Default is
         8192.
@@ -136,19 +177,49 @@ Tuning options:
         A temporary file should be created if the pending input is larger
         than this. Default is 524288 (512KB).
 
+    --[no-]background-disk-io
+        Toggle whether the output and input that overflowed to temporary files
+        are written and read by a separate thread instead of the main loop.
+        Off by default.
+
+    --[no-]stream-request-body
+        Toggle whether to start servicing a request as soon as its headers
+        are received, streaming its body to the application instead of
+        buffering the whole body first. Off by default.
+
     --connection-limit=INT
         Stop creating new channels if too many are already active.
         Default is 100.
 
+    --accept-budget=INT
+        Maximum number of connections to accept each time a listening
+        socket is readable. Default is 64.
+
     --cleanup-interval=INT
-        Minimum seconds between cleaning up inactive channels. Default
-        is 30. See '--channel-timeout'.
+        Deprecated, no longer used. Inactive channels are closed within a
+        second of timing out. Default is 30. See '--channel-timeout'.
 
     --channel-timeout=INT
         Maximum number of seconds to leave inactive connections open.
         Default is 120. 'Inactive' is defined as 'has received no data
         from the client and has sent no data to the client'.
 
+    --header-timeout=INT
+        Maximum number of seconds a client may take to send the headers of
+        a request. Default is 0 (use '--channel-timeout').
+
+    --body-timeout=INT
+        Maximum number of seconds to wait for more of a request body.
+        Default is 0 (use '--channel-timeout').
+
+    --keepalive-timeout=INT
+        Maximum number of seconds to leave a connection open while waiting
+        for its next request. Default is 0 (use '--channel-timeout').
+
+    --write-timeout=INT
+        Maximum number of seconds to wait for a client to read more of a
+        response. Default is 0 (use '--channel-timeout').
+
     --[no-]log-socket-errors
         Toggle whether premature client disconnect tracebacks ought to be
         logged. On by default.
@@ -157,6 +228,10 @@ Tuning options:
         Maximum size of all request headers combined. Default is 262144
         (256KB).
 
+    --[no-]lazy-headers
+        Toggle whether to check the request headers in one pass and decode
+        the value of a header only when it is looked up. Off by default.
+
     --max-request-body-size=INT
         Maximum size of request body. Default is 1073741824 (1GB).
 
@@ -171,6 +246,21 @@ Tuning options:
         The use_poll argument passed to ``asyncore.loop()``. Helps overcome
         open file descriptors limit. Default is False.
 
+    --asyncore-use-selector
+        Use a persistent selectors-based event loop (epoll on Linux, kqueue
+        on BSD/macOS) that registers each socket once instead of rebuilding
+        the select()/poll() set on every iteration. Takes precedence over
+        --asyncore-use-poll. Default is False.
+
+    --backend=NAME
+        The main loop implementation, either "asyncore" (waitress' own loop)
+        or "asyncio". The --asyncore-* and --event-loops options only apply
+        to "asyncore". Default is "asyncore".
+
+    --asyncio-use-uvloop
+        Run the asyncio backend on uvloop's event loop, which must be
+        installed. Default is False.
+
     --channel-request-lookahead=INT
         Allows channels to stay readable and buffer more requests up to the
         given maximum even if a request is already being processed. This allows
@@ -244,7 +334,7 @@ def show_exception(stream):
         print("It had no arguments.", file=stream)
 
 
-def run(argv=sys.argv, _serve=serve):
+def run(argv=sys.argv, _serve=serve, _serve_workers=serve_workers):
     """Command line runner."""
     name = os.path.basename(argv[0])
 
@@ -278,6 +368,22 @@ def run(argv=sys.argv, _serve=serve):
     # Add the current directory onto sys.path
     sys.path.append(os.getcwd())
 
+    # These arguments are specific to the runner, not waitress itself.
+    call = kw.pop("call")
+    preload = asbool(kw.pop("preload"))
+    del kw["help"]
+
+    def load_app():
+        app = resolve(module, obj_name)
+        if call:
+            app = app()
+        return app
+
+    if not preload and int(kw.get("workers") or 0):
+        # Every worker imports the application itself after being forked.
+        _serve_workers(load_app, preload=False, **kw)
+        return 0
+
     # Get the WSGI function.
     try:
         app = resolve(module, obj_name)
@@ -289,11 +395,8 @@ def run(argv=sys.argv, _serve=serve):
         show_help(sys.stderr, name, f"Bad object name '{obj_name}'")
         show_exception(sys.stderr)
         return 1
-    if kw["call"]:
+    if call:
         app = app()
 
-    # These arguments are specific to the runner, not waitress itself.
-    del kw["call"], kw["help"]
-
     _serve(app, **kw)
     return 0
@@ -12,16 +12,20 @@
 #
 ##############################################################################
 
+import itertools
 import os
 import os.path
 import socket
+import threading
 import time
 
 from waitress import trigger
 from waitress.adjustments import Adjustments
+from waitress.aioserver import AsyncioWSGIServer
 from waitress.channel import HTTPChannel
 from waitress.compat import IPPROTO_IPV6, IPV6_V6ONLY
 from waitress.task import ThreadedTaskDispatcher
+from waitress.timers import TimerWheel
 from waitress.utilities import cleanup_unix_socket
 
 from . import wasyncore
@@ -56,6 +60,13 @@ def create_server(
         dispatcher = ThreadedTaskDispatcher()
         dispatcher.set_thread_count(adj.threads)
 
+    if adj.backend == "asyncio":
+        # a single server for all of the sockets, running on its own loop
+        return AsyncioWSGIServer(application, _start, dispatcher=dispatcher, adj=adj)
+
+    # The additional event loops are shared by all of the listening sockets
+    event_loops = create_event_loops(adj)
+
     if adj.unix_socket and hasattr(socket, "AF_UNIX"):
         sockinfo = (socket.AF_UNIX, socket.SOCK_STREAM, None, None)
         return UnixWSGIServer(
@@ -66,6 +77,7 @@ def create_server(
             dispatcher=dispatcher,
             adj=adj,
             sockinfo=sockinfo,
+            loops=event_loops,
         )
 
     effective_listen = []
@@ -83,6 +95,7 @@ def create_server(
                 dispatcher=dispatcher,
                 adj=adj,
                 sockinfo=sockinfo,
+                loops=event_loops,
             )
             effective_listen.append(
                 (last_serv.effective_host, last_serv.effective_port)
@@ -100,6 +113,7 @@ def create_server(
                 adj=adj,
                 bind_socket=False,
                 sockinfo=sockinfo,
+                loops=event_loops,
             )
             effective_listen.append(
                 (last_serv.effective_host, last_serv.effective_port)
@@ -114,6 +128,7 @@ def create_server(
                 adj=adj,
                 bind_socket=False,
                 sockinfo=sockinfo,
+                loops=event_loops,
             )
             effective_listen.append(
                 (last_serv.effective_host, last_serv.effective_port)
@@ -129,7 +144,84 @@ def create_server(
     # Return a class that has a utility function to print out the sockets it's
     # listening on, and has a .run() function. All of the TcpWSGIServers
     # registered themselves in the map above.
-    return MultiSocketServer(map, adj, effective_listen, dispatcher, log_info)
+    return MultiSocketServer(
+        map, adj, effective_listen, dispatcher, log_info, event_loops=event_loops
+    )
+
+
+def create_event_loops(adj):
+    """Create the additional event loops requested by ``adj.event_loops``;
+    the server's own loop counts as the first one."""
+    return [
+        EventLoop(adj, name=f"waitress-loop-{loop_no}")
+        for loop_no in range(1, adj.event_loops)
+    ]
+
+
+class EventLoop:
+    """An additional main loop, running in its own thread with its own socket
+    map and trigger, that services a share of the channels accepted by the
+    server(s) using it. Requests are still handed to the server's task
+    dispatcher, which is shared by all of the loops."""
+
+    asyncore = wasyncore  # test shim
+    thread = None
+    closed = False
+
+    def __init__(self, adj, name="waitress-loop"):
+        self.adj = adj
+        self.name = name
+        self.map = {}
+        self.trigger = trigger.trigger(self.map)
+
+    def start(self):
+        if self.thread is None and not self.closed:
+            self.thread = threading.Thread(target=self.run, name=self.name)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def run(self):
+        self.asyncore.loop(
+            timeout=self.adj.asyncore_loop_timeout,
+            map=self.map,
+            use_poll=self.adj.asyncore_use_poll,
+            use_selector=self.adj.asyncore_use_selector,
+        )
+
+    def pull_trigger(self, thunk=None):
+        self.trigger.pull_trigger(thunk)
+
+    def connection_count(self):
+        """Return the number of channels in this loop's map."""
+        # its trigger is in the map too until the loop is closed
+        return len(self.map) - (self.trigger._fileno in self.map)
+
+    def add_channel(self, server, sock, addr):
+        """Create a channel for an accepted socket; the channel is created by
+        this loop's thread so that it never sees a half-initialized one."""
+
+        def create_channel():
+            try:
+                channel = server.channel_class(
+                    server, sock, addr, server.adj, map=self.map
+                )
+            except BaseException:
+                sock.close()
+                raise
+            channel.loop = self
+
+        self.pull_trigger(create_channel)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread is None:
+            wasyncore.close_all(self.map)
+        else:
+            # closing everything in the map, including the trigger, will end
+            # the loop in its own thread
+            self.pull_trigger(lambda: wasyncore.close_all(self.map))
 
 
 # This class is only ever used if we have multiple listen sockets. It allows
@@ -145,12 +237,14 @@ class MultiSocketServer:
         effective_listen=None,
         dispatcher=None,
         log_info=None,
+        event_loops=None,
     ):
         self.adj = adj
         self.map = map
         self.effective_listen = effective_listen
         self.task_dispatcher = dispatcher
         self.log_info = log_info
+        self.event_loops = event_loops or []
 
     def print_listen(self, format_str):  # pragma: nocover
         for l in self.effective_listen:
@@ -162,26 +256,61 @@ class MultiSocketServer:
             self.log_info(format_str.format(*l))
 
     def run(self):
+        for loop in self.event_loops:
+            loop.start()
         try:
             self.asyncore.loop(
                 timeout=self.adj.asyncore_loop_timeout,
                 map=self.map,
                 use_poll=self.adj.asyncore_use_poll,
+                use_selector=self.adj.asyncore_use_selector,
             )
         except (SystemExit, KeyboardInterrupt):
             self.close()
 
     def close(self):
         self.task_dispatcher.shutdown()
+        for loop in self.event_loops:
+            loop.close()
         wasyncore.close_all(self.map)
 
 
+def accepted_socket_options(adj):
+    """
+    Return the (level, optname, value) socket options to set on accepted TCP
+    connections: ``adj.socket_options`` and those of the ``tcp_*``
+    adjustments that are set.
+    """
+    options = list(adj.socket_options)
+    if adj.tcp_notsent_lowat:
+        options.append(
+            (socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, adj.tcp_notsent_lowat)
+        )
+    if adj.tcp_quickack:
+        options.append((socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1))
+    return options
+
+
 class BaseWSGIServer(wasyncore.dispatcher):
     channel_class = HTTPChannel
     next_channel_cleanup = 0
     socketmod = socket  # test shim
     asyncore = wasyncore  # test shim
     in_connection_overflow = False
+    # The part of the WSGI environ that is the same for every request to this
+    # server, set up by the first task
+    environ_template = None
+    # SO_SNDBUF of the accepted sockets, found out by the first channel
+    sendbuf_len = None
+    # The (level, optname, value) socket options set on accepted sockets,
+    # worked out on the first accept
+    accepted_socket_options = None
+
+    # accept() statistics, to help sizing ``backlog`` and ``accept_budget``
+    accepted_connections = 0  # connections accepted
+    accept_batches = 0  # times the listening socket was found readable
+    accept_batch_max = 0  # most connections accepted at once
+    accept_budget_exhausted = 0  # times the budget ran out before the backlog
 
     def __init__(
         self,
@@ -193,6 +322,7 @@ class BaseWSGIServer(wasyncore.dispatcher):
         adj=None,  # adjustments
         sockinfo=None,  # opaque object
         bind_socket=True,
+        loops=None,  # additional EventLoops to hand channels to
         **kw
     ):
         if adj is None:
@@ -231,6 +361,12 @@ class BaseWSGIServer(wasyncore.dispatcher):
             dispatcher.set_thread_count(self.adj.threads)
 
         self.task_dispatcher = dispatcher
+        if loops is None:
+            loops = create_event_loops(adj)
+        self.event_loops = loops
+        # None stands for our own loop, which takes its turn last as it is
+        # also the one doing the accepting
+        self._next_event_loop = itertools.cycle(loops + [None]).__next__
         self.asyncore.dispatcher.__init__(self, _sock, map=map)
         if _sock is None:
             self.create_socket(self.family, self.socktype)
@@ -239,12 +375,21 @@ class BaseWSGIServer(wasyncore.dispatcher):
 
         self.set_reuse_addr()
 
+        if self.family in (socket.AF_INET, socket.AF_INET6):
+            if adj.reuse_port:
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            if adj.tcp_defer_accept:
+                self.socket.setsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, adj.tcp_defer_accept
+                )
+
         if bind_socket:
             self.bind_server_socket()
 
         self.effective_host, self.effective_port = self.getsockname()
         self.server_name = adj.server_name
         self.active_channels = {}
+        self.timers = TimerWheel()
         if _start:
             self.accept_connections()
 
@@ -261,16 +406,23 @@ class BaseWSGIServer(wasyncore.dispatcher):
     def add_task(self, task):
         self.task_dispatcher.add_task(task)
 
+    def connection_count(self):
+        count = len(self._map)
+        for loop in self.event_loops:
+            count += loop.connection_count()
+        return count
+
     def readable(self):
         now = time.time()
         if now >= self.next_channel_cleanup:
-            self.next_channel_cleanup = now + self.adj.cleanup_interval
+            self.next_channel_cleanup = now + self.timers.resolution
             self.maintenance(now)
 
         if self.accepting:
+            connection_count = self.connection_count()
             if (
                 not self.in_connection_overflow
-                and len(self._map) >= self.adj.connection_limit
+                and connection_count >= self.adj.connection_limit
             ):
                 self.in_connection_overflow = True
                 self.logger.warning(
@@ -279,7 +431,7 @@ class BaseWSGIServer(wasyncore.dispatcher):
                 )
             elif (
                 self.in_connection_overflow
-                and len(self._map) < self.adj.connection_limit
+                and connection_count < self.adj.connection_limit
             ):
                 self.in_connection_overflow = False
                 self.logger.info(
@@ -299,36 +451,72 @@ class BaseWSGIServer(wasyncore.dispatcher):
         pass
 
     def handle_accept(self):
-        try:
-            v = self.accept()
+        # Drain the backlog, up to adj.accept_budget connections, rather than
+        # accepting a single connection each time around the main loop. The
+        # first one is always accepted, readable() has checked the
+        # connection limit for it.
+        budget = min(
+            self.adj.accept_budget,
+            max(self.adj.connection_limit - self.connection_count(), 1),
+        )
+        accepted = []
+        while len(accepted) < budget:
+            try:
+                v = self.accept()
+            except OSError:
+                # Linux: On rare occasions we get a bogus socket back from
+                # accept.  socketmodule.c:makesockaddr complains that the
+                # address family is unknown.  We don't want the whole server
+                # to shut down because of this.
+                self._log_accept_error()
+                break
             if v is None:
-                return
-            conn, addr = v
-            self.set_socket_options(conn)
-        except OSError:
-            # Linux: On rare occasions we get a bogus socket back from
-            # accept.  socketmodule.c:makesockaddr complains that the
-            # address family is unknown.  We don't want the whole server
-            # to shut down because of this.
-            # macOS: On occasions when the remote has already closed the socket
-            # before we got around to accepting it, when we try to set the
-            # socket options it will fail. So instead just we log the error and
-            # continue
-            if self.adj.log_socket_errors:
-                self.logger.warning("server accept() threw an exception", exc_info=True)
-            return
-        addr = self.fix_addr(addr)
-        self.channel_class(self, conn, addr, self.adj, map=self._map)
+                break
+            accepted.append(v)
+        else:
+            if budget == self.adj.accept_budget:
+                self.accept_budget_exhausted += 1
+
+        self.accept_batches += 1
+        self.accepted_connections += len(accepted)
+        self.accept_batch_max = max(self.accept_batch_max, len(accepted))
+
+        for conn, addr in accepted:
+            try:
+                self.set_socket_options(conn)
+            except OSError:
+                # macOS: On occasions when the remote has already closed the
+                # socket before we got around to accepting it, when we try to
+                # set the socket options it will fail. So instead just we log
+                # the error and continue
+                self._log_accept_error()
+                conn.close()
+                continue
+            addr = self.fix_addr(addr)
+            loop = self._next_event_loop()
+            if loop is None:
+                self.channel_class(self, conn, addr, self.adj, map=self._map)
+            else:
+                loop.add_channel(self, conn, addr)
+
+    def _log_accept_error(self):
+        if self.adj.log_socket_errors:
+            self.logger.warning("server accept() threw an exception", exc_info=True)
 
     def run(self):
+        for loop in self.event_loops:
+            loop.start()
         try:
             self.asyncore.loop(
                 timeout=self.adj.asyncore_loop_timeout,
                 map=self._map,
                 use_poll=self.adj.asyncore_use_poll,
+                use_selector=self.adj.asyncore_use_selector,
             )
         except (SystemExit, KeyboardInterrupt):
             self.task_dispatcher.shutdown()
+            for loop in self.event_loops:
+                loop.close()
 
     def pull_trigger(self):
         self.trigger.pull_trigger()
@@ -341,20 +529,38 @@ class BaseWSGIServer(wasyncore.dispatcher):
 
     def maintenance(self, now):
         """
-        Closes channels that have not had any activity in a while.
+        Closes channels that have timed out.
 
-        The timeout is configured through adj.channel_timeout (seconds).
+        Channels arm a timer in ``self.timers`` for when they would time out
+        in their current state (see ``HTTPChannel.timeout_deadline``); only
+        the channels whose timer has expired are looked at.
         """
-        cutoff = now - self.adj.channel_timeout
-        for channel in self.active_channels.values():
-            if (not channel.requests) and channel.last_activity < cutoff:
-                channel.will_close = True
+        for channel in self.timers.expire(now):
+            # channels serviced by other event loops may have seen some
+            # activity since their timer was armed
+            deadline = channel.timeout_deadline()
+            if deadline is None:
+                # a task is servicing a request, it re-arms the timer when done
+                continue
+            if deadline > now:
+                self.timers.schedule(channel, deadline)
+                continue
+            # the channel is closed by the loop servicing it, and not right
+            # away: this is called while the loop builds the list of sockets
+            # to poll
+            loop = channel.loop
+            if loop is None:
+                self.trigger.pull_trigger(channel.handle_timeout)
+            else:
+                loop.pull_trigger(channel.handle_timeout)
 
     def print_listen(self, format_str):  # pragma: no cover
         self.log_info(format_str.format(self.effective_host, self.effective_port))
 
     def close(self):
         self.trigger.close()
+        for loop in self.event_loops:
+            loop.close()
         return wasyncore.dispatcher.close(self)
 
 
@@ -371,7 +577,10 @@ class TcpWSGIServer(BaseWSGIServer):
         )
 
     def set_socket_options(self, conn):
-        for level, optname, value in self.adj.socket_options:
+        options = self.accepted_socket_options
+        if options is None:
+            options = self.accepted_socket_options = accepted_socket_options(self.adj)
+        for level, optname, value in options:
             conn.setsockopt(level, optname, value)
 
 
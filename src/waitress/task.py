@@ -26,6 +26,25 @@ rename_headers = {  # or keep them without the HTTP_ prefix added
     "CONTENT_TYPE": "CONTENT_TYPE",
 }
 
+server_protocols = {"1.0": "HTTP/1.0", "1.1": "HTTP/1.1"}
+
+# Keys of HTTPRequestParser.headers -> their environ keys, bounded like
+# waitress.parser.header_keys
+environ_keys = dict(rename_headers)
+MAX_ENVIRON_KEYS = 1024
+
+
+def environ_key(key):
+    """Return the environ key of a request header, remembering it in
+    ``environ_keys`` while there is room."""
+    mykey = sys.intern("HTTP_" + key)
+
+    if len(environ_keys) < MAX_ENVIRON_KEYS:
+        environ_keys[key] = mykey
+
+    return mykey
+
+
 hop_by_hop = frozenset(
     (
         "connection",
@@ -491,6 +510,44 @@ class WSGITask(Task):
             if can_close_app_iter and hasattr(app_iter, "close"):
                 app_iter.close()
 
+    def get_server_environ(self):
+        """Returns the part of the WSGI environment that is the same for
+        every request to the server."""
+        server = self.channel.server
+        adj = server.adj
+        return {
+            "SERVER_PORT": str(server.effective_port),
+            "SERVER_NAME": server.server_name,
+            "SERVER_SOFTWARE": adj.ident,
+            "SCRIPT_NAME": adj.url_prefix,
+            # the following environment variables are required by the WSGI spec
+            "wsgi.version": (1, 0),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": adj.workers > 0,
+            "wsgi.run_once": False,
+            "wsgi.file_wrapper": ReadOnlyFileBasedBuffer,
+            "wsgi.input_terminated": True,  # wsgi.input is EOF terminated
+        }
+
+    def get_channel_environ(self):
+        """Returns the part of the WSGI environment that is the same for
+        every request on the channel."""
+        channel = self.channel
+        server = channel.server
+        template = server.environ_template
+        if template is None:
+            template = server.environ_template = self.get_server_environ()
+        environ = template.copy()
+        environ["REMOTE_ADDR"] = channel.addr[0]
+        # Nah, we aren't actually going to look up the reverse DNS for
+        # REMOTE_ADDR, but we will happily set this environment variable
+        # for the WSGI application. Spec says we can just set this to
+        # REMOTE_ADDR, so we do.
+        environ["REMOTE_HOST"] = channel.addr[0]
+        # try and set the REMOTE_PORT to something useful, but maybe None
+        environ["REMOTE_PORT"] = str(channel.addr[1])
+        return environ
+
     def get_environment(self):
         """Returns a WSGI environment."""
         environ = self.environ
@@ -525,41 +582,31 @@ class WSGITask(Task):
                 if path.startswith(url_prefix_with_trailing_slash):
                     path = path[len(url_prefix) :]
 
-        environ = {
-            "REMOTE_ADDR": channel.addr[0],
-            # Nah, we aren't actually going to look up the reverse DNS for
-            # REMOTE_ADDR, but we will happily set this environment variable
-            # for the WSGI application. Spec says we can just set this to
-            # REMOTE_ADDR, so we do.
-            "REMOTE_HOST": channel.addr[0],
-            # try and set the REMOTE_PORT to something useful, but maybe None
-            "REMOTE_PORT": str(channel.addr[1]),
-            "REQUEST_METHOD": request.command.upper(),
-            "SERVER_PORT": str(server.effective_port),
-            "SERVER_NAME": server.server_name,
-            "SERVER_SOFTWARE": server.adj.ident,
-            "SERVER_PROTOCOL": "HTTP/%s" % self.version,
-            "SCRIPT_NAME": url_prefix,
-            "PATH_INFO": path,
-            "REQUEST_URI": request.request_uri,
-            "QUERY_STRING": request.query,
-            "wsgi.url_scheme": request.url_scheme,
-            # the following environment variables are required by the WSGI spec
-            "wsgi.version": (1, 0),
-            # apps should use the logging module
-            "wsgi.errors": sys.stderr,
-            "wsgi.multithread": True,
-            "wsgi.multiprocess": False,
-            "wsgi.run_once": False,
-            "wsgi.input": request.get_body_stream(),
-            "wsgi.file_wrapper": ReadOnlyFileBasedBuffer,
-            "wsgi.input_terminated": True,  # wsgi.input is EOF terminated
-        }
-
-        for key, value in dict(request.headers).items():
-            mykey = rename_headers.get(key, None)
+        # start from a copy of what is the same for every request on the
+        # channel, so that the environ is a new plain dict as usual
+        template = channel.environ_template
+        if template is None:
+            template = channel.environ_template = self.get_channel_environ()
+        environ = template.copy()
+        environ["REQUEST_METHOD"] = request.command.upper()
+        environ["SERVER_PROTOCOL"] = server_protocols.get(
+            self.version, "HTTP/" + self.version
+        )
+        environ["PATH_INFO"] = path
+        environ["REQUEST_URI"] = request.request_uri
+        environ["QUERY_STRING"] = request.query
+        environ["wsgi.url_scheme"] = request.url_scheme
+        # apps should use the logging module
+        environ["wsgi.errors"] = sys.stderr
+        environ["wsgi.input"] = request.get_body_stream()
+
+        # PEP 3333 wants a plain dict, so this decodes every value of
+        # LazyHeaders; with lazy_headers it is done here instead of on the
+        # main loop
+        for key, value in request.headers.items():
+            mykey = environ_keys.get(key)
             if mykey is None:
-                mykey = "HTTP_" + key
+                mykey = environ_key(key)
             if mykey not in environ:
                 environ[mykey] = value
 
@@ -568,6 +615,11 @@ class WSGITask(Task):
         # channel_request_lookahead larger than 0.
         environ["waitress.client_disconnected"] = self.channel.check_client_disconnected
 
+        # Insert a callable that returns a read-only memoryview of the whole
+        # request body, mapped from its temporary file if it was spooled to
+        # disk, for applications that can work on it without copying.
+        environ["waitress.input_view"] = request.get_body_view
+
         # cache the environ for this request
         self.environ = environ
         return environ
@@ -0,0 +1,92 @@
+##############################################################################
+#
+# Copyright (c) 2024 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Timers for the channel timeouts."""
+
+import threading
+import time
+
+
+class TimerWheel:
+    """A hashed timer wheel.
+
+    Deadlines are rounded down to ``resolution`` seconds and hashed into one
+    of ``slots`` buckets; scheduling, cancelling and expiring a timer are all
+    O(1), and ``expire()`` only looks at the buckets whose time has come
+    since it was last called. Deadlines further away than a full turn of the
+    wheel stay in their bucket until the wheel has come around to them.
+
+    Any hashable object can be used as a key; each key has at most one
+    deadline. The wheel may be used from several threads.
+    """
+
+    def __init__(self, resolution=1, slots=512, now=None):
+        if now is None:
+            now = time.time()
+        self.resolution = resolution
+        self.slots = [set() for _ in range(slots)]
+        # key -> (deadline, slot number)
+        self.deadlines = {}
+        self.tick = self._tick(now)
+        self.lock = threading.Lock()
+
+    def _tick(self, when):
+        return int(when // self.resolution)
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def schedule(self, key, deadline):
+        """Schedule ``key`` to expire at ``deadline``, replacing any deadline
+        it already had."""
+        with self.lock:
+            self._remove(key)
+            # deadlines that have already passed go into the current bucket,
+            # which the next expire() looks at
+            slot = max(self._tick(deadline), self.tick) % len(self.slots)
+            self.slots[slot].add(key)
+            self.deadlines[key] = (deadline, slot)
+
+    def cancel(self, key):
+        """Forget about ``key``; does nothing if it isn't scheduled."""
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self.deadlines.pop(key, None)
+        if entry is not None:
+            self.slots[entry[1]].discard(key)
+
+    def deadline(self, key):
+        """Return the deadline ``key`` is scheduled for, or None."""
+        entry = self.deadlines.get(key)
+        if entry is not None:
+            return entry[0]
+
+    def expire(self, now=None):
+        """Remove and return the keys whose deadline is ``now`` or earlier."""
+        if now is None:
+            now = time.time()
+        now_tick = self._tick(now)
+        expired = []
+        with self.lock:
+            nslots = len(self.slots)
+            # no need to look at a bucket more than once per call
+            for tick in range(max(self.tick, now_tick - nslots + 1), now_tick + 1):
+                bucket = self.slots[tick % nslots]
+                for key in [k for k in bucket if self.deadlines[k][0] <= now]:
+                    bucket.discard(key)
+                    del self.deadlines[key]
+                    expired.append(key)
+            self.tick = max(self.tick, now_tick)
+        return expired
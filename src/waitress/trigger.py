@@ -48,18 +48,31 @@ from . import wasyncore
 # why this is true, imagine this scenario: A thread tries to push some
 # new data onto a channel's outgoing data queue at the same time that
 # the main thread is trying to remove some]
+#
+# Pulling the trigger while a wakeup is already pending (written but not yet
+# consumed by handle_read) doesn't write anything: the pending wakeup will
+# run every thunk added until then. The number of pulls and of pulls that
+# were coalesced this way are kept in `pulls` and `coalesced_pulls`.
 
 
 class _triggerbase:
     """OS-independent base class for OS-dependent trigger class."""
 
-    kind = None  # subclass must set to "pipe" or "loopback"; used by repr
+    kind = None  # subclass must set to "pipe", "eventfd" or "loopback"
+
+    pulls = 0  # number of calls to pull_trigger()
+    coalesced_pulls = 0  # number of those that found a wakeup pending
 
     def __init__(self):
         self._closed = False
 
+        # True from the time a wakeup is written until handle_read() has
+        # consumed it and taken the thunks queued so far.
+        self._pending = False
+
         # `lock` protects the `thunks` list from being traversed and
-        # appended to simultaneously.
+        # appended to simultaneously, and `_pending` and the counters from
+        # being updated by several threads at once.
         self.lock = threading.Lock()
 
         # List of no-argument callbacks to invoke when the trigger is
@@ -90,9 +103,15 @@ class _triggerbase:
             self._close()  # subclass does OS-specific stuff
 
     def pull_trigger(self, thunk=None):
-        if thunk:
-            with self.lock:
+        with self.lock:
+            if thunk:
                 self.thunks.append(thunk)
+            self.pulls += 1
+            if self._pending:
+                # handle_read() hasn't taken the thunks yet
+                self.coalesced_pulls += 1
+                return
+            self._pending = True
         self._physical_pull()
 
     def handle_read(self):
@@ -101,18 +120,22 @@ class _triggerbase:
         except OSError:
             return
         with self.lock:
-            for thunk in self.thunks:
-                try:
-                    thunk()
-                except:
-                    nil, t, v, tbinfo = wasyncore.compact_traceback()
-                    self.log_info(f"exception in trigger thunk: ({t}:{v} {tbinfo})")
+            # the wakeup was consumed before this, so any pull from now on
+            # needs a new one; the thunks queued so far are run below
+            self._pending = False
+            thunks = self.thunks
             self.thunks = []
+        for thunk in thunks:
+            try:
+                thunk()
+            except:
+                nil, t, v, tbinfo = wasyncore.compact_traceback()
+                self.log_info(f"exception in trigger thunk: ({t}:{v} {tbinfo})")
 
 
 if os.name == "posix":
 
-    class trigger(_triggerbase, wasyncore.file_dispatcher):
+    class pipe_trigger(_triggerbase, wasyncore.file_dispatcher):
         kind = "pipe"
 
         def __init__(self, map):
@@ -129,6 +152,28 @@ if os.name == "posix":
         def _physical_pull(self):
             os.write(self.trigger, b"x")
 
+    if hasattr(os, "eventfd"):
+
+        class eventfd_trigger(pipe_trigger):
+            """A trigger using a single Linux eventfd instead of a pipe; all
+            the wakeups pending are consumed by a single read."""
+
+            kind = "eventfd"
+
+            def __init__(self, map):
+                _triggerbase.__init__(self)
+                self.trigger = os.eventfd(0, os.EFD_CLOEXEC)
+                self._fds = [self.trigger]
+                wasyncore.file_dispatcher.__init__(self, self.trigger, map=map)
+
+            def _physical_pull(self):
+                os.eventfd_write(self.trigger, 1)
+
+        trigger = eventfd_trigger
+
+    else:  # pragma: no cover
+        trigger = pipe_trigger
+
 else:  # pragma: no cover
     # Windows version; uses just sockets, because a pipe isn't select'able
     # on Windows.
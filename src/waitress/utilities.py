@@ -19,9 +19,11 @@ import errno
 import logging
 import os
 import re
+import socket
 import stat
 import time
 
+from .compat import IPPROTO_IPV6, IPV6_V6ONLY
 from .rfc7230 import QUOTED_PAIR_RE, QUOTED_STRING_RE
 
 logger = logging.getLogger("waitress")
@@ -253,6 +255,67 @@ def cleanup_unix_socket(path):
                 pass
 
 
+def bind_sockets(adj):
+    """Create, bind and listen on the sockets described by ``adj``."""
+    if adj.sockets:
+        return list(adj.sockets)
+
+    sockets = []
+    try:
+        if adj.unix_socket and hasattr(socket, "AF_UNIX"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sockets.append(sock)
+            cleanup_unix_socket(adj.unix_socket)
+            sock.bind(adj.unix_socket)
+            os.chmod(adj.unix_socket, adj.unix_socket_perms)
+        else:
+            for family, socktype, proto, sockaddr in adj.listen:
+                sock = socket.socket(family, socktype, proto)
+                sockets.append(sock)
+                if family == socket.AF_INET6:  # pragma: nocover
+                    sock.setsockopt(IPPROTO_IPV6, IPV6_V6ONLY, 1)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if adj.reuse_port:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                if adj.tcp_defer_accept:
+                    sock.setsockopt(
+                        socket.IPPROTO_TCP,
+                        socket.TCP_DEFER_ACCEPT,
+                        adj.tcp_defer_accept,
+                    )
+                sock.bind(sockaddr)
+        for sock in sockets:
+            sock.listen(adj.backlog)
+    except Exception:
+        for sock in sockets:
+            sock.close()
+        raise
+    return sockets
+
+
+class lazy_attribute:
+    """
+    A class attribute whose per-instance value, made by calling ``factory``,
+    is only created on first access (e.g. the locks of a connection that may
+    stay idle for its whole life). It may be first accessed from several
+    threads at once: they all get the same value. Assigning to the attribute
+    replaces the value as usual.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, inst, owner=None):
+        if inst is None:
+            return self
+        # setdefault is atomic, once set the instance attribute is found
+        # before this descriptor
+        return inst.__dict__.setdefault(self.name, self.factory())
+
+
 class Error:
     code = 500
     reason = "Internal Server Error"
@@ -70,6 +70,7 @@ from errno import (
 import logging
 import os
 import select
+import selectors
 import socket
 import sys
 import time
@@ -231,23 +232,180 @@ def poll2(timeout=0.0, map=None):
 poll3 = poll2  # Alias for backward compatibility
 
 
-def loop(timeout=30.0, use_poll=False, map=None, count=None):
+class selector_poll:
+    """A poll function that keeps its registrations between calls.
+
+    Unlike poll() and poll2(), which hand the kernel a brand new set of file
+    descriptors on every iteration, this registers each dispatcher with a
+    ``selectors`` selector (epoll, kqueue, devpoll or poll, depending on the
+    platform) once, and only asks the kernel to change the interest mask for
+    a file descriptor when the readable()/writable() state of its dispatcher
+    actually changed since the previous iteration.
+
+    Dispatchers that set ``tracks_readiness`` promise to call mark_dirty()
+    whenever their readable()/writable() answer may change outside of one of
+    their own event handlers; they are only re-evaluated when marked dirty or
+    after they handled an event. All other dispatchers are re-evaluated on
+    every iteration, as they would be by poll() and poll2().
+    """
+
+    map = None
+
+    def __init__(self, selector=None):
+        if selector is None:
+            selector = selectors.DefaultSelector()
+        self.selector = selector
+        # fd -> (dispatcher, mask) for everything registered with the selector
+        self.registered = {}
+        # fds that need to be re-evaluated before the next select(). This may
+        # be added to from other threads, so it is only ever consumed with
+        # set.pop().
+        self.dirty = set()
+        # fds of dispatchers that don't track their own readiness
+        self.untracked = set()
+
+    def mark_dirty(self, fd):
+        self.dirty.add(fd)
+
+    def _attach(self, map):
+        self._detach()
+        self.map = map
+        _selector_polls[id(map)] = self
+        self.dirty.update(map)
+
+    def _detach(self):
+        if self.map is not None and _selector_polls.get(id(self.map)) is self:
+            del _selector_polls[id(self.map)]
+        self.map = None
+
+    def __call__(self, timeout=0.0, map=None):
+        if map is None:  # pragma: no cover
+            map = socket_map
+        if map is not self.map:
+            self._attach(map)
+        registered = self.registered
+        untracked = self.untracked
+        dirty = self.dirty
+        dirty.update(untracked)
+
+        while dirty:
+            fd = dirty.pop()
+            obj = map.get(fd)
+            if obj is None:
+                untracked.discard(fd)
+                if fd in registered:
+                    self._unregister(fd)
+                continue
+            if getattr(obj, "tracks_readiness", False):
+                untracked.discard(fd)
+            else:
+                untracked.add(fd)
+            self._update(fd, obj)
+
+        if not registered:
+            # Some selectors (select() on Windows) refuse to wait on an
+            # empty set of file descriptors.
+            time.sleep(timeout)
+            return
+
+        try:
+            ready = self.selector.select(timeout)
+        except OSError as err:  # pragma: no cover
+            if err.args[0] != EINTR:
+                raise
+            return
+
+        for key, events in ready:
+            fd = key.fd
+            obj = map.get(fd)
+            if obj is None or obj is not key.data:  # pragma: no cover
+                continue
+            if events & selectors.EVENT_READ:
+                read(obj)
+            if events & selectors.EVENT_WRITE and map.get(fd) is obj:
+                write(obj)
+            # handling an event is what usually changes a dispatcher's state
+            dirty.add(fd)
+
+    def _update(self, fd, obj):
+        mask = 0
+        if obj.readable():
+            mask |= selectors.EVENT_READ
+        # accepting sockets should not be writable
+        if obj.writable() and not obj.accepting:
+            mask |= selectors.EVENT_WRITE
+
+        current = self.registered.get(fd)
+        if current is not None:
+            if current[0] is obj and current[1] == mask:
+                return
+            if current[0] is not obj or not mask:
+                # the fd was closed and reused by a new dispatcher, or the
+                # dispatcher is no longer interested in any events
+                self._unregister(fd)
+                current = None
+
+        if not mask:
+            return
+
+        try:
+            if current is None:
+                self.selector.register(fd, mask, obj)
+            else:
+                self.selector.modify(fd, mask, obj)
+        except OSError as e:
+            self.registered.pop(fd, None)
+            if e.args[0] in _DISCONNECTED:
+                obj.handle_close()
+            else:
+                obj.handle_error()
+            return
+
+        self.registered[fd] = (obj, mask)
+
+    def _unregister(self, fd):
+        del self.registered[fd]
+        try:
+            self.selector.unregister(fd)
+        except (KeyError, ValueError, OSError):  # pragma: no cover
+            pass
+
+    def close(self):
+        self._detach()
+        self.registered.clear()
+        self.untracked.clear()
+        self.dirty.clear()
+        self.selector.close()
+
+
+# id(map) -> the selector_poll currently driving that socket map, so that
+# dispatchers can tell it about state changes (see dispatcher.mark_dirty)
+_selector_polls = {}
+
+
+def loop(timeout=30.0, use_poll=False, map=None, count=None, use_selector=False):
     if map is None:  # pragma: no cover
         map = socket_map
 
-    if use_poll and hasattr(select, "poll"):
+    if use_selector:
+        poll_fun = selector_poll()
+    elif use_poll and hasattr(select, "poll"):
         poll_fun = poll2
     else:
         poll_fun = poll
 
-    if count is None:  # pragma: no cover
-        while map:
-            poll_fun(timeout, map)
+    try:
+        if count is None:  # pragma: no cover
+            while map:
+                poll_fun(timeout, map)
 
-    else:
-        while map and count > 0:
-            poll_fun(timeout, map)
-            count = count - 1
+        else:
+            while map and count > 0:
+                poll_fun(timeout, map)
+                count = count - 1
+    finally:
+        if use_selector:
+            poll_fun.close()
 
 
 def compact_traceback():
@@ -280,6 +438,9 @@ class dispatcher:
     connecting = False
     closing = False
     addr = None
+    # set to True if mark_dirty() is called whenever readable() or writable()
+    # may change other than as the result of handling an event
+    tracks_readiness = False
     ignore_log_types = frozenset({"warning"})
     logger = utilities.logger
     compact_traceback = staticmethod(compact_traceback)  # for testing
@@ -320,6 +481,7 @@ class dispatcher:
         if map is None:
             map = self._map
         map[self._fileno] = self
+        self._mark_dirty(map, self._fileno)
 
     def del_channel(self, map=None):
         fd = self._fileno
@@ -328,8 +490,21 @@ class dispatcher:
         if fd in map:
             # self.log_info('closing channel %d:%s' % (fd, self))
             del map[fd]
+            self._mark_dirty(map, fd)
         self._fileno = None
 
+    def mark_dirty(self):
+        """Tell a selector_poll driving our map that the result of
+        readable() or writable() may have changed. Safe to call from any
+        thread; a no-op when the map isn't driven by a selector_poll."""
+        self._mark_dirty(self._map, self._fileno)
+
+    @staticmethod
+    def _mark_dirty(map, fd):
+        poller = _selector_polls.get(id(map))
+        if poller is not None:
+            poller.mark_dirty(fd)
+
     def create_socket(self, family=socket.AF_INET, type=socket.SOCK_STREAM):
         self.family_and_type = family, type
         sock = socket.socket(family, type)
@@ -397,14 +572,23 @@ class dispatcher:
             result = self.socket.send(data)
             return result
         except OSError as why:
-            if why.args[0] == EWOULDBLOCK:
-                return 0
-            elif why.args[0] in _DISCONNECTED:
-                if do_close:
-                    self.handle_close()
-                return 0
-            else:
-                raise
+            return self._socket_error(why, do_close)
+
+    def sendmsg(self, buffers, do_close=True):
+        """Send the ``buffers`` with a single ``socket.sendmsg`` call; errors
+        are handled like send()."""
+        try:
+            return self.socket.sendmsg(buffers)
+        except OSError as why:
+            return self._socket_error(why, do_close)
+
+    def sendfile(self, fd, offset, count, do_close=True):
+        """Send up to ``count`` bytes of the file ``fd`` starting at
+        ``offset`` with ``os.sendfile``; errors are handled like send()."""
+        try:
+            return os.sendfile(self.socket.fileno(), fd, offset, count)
+        except OSError as why:
+            return self._socket_error(why, do_close)
 
     def recv(self, buffer_size):
         try:
@@ -417,12 +601,36 @@ class dispatcher:
             else:
                 return data
         except OSError as why:
+            self._socket_error(why, would_block=False)
+            return b""
+
+    def recv_into(self, buffer):
+        """Like recv(), but reads into ``buffer`` and returns the number of
+        bytes read; 0 means the connection was closed."""
+        try:
+            nbytes = self.socket.recv_into(buffer)
+            if not nbytes:
+                # a closed connection is indicated by signaling
+                # a read condition, and having recv() return 0.
+                self.handle_close()
+            return nbytes
+        except OSError as why:
+            return self._socket_error(why, would_block=False)
+
+    def _socket_error(self, why, do_close=True, would_block=True):
+        """Handle the OSError ``why`` raised by a send or a receive: return 0
+        if the socket would block and ``would_block`` is true, or if the
+        connection is gone, which also closes the channel unless ``do_close``
+        is false. Any other error is raised again."""
+        if would_block and why.args[0] == EWOULDBLOCK:
+            return 0
+        elif why.args[0] in _DISCONNECTED:
             # winsock sometimes raises ENOTCONN
-            if why.args[0] in _DISCONNECTED:
+            if do_close:
                 self.handle_close()
-                return b""
-            else:
-                raise
+            return 0
+        else:
+            raise why
 
     def close(self):
         self.connected = False
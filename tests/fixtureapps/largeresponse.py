@@ -0,0 +1,12 @@
+def app(environ, start_response):  # pragma: no cover
+    if environ["PATH_INFO"] == "/small":
+        chunk = b"x"
+        count = 1
+    else:
+        chunk = b"x" * (1 << 20)
+        count = 64
+    start_response(
+        "200 OK",
+        [("Content-Length", str(len(chunk) * count)), ("Content-Type", "text/plain")],
+    )
+    return [chunk] * count
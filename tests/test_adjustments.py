@@ -1,3 +1,4 @@
+import os
 import socket
 import sys
 import unittest
@@ -111,6 +112,8 @@ class TestAdjustments(unittest.TestCase):
             host="localhost",
             port="8080",
             threads="5",
+            worker_max_requests="1000",
+            worker_max_memory="1500",
             trusted_proxy="192.168.1.1",
             trusted_proxy_headers={"forwarded"},
             trusted_proxy_count=2,
@@ -121,9 +124,16 @@ class TestAdjustments(unittest.TestCase):
             send_bytes="300",
             outbuf_overflow="400",
             inbuf_overflow="500",
+            background_disk_io="true",
+            stream_request_body="true",
             connection_limit="1000",
+            accept_budget="16",
             cleanup_interval="1100",
             channel_timeout="1200",
+            header_timeout="1210",
+            body_timeout="1220",
+            keepalive_timeout="1230",
+            write_timeout="1240",
             log_socket_errors="true",
             max_request_header_size="1300",
             max_request_body_size="1400",
@@ -131,6 +141,9 @@ class TestAdjustments(unittest.TestCase):
             ident="abc",
             asyncore_loop_timeout="5",
             asyncore_use_poll=True,
+            asyncore_use_selector=True,
+            backend="asyncio",
+            asyncio_use_uvloop=True,
             unix_socket_perms="777",
             url_prefix="///foo/",
             ipv4=True,
@@ -140,6 +153,8 @@ class TestAdjustments(unittest.TestCase):
         self.assertEqual(inst.host, "localhost")
         self.assertEqual(inst.port, 8080)
         self.assertEqual(inst.threads, 5)
+        self.assertEqual(inst.worker_max_requests, 1000)
+        self.assertEqual(inst.worker_max_memory, 1500)
         self.assertEqual(inst.trusted_proxy, "192.168.1.1")
         self.assertEqual(inst.trusted_proxy_headers, {"forwarded"})
         self.assertEqual(inst.trusted_proxy_count, 2)
@@ -150,15 +165,25 @@ class TestAdjustments(unittest.TestCase):
         self.assertEqual(inst.send_bytes, 300)
         self.assertEqual(inst.outbuf_overflow, 400)
         self.assertEqual(inst.inbuf_overflow, 500)
+        self.assertEqual(inst.background_disk_io, True)
+        self.assertEqual(inst.stream_request_body, True)
         self.assertEqual(inst.connection_limit, 1000)
+        self.assertEqual(inst.accept_budget, 16)
         self.assertEqual(inst.cleanup_interval, 1100)
         self.assertEqual(inst.channel_timeout, 1200)
+        self.assertEqual(inst.header_timeout, 1210)
+        self.assertEqual(inst.body_timeout, 1220)
+        self.assertEqual(inst.keepalive_timeout, 1230)
+        self.assertEqual(inst.write_timeout, 1240)
         self.assertEqual(inst.log_socket_errors, True)
         self.assertEqual(inst.max_request_header_size, 1300)
         self.assertEqual(inst.max_request_body_size, 1400)
         self.assertEqual(inst.expose_tracebacks, True)
         self.assertEqual(inst.asyncore_loop_timeout, 5)
         self.assertEqual(inst.asyncore_use_poll, True)
+        self.assertEqual(inst.asyncore_use_selector, True)
+        self.assertEqual(inst.backend, "asyncio")
+        self.assertEqual(inst.asyncio_use_uvloop, True)
         self.assertEqual(inst.ident, "abc")
         self.assertEqual(inst.unix_socket_perms, 0o777)
         self.assertEqual(inst.url_prefix, "/foo")
@@ -367,6 +392,45 @@ class TestAdjustments(unittest.TestCase):
     def test_badvar(self):
         self.assertRaises(ValueError, self._makeOne, nope=True)
 
+    def test_event_loops(self):
+        inst = self._makeOne(event_loops="3")
+        self.assertEqual(inst.event_loops, 3)
+
+    def test_event_loops_lt_one(self):
+        self.assertRaises(ValueError, self._makeOne, event_loops="0")
+
+    def test_bad_backend(self):
+        self.assertRaises(ValueError, self._makeOne, backend="twisted")
+
+    def test_accept_budget_zero(self):
+        self.assertRaises(ValueError, self._makeOne, accept_budget="0")
+
+    def test_workers_negative(self):
+        self.assertRaises(ValueError, self._makeOne, workers="-1")
+
+    @unittest.skipIf(not hasattr(os, "fork"), "needs os.fork")
+    def test_workers(self):
+        inst = self._makeOne(workers="2")
+        self.assertEqual(inst.workers, 2)
+
+    @unittest.skipIf(not hasattr(socket, "SO_REUSEPORT"), "needs SO_REUSEPORT")
+    def test_reuse_port(self):
+        inst = self._makeOne(reuse_port="true")
+        self.assertEqual(inst.reuse_port, True)
+
+    @unittest.skipIf(
+        not hasattr(socket, "TCP_NOTSENT_LOWAT") or not hasattr(socket, "TCP_QUICKACK"),
+        "needs TCP_NOTSENT_LOWAT and TCP_QUICKACK",
+    )
+    def test_tcp_options(self):
+        inst = self._makeOne(tcp_notsent_lowat="16384", tcp_quickack="true")
+        self.assertEqual(inst.tcp_notsent_lowat, 16384)
+        self.assertEqual(inst.tcp_quickack, True)
+
+    def test_tcp_options_negative(self):
+        self.assertRaises(ValueError, self._makeOne, tcp_defer_accept="-1")
+        self.assertRaises(ValueError, self._makeOne, tcp_notsent_lowat="-1")
+
     def test_ipv4_disabled(self):
         self.assertRaises(
             ValueError, self._makeOne, ipv4=False, listen="127.0.0.1:8080"
@@ -397,22 +461,27 @@ class TestCLI(unittest.TestCase):
 
     def test_noargs(self):
         opts, args = self.parse([])
-        self.assertDictEqual(opts, {"call": False, "help": False})
+        self.assertDictEqual(opts, {"call": False, "help": False, "preload": True})
         self.assertSequenceEqual(args, [])
 
     def test_help(self):
         opts, args = self.parse(["--help"])
-        self.assertDictEqual(opts, {"call": False, "help": True})
+        self.assertDictEqual(opts, {"call": False, "help": True, "preload": True})
         self.assertSequenceEqual(args, [])
 
     def test_call(self):
         opts, args = self.parse(["--call"])
-        self.assertDictEqual(opts, {"call": True, "help": False})
+        self.assertDictEqual(opts, {"call": True, "help": False, "preload": True})
         self.assertSequenceEqual(args, [])
 
     def test_both(self):
         opts, args = self.parse(["--call", "--help"])
-        self.assertDictEqual(opts, {"call": True, "help": True})
+        self.assertDictEqual(opts, {"call": True, "help": True, "preload": True})
+        self.assertSequenceEqual(args, [])
+
+    def test_no_preload(self):
+        opts, args = self.parse(["--no-preload"])
+        self.assertDictContainsSubset({"preload": "false"}, opts)
         self.assertSequenceEqual(args, [])
 
     def test_positive_boolean(self):
@@ -0,0 +1,607 @@
+import socket
+import unittest
+
+dummy_app = object()
+
+
+class TestAsyncioWSGIServer(unittest.TestCase):
+    def _makeOne(self, application=dummy_app, _start=True, **kw):
+        from waitress.aioserver import AsyncioWSGIServer
+
+        kw.setdefault("host", "127.0.0.1")
+        kw.setdefault("port", 0)
+        self.inst = AsyncioWSGIServer(
+            application, _start=_start, dispatcher=DummyTaskDispatcher(), **kw
+        )
+        return self.inst
+
+    def tearDown(self):
+        inst = getattr(self, "inst", None)
+        if inst is not None:
+            inst.close()
+
+    def test_ctor(self):
+        inst = self._makeOne(_start=False)
+        self.assertEqual(len(inst.sockets), 1)
+        self.assertEqual(inst.effective_host, "127.0.0.1")
+        self.assertEqual(inst.effective_port, str(inst.sockets[0].getsockname()[1]))
+        self.assertEqual(
+            inst.effective_listen, [(inst.effective_host, inst.effective_port)]
+        )
+        self.assertEqual(inst.server_name, "waitress.invalid")
+        self.assertEqual(inst.servers, [])
+
+    def test_ctor_wraps_proxy_headers(self):
+        inst = self._makeOne(_start=False)
+        self.assertIsNot(inst.application, dummy_app)
+
+    def test_ctor_no_proxy_headers(self):
+        inst = self._makeOne(_start=False, clear_untrusted_proxy_headers=False)
+        self.assertIs(inst.application, dummy_app)
+
+    def test_ctor_makes_dispatcher(self):
+        from waitress.aioserver import AsyncioWSGIServer
+
+        self.inst = AsyncioWSGIServer(dummy_app, _start=False, host="127.0.0.1", port=0)
+        self.assertEqual(
+            self.inst.task_dispatcher.__class__.__name__, "ThreadedTaskDispatcher"
+        )
+        self.inst.task_dispatcher.shutdown()
+
+    def test_ctor_uvloop_missing(self):
+        from waitress import aioserver
+
+        uvloop = aioserver.uvloop
+        aioserver.uvloop = None
+        try:
+            self.assertRaises(
+                ValueError, self._makeOne, _start=False, asyncio_use_uvloop=True
+            )
+        finally:
+            aioserver.uvloop = uvloop
+
+    def test_accept_connections(self):
+        inst = self._makeOne()
+        self.assertEqual(len(inst.servers), 1)
+        inst.stop_accepting()
+        self.assertEqual(inst.servers, [])
+
+    def test_fix_addr(self):
+        inst = self._makeOne(_start=False)
+        self.assertEqual(inst.fix_addr(("::1", 80, 0, 0)), ("::1", 80))
+        self.assertEqual(inst.fix_addr(""), ("localhost", None))
+
+    def test_make_channel(self):
+        inst = self._makeOne(_start=False)
+        channel = inst.make_channel()
+        self.assertIs(channel.server, inst)
+        self.assertIs(channel.adj, inst.adj)
+        self.assertIs(channel.loop, inst.loop)
+
+    def test_add_task(self):
+        inst = self._makeOne(_start=False)
+        inst.add_task(None)
+        self.assertEqual(inst.task_dispatcher.tasks, [None])
+
+    def test_maintenance(self):
+        inst = self._makeOne(_start=False)
+        idle = DummyChannel(deadline=0)
+        busy = DummyChannel(deadline=None)
+        active = DummyChannel(deadline=10**10)
+        for channel in (idle, busy, active):
+            inst.timers.schedule(channel, 0)
+        inst.maintenance()
+        self.assertTrue(idle.aborted)
+        self.assertTrue(idle.will_close)
+        self.assertFalse(busy.aborted)
+        self.assertFalse(active.aborted)
+        self.assertEqual(inst.timers.deadline(busy), None)
+        self.assertEqual(inst.timers.deadline(active), 10**10)
+
+    def test_run(self):
+        inst = self._makeOne()
+
+        def stop():
+            raise KeyboardInterrupt
+
+        inst.loop.call_soon(stop)
+        inst.run()
+        self.assertTrue(inst.task_dispatcher.was_shutdown)
+        self.assertTrue(inst.loop.is_closed())
+
+    def test_serves_request(self):
+        inst = self._makeOne(application=hello_app)
+        inst.task_dispatcher = InlineTaskDispatcher()
+        host, port = inst.sockets[0].getsockname()
+
+        async def request():
+            reader, writer = await asyncio_open_connection(host, port)
+            writer.write(b"GET / HTTP/1.0\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            return response
+
+        response = inst.loop.run_until_complete(request())
+        self.assertTrue(response.startswith(b"HTTP/1.0 200 OK"))
+        self.assertTrue(response.endswith(b"\r\n\r\nhello"))
+
+    def test_create_server(self):
+        from waitress.aioserver import AsyncioWSGIServer
+        from waitress.server import create_server
+
+        self.inst = create_server(
+            dummy_app,
+            host="127.0.0.1",
+            port=0,
+            backend="asyncio",
+            _start=False,
+            _dispatcher=DummyTaskDispatcher(),
+        )
+        self.assertIsInstance(self.inst, AsyncioWSGIServer)
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class TestAsyncioWSGIServerUnix(unittest.TestCase):
+        def test_unix_socket(self):
+            import os
+            import tempfile
+
+            from waitress.aioserver import AsyncioWSGIServer
+
+            path = os.path.join(tempfile.mkdtemp(), "waitress.sock")
+            inst = AsyncioWSGIServer(
+                dummy_app, dispatcher=DummyTaskDispatcher(), unix_socket=path
+            )
+            try:
+                self.assertEqual(inst.effective_listen, [("unix", path)])
+                self.assertEqual(len(inst.servers), 1)
+            finally:
+                inst.close()
+                os.unlink(path)
+
+
+class TestAsyncioHTTPChannel(unittest.TestCase):
+    def _makeOne(self, **kw):
+        from waitress.adjustments import Adjustments
+        from waitress.aioserver import AsyncioHTTPChannel
+
+        server = DummyServer()
+        adj = Adjustments(**kw)
+        loop = DummyLoop()
+        inst = AsyncioHTTPChannel(server, adj, loop)
+        inst.connection_made(DummyTransport())
+        return inst
+
+    def test_connection_made(self):
+        inst = self._makeOne(outbuf_high_watermark=1000)
+        self.assertTrue(inst.connected)
+        self.assertEqual(inst.addr, ("127.0.0.1", 1234))
+        self.assertEqual(inst.transport.high, 1000)
+        self.assertEqual(inst.server.active_channels, {id(inst): inst})
+        self.assertEqual(
+            inst.server.timers.deadline(inst),
+            inst.last_activity + inst.adj.channel_timeout,
+        )
+
+    def test_connection_lost(self):
+        inst = self._makeOne()
+        inst.outbufs = [b"abc"]
+        inst.total_outbufs_len = 3
+        inst.connection_lost(None)
+        self.assertFalse(inst.connected)
+        self.assertEqual(inst.outbufs, [])
+        self.assertEqual(inst.total_outbufs_len, 0)
+        self.assertEqual(inst.server.active_channels, {})
+        self.assertEqual(inst.server.timers.deadline(inst), None)
+
+    def test_data_received(self):
+        inst = self._makeOne()
+        inst.data_received(b"GET / HTTP/1.1\r\n\r\n")
+        self.assertEqual(len(inst.requests), 1)
+        self.assertEqual(inst.server.tasks, [inst])
+        # no lookahead, so no more requests are read until it is serviced
+        self.assertTrue(inst.reading_paused)
+        self.assertTrue(inst.transport.reading_paused)
+
+    def test_data_received_lookahead(self):
+        inst = self._makeOne(channel_request_lookahead=1)
+        inst.data_received(b"GET / HTTP/1.1\r\n\r\n")
+        self.assertFalse(inst.reading_paused)
+        inst.data_received(b"GET / HTTP/1.1\r\n\r\n")
+        self.assertTrue(inst.reading_paused)
+        self.assertEqual(inst.server.tasks, [inst])
+
+    def test_data_received_expect_continue(self):
+        inst = self._makeOne()
+        inst.data_received(
+            b"POST / HTTP/1.1\r\nContent-Length: 2\r\nExpect: 100-continue\r\n\r\n"
+        )
+        self.assertTrue(inst.sent_continue)
+        self.assertEqual(inst.outbufs, [b"HTTP/1.1 100 Continue\r\n\r\n"])
+        self.assertEqual(inst.loop.callbacks, [inst._flush])
+
+    def test_data_received_streaming(self):
+        inst = self._makeOne(stream_request_body=True, inbuf_overflow=4)
+        inst.data_received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        request = inst.streaming_request
+        self.assertEqual(inst.requests, [request])
+        self.assertEqual(inst.server.tasks, [inst])
+        # the body is read while there is room for it
+        self.assertFalse(inst.reading_paused)
+        inst.data_received(b"cd")
+        self.assertTrue(inst.reading_paused)
+        request.body_stream.read(2)
+        self.assertEqual(inst.loop.callbacks, [inst._drained])
+        inst.loop.run_callbacks()
+        self.assertFalse(inst.reading_paused)
+        self.assertFalse(inst.transport.reading_paused)
+        inst.data_received(b"efghij")
+        self.assertEqual(inst.streaming_request, None)
+        self.assertTrue(inst.reading_paused)
+
+    def test__drained_not_streaming(self):
+        inst = self._makeOne()
+        inst.requests = [None, None]
+        inst.reading_paused = True
+        inst._drained()
+        self.assertTrue(inst.reading_paused)
+
+    def test_data_received_body_full(self):
+        inst = self._makeOne(background_disk_io=True)
+        inst.data_received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        self.assertFalse(inst.reading_paused)
+        buf = inst.request.body_rcv.getbuf()
+        buf.full = lambda: True
+        inst.data_received(b"cd")
+        # until the DiskIO thread caught up
+        self.assertTrue(inst.reading_paused)
+        inst._serviced()
+        inst._drained()
+        self.assertTrue(inst.reading_paused)
+        buf.full = lambda: False
+        inst.request.body_drained()
+        self.assertEqual(inst.loop.callbacks, [inst._drained])
+        inst.loop.run_callbacks()
+        self.assertFalse(inst.reading_paused)
+        self.assertFalse(inst.transport.reading_paused)
+
+    def test__serviced_streaming(self):
+        inst = self._makeOne(stream_request_body=True, inbuf_overflow=4)
+        inst.data_received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nabcd")
+        self.assertTrue(inst.reading_paused)
+        inst._serviced()
+        # left to _drained()
+        self.assertTrue(inst.reading_paused)
+
+    def test_eof_received_streaming(self):
+        from waitress.channel import ClientDisconnected
+
+        inst = self._makeOne(stream_request_body=True)
+        inst.data_received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        stream = inst.streaming_request.body_stream
+        inst.eof_received()
+        self.assertRaises(ClientDisconnected, stream.read)
+
+    def test_connection_lost_streaming(self):
+        from waitress.channel import ClientDisconnected
+
+        inst = self._makeOne(stream_request_body=True)
+        inst.data_received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        stream = inst.streaming_request.body_stream
+        inst.connection_lost(None)
+        self.assertRaises(ClientDisconnected, stream.read)
+
+    def test_timeout_deadline_transport_buffered(self):
+        inst = self._makeOne(write_timeout=5, keepalive_timeout=10)
+        inst.last_activity = 100
+        self.assertEqual(inst.timeout_deadline(), 110)
+        inst.transport.buffered = 3
+        self.assertEqual(inst.timeout_deadline(), 105)
+
+    def test_eof_received(self):
+        inst = self._makeOne()
+        self.assertFalse(inst.eof_received())
+        self.assertFalse(inst.connected)
+
+    def test_pause_resume_writing(self):
+        inst = self._makeOne()
+        inst.pause_writing()
+        self.assertTrue(inst.writing_paused)
+        inst.resume_writing()
+        self.assertFalse(inst.writing_paused)
+
+    def test_write_soon(self):
+        inst = self._makeOne()
+        self.assertEqual(inst.write_soon(b"abc"), 3)
+        self.assertEqual(inst.write_soon(b"de"), 2)
+        self.assertEqual(inst.write_soon(b""), 0)
+        self.assertEqual(inst.outbufs, [b"abc", b"de"])
+        self.assertEqual(inst.total_outbufs_len, 5)
+        # only one wake up of the event loop for both writes
+        self.assertEqual(inst.loop.callbacks, [inst._flush])
+        inst.loop.run_callbacks()
+        self.assertEqual(inst.transport.written, [b"abc", b"de"])
+        self.assertEqual(inst.outbufs, [])
+        self.assertEqual(inst.total_outbufs_len, 0)
+        self.assertFalse(inst.flush_scheduled)
+
+    def test_write_soon_disconnected(self):
+        from waitress.channel import ClientDisconnected
+
+        inst = self._makeOne()
+        inst.connected = False
+        self.assertRaises(ClientDisconnected, inst.write_soon, b"abc")
+
+    def test_write_soon_filewrapper(self):
+        import io
+
+        from waitress.buffers import ReadOnlyFileBasedBuffer
+
+        f = io.BytesIO(b"abcdef")
+        buf = ReadOnlyFileBasedBuffer(f, block_size=4)
+        buf.prepare()
+        inst = self._makeOne()
+        self.assertEqual(inst.write_soon(buf), 6)
+        self.assertEqual(inst.outbufs, [b"abcd", b"ef"])
+        self.assertTrue(f.closed)
+
+    def test_write_soon_waits_for_transport(self):
+        inst = self._makeOne()
+        inst.writing_paused = True
+
+        def wait():
+            # the event loop drains the transport
+            inst.writing_paused = False
+
+        inst.outbuf_lock = DummyCondition(wait)
+        self.assertEqual(inst.write_soon(b"abc"), 3)
+        self.assertEqual(inst.outbuf_lock.waits, 1)
+
+    def test_write_soon_disconnected_while_waiting(self):
+        from waitress.channel import ClientDisconnected
+
+        inst = self._makeOne()
+        inst.writing_paused = True
+
+        def wait():
+            inst.connected = False
+
+        inst.outbuf_lock = DummyCondition(wait)
+        self.assertRaises(ClientDisconnected, inst.write_soon, b"abc")
+
+    def test_flush_closing(self):
+        inst = self._makeOne()
+        inst.write_soon(b"abc")
+        inst.transport.closing = True
+        inst.loop.run_callbacks()
+        self.assertEqual(inst.transport.written, [])
+        self.assertEqual(inst.outbufs, [])
+
+    def test_flush_arms_timeout(self):
+        inst = self._makeOne(write_timeout=100, keepalive_timeout=1)
+        inst.write_soon(b"abc")
+        # the timer armed while the output was pending
+        inst.server.timers.schedule(inst, inst.last_activity + 100)
+        inst.loop.run_callbacks()
+        self.assertEqual(inst.server.timers.deadline(inst), inst.last_activity + 1)
+
+    def test_flush_watches_drain(self):
+        inst = self._makeOne(write_timeout=100, keepalive_timeout=1)
+        inst.write_soon(b"abc")
+        inst.transport.buffered = 3
+        inst.loop.run_callbacks()
+        self.assertTrue(inst.watching_drain)
+        inst.server.timers.schedule(inst, inst.last_activity + 100)
+        # still buffered
+        inst.loop.run_callbacks()
+        self.assertEqual(len(inst.loop.callbacks), 1)
+        self.assertEqual(inst.server.timers.deadline(inst), inst.last_activity + 100)
+        inst.transport.buffered = 0
+        inst.loop.run_callbacks()
+        self.assertFalse(inst.watching_drain)
+        self.assertEqual(inst.loop.callbacks, [])
+        self.assertEqual(inst.server.timers.deadline(inst), inst.last_activity + 1)
+
+    def test_watch_drain_closing(self):
+        inst = self._makeOne()
+        inst.watching_drain = True
+        inst.transport.closing = True
+        inst._watch_drain()
+        self.assertFalse(inst.watching_drain)
+        self.assertEqual(inst.loop.callbacks, [])
+
+    def test_abort(self):
+        inst = self._makeOne()
+        inst.abort()
+        self.assertTrue(inst.transport.aborted)
+        self.assertFalse(inst.transport.closed)
+
+    def test_service(self):
+        inst = self._makeOne()
+        inst.data_received(b"GET / HTTP/1.1\r\n\r\n")
+        inst.service()
+        self.assertEqual(inst.requests, [])
+        self.assertTrue(b"".join(inst.outbufs).startswith(b"HTTP/1.1 200 OK"))
+        inst.loop.run_callbacks()
+        self.assertTrue(inst.transport.written)
+        # serviced, so the next request can be read
+        self.assertFalse(inst.reading_paused)
+        self.assertFalse(inst.transport.reading_paused)
+        self.assertFalse(inst.transport.closed)
+
+    def test_service_close_on_finish(self):
+        inst = self._makeOne()
+        inst.data_received(b"GET / HTTP/1.0\r\n\r\n")
+        inst.service()
+        self.assertTrue(inst.close_when_flushed)
+        inst.loop.run_callbacks()
+        self.assertTrue(inst.transport.written)
+        self.assertTrue(inst.transport.closed)
+
+    def test_serviced_keeps_paused_with_requests_queued(self):
+        inst = self._makeOne()
+        inst.data_received(b"GET / HTTP/1.1\r\n\r\nGET / HTTP/1.1\r\n\r\n")
+        inst.service()
+        inst.loop.run_callbacks()
+        self.assertTrue(inst.reading_paused)
+        self.assertEqual(inst.server.tasks, [inst, inst])
+
+    def test_cancel(self):
+        inst = self._makeOne()
+        inst.requests = [True]
+        inst.cancel()
+        self.assertTrue(inst.will_close)
+        self.assertFalse(inst.connected)
+        self.assertEqual(inst.requests, [])
+        inst.loop.run_callbacks()
+        self.assertTrue(inst.transport.closed)
+
+    def test_check_client_disconnected(self):
+        inst = self._makeOne()
+        self.assertFalse(inst.check_client_disconnected())
+        inst.connected = False
+        self.assertTrue(inst.check_client_disconnected())
+
+
+def hello_app(environ, start_response):
+    start_response("200 OK", [("Content-Length", "5")])
+    return [b"hello"]
+
+
+def asyncio_open_connection(host, port):
+    import asyncio
+
+    return asyncio.open_connection(host, port)
+
+
+class DummyTaskDispatcher:
+    was_shutdown = False
+
+    def __init__(self):
+        self.tasks = []
+
+    def add_task(self, task):
+        self.tasks.append(task)
+
+    def shutdown(self):
+        self.was_shutdown = True
+
+
+class InlineTaskDispatcher(DummyTaskDispatcher):
+    def add_task(self, task):
+        # run the task in a thread, as the event loop must keep running
+        import threading
+
+        threading.Thread(target=task.service).start()
+
+
+class DummyChannel:
+    will_close = False
+    aborted = False
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def timeout_deadline(self):
+        return self.deadline
+
+    def abort(self):
+        self.aborted = True
+
+
+class DummyServer:
+    application = staticmethod(hello_app)
+    effective_port = "8080"
+    server_name = "localhost"
+    environ_template = None
+
+    def __init__(self):
+        from waitress.adjustments import Adjustments
+        from waitress.timers import TimerWheel
+
+        self.adj = Adjustments()
+        self.active_channels = {}
+        self.timers = TimerWheel()
+        self.tasks = []
+
+    def add_task(self, task):
+        self.tasks.append(task)
+
+    def fix_addr(self, addr):
+        return addr
+
+
+class DummyLoop:
+    def __init__(self):
+        self.callbacks = []
+
+    def call_soon_threadsafe(self, callback):
+        self.callbacks.append(callback)
+
+    def call_later(self, delay, callback):
+        self.callbacks.append(callback)
+
+    def run_callbacks(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class DummyTransport:
+    high = None
+    closing = False
+    closed = False
+    aborted = False
+    reading_paused = False
+    buffered = 0
+
+    def __init__(self):
+        self.written = []
+
+    def set_write_buffer_limits(self, high=None):
+        self.high = high
+
+    def get_extra_info(self, name):
+        return {"peername": ("127.0.0.1", 1234)}[name]
+
+    def writelines(self, data):
+        self.written.extend(data)
+
+    def get_write_buffer_size(self):
+        return self.buffered
+
+    def is_closing(self):
+        return self.closing or self.closed
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        self.aborted = True
+
+    def pause_reading(self):
+        self.reading_paused = True
+
+    def resume_reading(self):
+        self.reading_paused = False
+
+
+class DummyCondition:
+    waits = 0
+
+    def __init__(self, on_wait):
+        self.on_wait = on_wait
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def wait(self):
+        self.waits += 1
+        self.on_wait()
+
+    def notify_all(self):
+        pass
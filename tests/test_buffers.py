@@ -1,4 +1,6 @@
 import io
+import os
+import tempfile
 import unittest
 
 
@@ -145,6 +147,382 @@ class TestTempfileBasedBuffer(unittest.TestCase):
         r.close()
 
 
+class TestPositionalTempfileBasedBuffer(unittest.TestCase):
+    def _makeOne(self, from_buffer=None):
+        from waitress.buffers import PositionalTempfileBasedBuffer
+
+        buf = PositionalTempfileBasedBuffer(from_buffer=from_buffer)
+        self.buffers_to_close.append(buf)
+        return buf
+
+    def setUp(self):
+        self.buffers_to_close = []
+
+    def tearDown(self):
+        for buf in self.buffers_to_close:
+            buf.close()
+
+    def test_ctor(self):
+        inst = self._makeOne()
+        self.assertEqual(len(inst), 0)
+        self.assertTrue(inst)
+        self.assertEqual(inst.file.__class__, io.FileIO)
+
+    def test_ctor_from_buffer(self):
+        from_buffer = io.BytesIO(b"abcdef")
+        from_buffer.seek(2)
+        inst = self._makeOne(from_buffer=DummyFileBuffer(from_buffer))
+        self.assertEqual(inst.write_pos, 6)
+        self.assertEqual(inst.read_pos, 2)
+        self.assertEqual(inst.remain, 4)
+        self.assertEqual(inst.get(), b"cdef")
+        self.assertEqual(from_buffer.tell(), 2)
+
+    def test_append_does_not_seek(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.append(memoryview(b"def"))
+        self.assertEqual(len(inst), 6)
+        self.assertEqual(inst.file.tell(), 0)
+        self.assertEqual(inst.get(), b"abcdef")
+
+    def test_append_short_write(self):
+        inst = self._makeOne()
+        L = []
+
+        def pwrite(fd, data, pos):
+            L.append((bytes(data), pos))
+            return 2
+
+        old_pwrite = os.pwrite
+        os.pwrite = pwrite
+        try:
+            inst.append(b"abcde")
+        finally:
+            os.pwrite = old_pwrite
+        self.assertEqual(L, [(b"abcde", 0), (b"cde", 2), (b"e", 4)])
+        self.assertEqual(inst.write_pos, 5)
+
+    def test_get(self):
+        inst = self._makeOne()
+        inst.append(b"abcdef")
+        self.assertEqual(inst.get(2), b"ab")
+        self.assertEqual(inst.get(100), b"abcdef")
+        self.assertEqual(len(inst), 6)
+
+    def test_get_skip(self):
+        inst = self._makeOne()
+        inst.append(b"abcdef")
+        self.assertEqual(inst.get(2, skip=True), b"ab")
+        self.assertEqual(inst.get(), b"cdef")
+        self.assertEqual(len(inst), 4)
+
+    def test_get_empty(self):
+        inst = self._makeOne()
+        self.assertEqual(inst.get(), b"")
+
+    def test_skip(self):
+        inst = self._makeOne()
+        inst.append(b"abcdef")
+        inst.skip(4)
+        self.assertEqual(inst.read_pos, 4)
+        self.assertEqual(inst.get(), b"ef")
+        inst.append(b"g")
+        self.assertEqual(inst.get(), b"efg")
+
+    def test_skip_too_much(self):
+        inst = self._makeOne()
+        inst.append(b"ab")
+        self.assertRaises(ValueError, inst.skip, 3)
+
+    def test_prune_empty(self):
+        inst = self._makeOne()
+        oldfile = inst.file
+        inst.prune()
+        self.assertIs(inst.file, oldfile)
+
+    def test_prune_all_read(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.skip(3)
+        oldfile = inst.file
+        inst.prune()
+        self.assertIs(inst.file, oldfile)
+        self.assertEqual(inst.read_pos, 0)
+        self.assertEqual(inst.write_pos, 0)
+        self.assertEqual(os.fstat(inst.fileno).st_size, 0)
+
+    def test_prune_remaining(self):
+        inst = self._makeOne()
+        inst.append(b"abcdef")
+        inst.skip(2)
+        oldfile = inst.file
+        inst.prune()
+        self.assertIsNot(inst.file, oldfile)
+        self.assertTrue(oldfile.closed)
+        self.assertEqual(inst.read_pos, 0)
+        self.assertEqual(inst.get(), b"cdef")
+
+    def test_getfile(self):
+        inst = self._makeOne()
+        inst.append(b"abc\ndef")
+        inst.skip(1)
+        f = inst.getfile()
+        self.assertIs(inst.getfile(), f)
+        self.assertEqual(f.readline(), b"bc\n")
+        self.assertEqual(f.read(), b"def")
+        inst.prune()  # does nothing once the file was handed out
+        self.assertIs(inst.getfile(), f)
+
+    def test_close(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        f = inst.getfile()
+        inst.close()
+        self.assertTrue(f.closed)
+        self.assertTrue(inst.file.closed)
+        self.assertEqual(len(inst), 0)
+
+
+class TestDiskIO(unittest.TestCase):
+    def _makeOne(self):
+        from waitress.buffers import DiskIO
+
+        return DiskIO()
+
+    def test_submit_runs_jobs_in_order(self):
+        import threading
+
+        inst = self._makeOne()
+        L = []
+        done = threading.Event()
+        inst.submit(lambda: L.append(1))
+        inst.submit(lambda: L.append(2))
+        inst.submit(done.set)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(L, [1, 2])
+        self.assertEqual(inst.thread.name, "waitress-disk-io")
+        self.assertTrue(inst.thread.daemon)
+
+    def test_submit_restarts_thread(self):
+        inst = self._makeOne()
+        inst.thread = DummyThread()
+        inst.submit(lambda: None)
+        self.assertIsNot(inst.thread.__class__, DummyThread)
+
+    def test_run_logs_exceptions(self):
+        inst = self._makeOne()
+
+        def job():
+            raise ValueError("x")
+
+        def stop():
+            raise SystemExit
+
+        inst.jobs.extend([job, stop])
+        with self.assertLogs("waitress", level="ERROR") as cm:
+            self.assertRaises(SystemExit, inst.run)
+        self.assertIn("Exception in disk I/O", cm.output[0])
+
+
+class TestBackgroundDiskBuffer(unittest.TestCase):
+    def _makeOne(self, backlog=100, prefetch_bytes=4):
+        from waitress.buffers import BackgroundDiskBuffer
+
+        self.io = DummyIO()
+        self.ready = []
+        self.drained = []
+        buf = BackgroundDiskBuffer(
+            self.io,
+            backlog,
+            lambda: self.ready.append(True),
+            lambda: self.drained.append(True),
+        )
+        buf.prefetch_bytes = prefetch_bytes
+        self.buffers_to_close.append(buf)
+        return buf
+
+    def setUp(self):
+        self.buffers_to_close = []
+
+    def tearDown(self):
+        for buf in self.buffers_to_close:
+            buf.close()
+            if buf.buf is not None:
+                buf.buf.close()
+
+    def test_append_queues(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.append(memoryview(b"de"))
+        inst.append(b"")
+        self.assertEqual(len(inst), 5)
+        self.assertTrue(inst)
+        self.assertEqual(list(inst.pending), [b"abc", b"de"])
+        self.assertEqual(inst.buf, None)
+        self.assertEqual(len(self.io.jobs), 1)
+
+    def test_work_writes(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.append(b"de")
+        self.io.run()
+        self.assertEqual(inst.pending_len, 0)
+        self.assertEqual(inst.buf.get(), b"abcde")
+        self.assertFalse(inst.scheduled)
+        self.assertEqual(len(inst.prefetched), 0)
+        self.assertEqual(self.ready, [])
+
+    def test_get_reads_ahead(self):
+        inst = self._makeOne()
+        inst.append(b"abcdefghij")
+        self.assertFalse(inst.ready())
+        self.assertEqual(inst.get(), b"")
+        self.io.run()
+        self.assertEqual(self.ready, [True])
+        # up to twice prefetch_bytes
+        self.assertEqual(list(inst.prefetched), [b"abcd", b"efgh"])
+        self.assertTrue(inst.ready())
+        self.assertEqual(inst.get(), b"abcd")
+        self.assertEqual(inst.get(2), b"ab")
+        self.assertEqual(inst.get(2, skip=True), b"ab")
+        self.assertEqual(inst.get(), b"cd")
+        self.assertEqual(len(inst), 8)
+        # room was made for more
+        self.assertEqual(len(self.io.jobs), 1)
+        self.io.run()
+        self.assertEqual(list(inst.prefetched), [b"abcd", b"efgh", b"ij"])
+        self.assertEqual(self.ready, [True])  # nobody was waiting
+        inst.skip(2)
+        self.assertEqual(len(self.io.jobs), 0)
+        inst.skip(6)
+        self.assertEqual(len(inst), 0)
+        self.assertFalse(inst.ready())
+        self.assertEqual(len(self.io.jobs), 0)
+
+    def test_skip_too_much(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        self.assertRaises(ValueError, inst.skip, 1)
+
+    def test_append_past_backlog(self):
+        inst = self._makeOne(backlog=3)
+        inst.lock.wait = None  # never waits
+        inst.append(b"ab")
+        self.assertFalse(inst.full())
+        inst.append(b"cd")
+        self.assertTrue(inst.full())
+        inst.append(b"e")
+        self.assertEqual(list(inst.pending), [b"ab", b"cd", b"e"])
+        self.io.run()
+        self.assertFalse(inst.full())
+        self.assertEqual(self.drained, [True])
+        self.assertEqual(inst.buf.get(), b"abcde")
+
+    def test_drained_not_wanted(self):
+        inst = self._makeOne(backlog=3)
+        inst.append(b"abcd")
+        self.io.run()
+        self.assertEqual(self.drained, [])
+
+    def test_drained_once_caught_up(self):
+        inst = self._makeOne(backlog=3)
+        inst.append(b"abc")
+        self.assertTrue(inst.full())
+        writes = []
+
+        class Buffer:
+            def append(self, s):
+                writes.append(s)
+                if len(writes) == 1:
+                    # appended while the first write is under way
+                    inst.append(b"defg")
+
+            def close(self):
+                pass
+
+        inst.buf = Buffer()
+        self.io.run()
+        self.assertEqual(writes, [b"abc", b"defg"])
+        # still full after the first write
+        self.assertEqual(self.drained, [True])
+        self.assertFalse(inst.full())
+
+    def test_drained_on_error(self):
+        inst = self._makeOne(backlog=3)
+        inst.append(b"abc")
+        self.assertTrue(inst.full())
+
+        class Buffer:
+            def append(self, s):
+                raise OSError("full")
+
+            def close(self):
+                pass
+
+        inst.buf = Buffer()
+        self.io.run()
+        self.assertEqual(self.drained, [True])
+        self.assertRaises(OSError, inst.append, b"d")
+
+    def test_getfile(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.lock.wait = self.io.run
+        f = inst.getfile()
+        self.assertEqual(f.read(), b"abc")
+
+    def test_getfile_nothing_appended(self):
+        inst = self._makeOne()
+        f = inst.getfile()
+        self.assertEqual(f.read(), b"")
+
+    def test_error(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.ready()
+
+        class Buffer:
+            def append(self, s):
+                raise OSError("full")
+
+            def close(self):
+                pass
+
+        inst.buf = Buffer()
+        self.io.run()
+        self.assertEqual(self.ready, [True])
+        self.assertFalse(inst.scheduled)
+        self.assertRaises(OSError, inst.ready)
+        self.assertRaises(OSError, inst.append, b"d")
+        self.assertRaises(OSError, inst.getfile)
+
+    def test_close(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        self.io.run()
+        buf = inst.buf
+        inst.close()
+        self.assertEqual(len(inst), 0)
+        self.assertEqual(inst.buf, None)
+        self.assertTrue(buf.file.closed)
+
+    def test_close_while_scheduled(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.close()
+        self.assertEqual(len(inst.pending), 0)
+        self.io.run()
+        self.assertEqual(inst.buf, None)
+        self.assertFalse(inst.scheduled)
+
+    def test_prune(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.prune()
+        self.assertEqual(len(inst), 3)
+
+
 class TestBytesIOBasedBuffer(unittest.TestCase):
     def _makeOne(self, from_buffer=None):
         from waitress.buffers import BytesIOBasedBuffer
@@ -210,6 +588,56 @@ class TestReadOnlyFileBasedBuffer(unittest.TestCase):
         self.assertEqual(inst.file.seeked, 0)
         self.assertTrue(hasattr(inst, "close"))
 
+    def test_prepare_sendfile_bytesio(self):
+        inst = self._makeOne(io.BytesIO(b"abc"))
+        inst.prepare()
+        self.assertEqual(inst.fileno, None)
+
+    @unittest.skipIf(not hasattr(os, "sendfile"), "needs os.sendfile")
+    def test_prepare_sendfile_regular_file(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b"abc")
+            f.seek(1)
+            inst = self._makeOne(f)
+            self.assertEqual(inst.prepare(), 2)
+            self.assertEqual(inst.fileno, f.fileno())
+
+    @unittest.skipIf(not hasattr(os, "sendfile"), "needs os.sendfile")
+    def test_prepare_sendfile_unbuffered_file(self):
+        with tempfile.TemporaryFile(buffering=0) as f:
+            inst = self._makeOne(f)
+            inst.prepare()
+            self.assertEqual(inst.fileno, f.fileno())
+
+    def test_prepare_sendfile_wrapped_file(self):
+        import gzip
+
+        with tempfile.TemporaryFile() as f:
+            with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                gz.write(b"abc")
+            f.seek(0)
+            with gzip.GzipFile(fileobj=f, mode="rb") as gz:
+                inst = self._makeOne(gz)
+                inst.prepare()
+                self.assertEqual(inst.fileno, None)
+
+    def test_sendfile_fileno_not_regular_file(self):
+        from waitress.buffers import _sendfile_fileno
+
+        r, w = os.pipe()
+        try:
+            with open(r, "rb") as f:
+                self.assertEqual(_sendfile_fileno(f), None)
+        finally:
+            os.close(w)
+
+    def test_sendfile_fileno_closed_file(self):
+        from waitress.buffers import _sendfile_fileno
+
+        with tempfile.TemporaryFile() as f:
+            pass
+        self.assertEqual(_sendfile_fileno(f), None)
+
     def test_get_numbytes_neg_one(self):
         f = io.BytesIO(b"abcdef")
         inst = self._makeOne(f)
@@ -493,6 +921,456 @@ class TestOverflowableBuffer(unittest.TestCase):
         self.buffers_to_close.remove(inst)
 
 
+class TestSegmentedBuffer(unittest.TestCase):
+    def _makeOne(self, overflow=10):
+        from waitress.buffers import SegmentedBuffer
+
+        buf = SegmentedBuffer(overflow)
+        self.buffers_to_close.append(buf)
+        return buf
+
+    def setUp(self):
+        self.buffers_to_close = []
+
+    def tearDown(self):
+        for buf in self.buffers_to_close:
+            buf.close()
+
+    def test_segments_released_when_empty(self):
+        inst = self._makeOne()
+        self.assertEqual(inst.segments, ())
+        inst.append(b"abc")
+        inst.append(b"de")
+        self.assertEqual(list(inst.segments), [b"abc", b"de"])
+        inst.skip(4)
+        self.assertEqual(list(inst.segments), [b"de"])
+        inst.skip(1)
+        self.assertEqual(inst.segments, ())
+        self.assertEqual(inst.offset, 0)
+        inst.append(b"fg")
+        self.assertEqual(inst.get(), b"fg")
+
+    def test___len__(self):
+        inst = self._makeOne()
+        self.assertEqual(len(inst), 0)
+        self.assertFalse(inst)
+        inst.append(b"abc")
+        inst.append(b"de")
+        self.assertEqual(len(inst), 5)
+        self.assertTrue(inst)
+
+    def test_append_keeps_segments(self):
+        inst = self._makeOne()
+        data = b"abc"
+        inst.append(data)
+        inst.append(b"")
+        self.assertEqual(list(inst.segments), [data])
+        self.assertIs(inst.segments[0], data)
+
+    def test_append_copies_memoryview(self):
+        inst = self._makeOne()
+        data = bytearray(b"abc")
+        inst.append(memoryview(data))
+        data[:] = b"xyz"
+        self.assertEqual(inst.segments[0].__class__, bytes)
+        self.assertEqual(inst.get(), b"abc")
+
+    def test_get_whole_segment(self):
+        inst = self._makeOne()
+        data = b"abc"
+        inst.append(data)
+        inst.append(b"de")
+        self.assertIs(inst.get(3), data)
+
+    def test_get_part_of_segment_is_a_view(self):
+        inst = self._makeOne()
+        inst.append(b"abcd")
+        result = inst.get(2)
+        self.assertEqual(result.__class__, memoryview)
+        self.assertEqual(result, b"ab")
+        inst.skip(1)
+        self.assertEqual(inst.get(2), b"bc")
+
+    def test_get_across_segments(self):
+        inst = self._makeOne()
+        inst.append(b"ab")
+        inst.append(b"cd")
+        inst.append(b"ef")
+        inst.skip(1)
+        self.assertEqual(inst.get(4), b"bcde")
+        self.assertEqual(inst.get(), b"bcdef")
+        self.assertEqual(inst.get(100), b"bcdef")
+        self.assertEqual(len(inst), 5)
+
+    def test_get_empty(self):
+        inst = self._makeOne()
+        self.assertEqual(inst.get(), b"")
+
+    def test_get_skip(self):
+        inst = self._makeOne()
+        inst.append(b"ab")
+        inst.append(b"cd")
+        self.assertEqual(inst.get(3, skip=True), b"abc")
+        self.assertEqual(len(inst), 1)
+        self.assertEqual(list(inst.segments), [b"cd"])
+        self.assertEqual(inst.offset, 1)
+
+    def test_skip_across_segments(self):
+        inst = self._makeOne()
+        inst.append(b"ab")
+        inst.append(b"cd")
+        inst.append(b"ef")
+        inst.skip(4)
+        self.assertEqual(list(inst.segments), [b"ef"])
+        self.assertEqual(inst.offset, 0)
+        inst.skip(2)
+        self.assertEqual(len(inst.segments), 0)
+        self.assertEqual(len(inst), 0)
+
+    def test_skip_too_much(self):
+        inst = self._makeOne()
+        inst.append(b"ab")
+        self.assertRaises(ValueError, inst.skip, 3)
+
+    def test_get_segments(self):
+        inst = self._makeOne(overflow=100)
+        inst.append(b"abc")
+        inst.append(b"def")
+        inst.append(b"ghi")
+        inst.skip(1)
+        self.assertEqual(inst.get_segments(100, 10), [b"bc", b"def", b"ghi"])
+        self.assertEqual(inst.get_segments(4, 10), [b"bc", b"de"])
+        self.assertEqual(inst.get_segments(100, 2), [b"bc", b"def"])
+        self.assertEqual(len(inst), 8)
+
+    def test_get_segments_overflowed(self):
+        inst = self._makeOne(overflow=5)
+        inst.append(b"abcdef")
+        self.assertEqual(inst.get_segments(3, 10), [b"abc"])
+        inst.skip(6)
+        self.assertEqual(inst.get_segments(3, 10), [])
+
+    def test_append_overflow(self):
+        inst = self._makeOne(overflow=5)
+        inst.append(b"abc")
+        inst.skip(1)
+        inst.append(b"def")
+        from waitress.buffers import DiskBuffer
+
+        self.assertTrue(inst.overflowed)
+        self.assertEqual(inst.buf.__class__, DiskBuffer)
+        self.assertEqual(len(inst.segments), 0)
+        self.assertEqual(inst.get(), b"bcdef")
+        inst.append(b"g")
+        self.assertEqual(len(inst), 6)
+        inst.skip(2)
+        self.assertEqual(inst.get(), b"defg")
+
+    def test_append_overflow_background(self):
+        from waitress.buffers import BackgroundDiskBuffer
+
+        inst = self._makeOne(overflow=5)
+        inst.background = True
+        inst.append(b"abc")
+        self.assertTrue(inst.ready())
+        self.assertFalse(inst.full())
+        inst.skip(1)
+        inst.append(b"def")
+        self.assertEqual(inst.buf.__class__, BackgroundDiskBuffer)
+        self.assertEqual(len(inst.segments), 0)
+        self.assertEqual(len(inst), 5)
+        self.assertEqual(list(inst.buf.pending), [b"bc", b"def"])
+        # the thread is 5 bytes behind
+        self.assertTrue(inst.full())
+
+    def test_full_overflowed(self):
+        inst = self._makeOne(overflow=5)
+        inst.append(b"abcdef")
+        self.assertFalse(inst.full())
+
+    def test_getfile(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.skip(1)
+        f = inst.getfile()
+        self.assertEqual(inst.buf.__class__.__name__, "BytesIOBasedBuffer")
+        self.assertEqual(f.getvalue(), b"bc")
+        self.assertFalse(inst.overflowed)
+
+    def test_getfile_then_overflow(self):
+        inst = self._makeOne(overflow=5)
+        inst.append(b"abc")
+        inst.getfile()
+        inst.append(b"def")
+        from waitress.buffers import DiskBuffer
+
+        self.assertTrue(inst.overflowed)
+        self.assertEqual(inst.buf.__class__, DiskBuffer)
+        self.assertEqual(inst.get(), b"abcdef")
+
+    def test_getview(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.append(b"de")
+        view = inst.getview()
+        self.assertEqual(view, b"abcde")
+        self.assertTrue(view.readonly)
+        self.assertEqual(inst.map, None)
+
+    def test_getview_overflowed(self):
+        inst = self._makeOne(overflow=5)
+        inst.append(b"abc")
+        inst.append(b"def")
+        view = inst.getview()
+        self.assertEqual(view, b"abcdef")
+        self.assertTrue(view.readonly)
+        self.assertIsNot(inst.map, None)
+        self.assertEqual(inst.getview().obj, inst.map)
+        # reading wsgi.input doesn't change the view
+        self.assertEqual(inst.getfile().read(2), b"ab")
+        self.assertEqual(view, b"abcdef")
+        view.release()
+        map = inst.map
+        inst.close()
+        self.assertTrue(map.closed)
+        self.assertEqual(inst.map, None)
+
+    def test_getview_overflowed_empty(self):
+        inst = self._makeOne(overflow=5)
+        inst.append(b"abcdef")
+        inst.buf.file.truncate(0)
+        self.assertEqual(inst.getview(), b"")
+
+    def test_close_view_still_held(self):
+        inst = self._makeOne(overflow=5)
+        inst.append(b"abcdef")
+        view = inst.getview()
+        inst.close()
+        self.assertEqual(inst.map, None)
+        self.assertEqual(view, b"abcdef")
+        view.release()
+
+    def test_prune(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.prune()
+        self.assertEqual(inst.get(), b"abc")
+
+    def test_prune_with_buf(self):
+        inst = self._makeOne(overflow=2)
+        inst.append(b"abc")
+        inst.skip(3, allow_prune=True)
+        inst.prune()
+        self.assertEqual(len(inst), 0)
+        inst.append(b"d")
+        self.assertEqual(inst.get(), b"d")
+
+    def test_close(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.close()
+        self.assertEqual(len(inst), 0)
+        self.assertEqual(len(inst.segments), 0)
+
+    def test_close_with_buf(self):
+        inst = self._makeOne(overflow=2)
+        inst.append(b"abc")
+        buf = inst.buf
+        inst.close()
+        self.assertTrue(buf.file.closed)
+
+
+class TestStreamingBuffer(unittest.TestCase):
+    def _makeOne(self, limit=10, on_drained=None):
+        from waitress.buffers import StreamingBuffer
+
+        return StreamingBuffer(limit, on_drained)
+
+    def test_ctor(self):
+        inst = self._makeOne()
+        self.assertEqual(len(inst), 0)
+        self.assertTrue(inst)
+        self.assertTrue(inst.readable())
+        self.assertIs(inst.getfile(), inst)
+        self.assertFalse(inst.full())
+
+    def test_append(self):
+        inst = self._makeOne()
+        inst.append(b"")
+        inst.append(b"abc")
+        inst.append(memoryview(b"def"))
+        self.assertEqual(len(inst), 6)
+        self.assertEqual(inst.remain, 6)
+        self.assertEqual(list(inst.segments), [b"abc", b"def"])
+
+    def test_append_after_finish(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.finish()
+        inst.append(b"def")
+        self.assertEqual(len(inst), 3)
+
+    def test_read_all(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.append(b"def")
+        inst.finish()
+        self.assertEqual(inst.read(), b"abcdef")
+        self.assertEqual(inst.read(), b"")
+
+    def test_read_size(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.append(b"def")
+        self.assertEqual(inst.read(2), b"ab")
+        self.assertEqual(inst.read(2), b"cd")
+        self.assertEqual(inst.read(2), b"ef")
+        inst.finish()
+        self.assertEqual(inst.read(2), b"")
+
+    def test_read_size_past_end(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.finish()
+        self.assertEqual(inst.read(10), b"abc")
+
+    def test_read1(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        self.assertEqual(inst.read1(10), b"abc")
+        inst.append(b"def")
+        self.assertEqual(inst.read1(), b"def")
+
+    def test_readinto(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.finish()
+        buf = bytearray(5)
+        self.assertEqual(inst.readinto(buf), 3)
+        self.assertEqual(buf, b"abc\x00\x00")
+
+    def test_readline(self):
+        inst = self._makeOne()
+        inst.append(b"ab")
+        inst.append(b"c\nde")
+        inst.append(b"f\ng")
+        self.assertEqual(inst.readline(), b"abc\n")
+        self.assertEqual(inst.readline(), b"def\n")
+        inst.finish()
+        self.assertEqual(inst.readline(), b"g")
+        self.assertEqual(inst.readline(), b"")
+
+    def test_readline_size(self):
+        inst = self._makeOne()
+        inst.append(b"abcdef\n")
+        self.assertEqual(inst.readline(4), b"abcd")
+        self.assertEqual(inst.readline(4), b"ef\n")
+
+    def test_readlines(self):
+        inst = self._makeOne()
+        inst.append(b"a\nb\nc")
+        inst.finish()
+        self.assertEqual(inst.readlines(), [b"a\n", b"b\n", b"c"])
+
+    def test_full_and_on_drained(self):
+        drained = []
+        inst = self._makeOne(limit=4, on_drained=lambda: drained.append(True))
+        inst.append(b"abc")
+        self.assertFalse(inst.full())
+        inst.read(1)
+        self.assertEqual(drained, [])
+        inst.append(b"defg")
+        self.assertTrue(inst.full())
+        inst.read(1)
+        self.assertTrue(inst.full())
+        self.assertEqual(drained, [])
+        inst.read(3)
+        self.assertFalse(inst.full())
+        self.assertEqual(drained, [True])
+
+    def _makeFed(self, *chunks, finish=True):
+        # a buffer that receives the next chunk whenever it is drained, like
+        # a channel that starts reading from its socket again
+        chunks = list(chunks)
+
+        def on_drained():
+            if chunks:
+                inst.append(chunks.pop(0))
+                if finish and not chunks:
+                    inst.finish()
+
+        inst = self._makeOne(limit=4, on_drained=on_drained)
+        inst.append(chunks.pop(0))
+        return inst
+
+    def test_read_all_past_limit(self):
+        inst = self._makeFed(b"abcd", b"efgh", b"ij")
+        self.assertEqual(inst.read(), b"abcdefghij")
+
+    def test_read_size_past_limit(self):
+        inst = self._makeFed(b"abcd", b"efgh", b"ijk", finish=False)
+        self.assertEqual(inst.read(10), b"abcdefghij")
+        self.assertEqual(inst.read(1), b"k")
+
+    def test_readline_past_limit(self):
+        inst = self._makeFed(b"abcd", b"ef\ng", finish=False)
+        self.assertEqual(inst.readline(), b"abcdef\n")
+        self.assertEqual(inst.read1(), b"g")
+
+    def test_abort(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        error = ValueError("bad")
+        inst.abort(error)
+        inst.abort(KeyError())
+        self.assertIs(inst.error, error)
+        self.assertRaises(ValueError, inst.read)
+        self.assertEqual(inst.read(3), b"abc")
+        self.assertRaises(ValueError, inst.read, 1)
+
+    def test_abort_after_finish(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.finish()
+        inst.abort(ValueError())
+        self.assertEqual(inst.error, None)
+        self.assertEqual(inst.read(), b"abc")
+
+    def test_close(self):
+        inst = self._makeOne()
+        inst.append(b"abc")
+        inst.close()
+        self.assertTrue(inst.closed)
+        self.assertEqual(inst.remain, 0)
+        inst.append(b"def")
+        self.assertEqual(len(inst), 3)
+        self.assertRaises(ValueError, inst.read)
+
+    def test_read_blocks_until_appended(self):
+        import threading
+
+        inst = self._makeOne()
+        result = []
+        reader = threading.Thread(target=lambda: result.append(inst.read(4)))
+        reader.start()
+        inst.append(b"ab")
+        inst.append(b"cd")
+        reader.join(5)
+        self.assertEqual(result, [b"abcd"])
+
+    def test_read_blocks_until_finished(self):
+        import threading
+
+        inst = self._makeOne()
+        result = []
+        reader = threading.Thread(target=lambda: result.append(inst.read()))
+        reader.start()
+        inst.append(b"ab")
+        inst.finish()
+        reader.join(5)
+        self.assertEqual(result, [b"ab"])
+
+
 class KindaFilelike:
     def __init__(self, bytes, close=None, tellresults=None):
         self.bytes = bytes
@@ -510,6 +1388,31 @@ class Filelike(KindaFilelike):
         return v
 
 
+class DummyFileBuffer:
+    def __init__(self, file):
+        self.file = file
+
+    def getfile(self):
+        return self.file
+
+
+class DummyIO:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, job):
+        self.jobs.append(job)
+
+    def run(self):
+        while self.jobs:
+            self.jobs.pop(0)()
+
+
+class DummyThread:
+    def is_alive(self):
+        return False
+
+
 class DummyBuffer:
     def __init__(self, length=0):
         self.length = length
@@ -26,6 +26,106 @@ class TestHTTPChannel(unittest.TestCase):
         self.assertEqual(inst.sendbuf_len, 2048)
         self.assertEqual(map[100], inst)
 
+    def test_ctor_sendbuf_len_cached_on_server(self):
+        from waitress.channel import HTTPChannel
+
+        server = DummyServer()
+        first = HTTPChannel(server, DummySock(), "127.0.0.1", DummyAdjustments(), {})
+        self.assertEqual(server.sendbuf_len, 2048)
+        server.sendbuf_len = 1024
+        second = HTTPChannel(server, DummySock(), "127.0.0.1", DummyAdjustments(), {})
+        self.assertEqual(first.sendbuf_len, 2048)
+        self.assertEqual(second.sendbuf_len, 1024)
+
+    def test_ctor_idle_footprint(self):
+        import threading
+
+        inst = self._makeOne(DummySock(), "127.0.0.1", DummyAdjustments())
+        # nothing that a connection doesn't need until it gets a request
+        self.assertNotIn("requests_lock", inst.__dict__)
+        self.assertNotIn("outbuf_lock", inst.__dict__)
+        self.assertEqual(inst.outbufs[0].segments, ())
+        lock = inst.outbuf_lock
+        self.assertEqual(lock.__class__, threading.Condition)
+        self.assertIs(inst.outbuf_lock, lock)
+
+    def test_idle_bytes_per_connection(self):
+        import sys
+        import tracemalloc
+
+        from waitress.adjustments import Adjustments
+        from waitress.channel import HTTPChannel
+
+        count = 1000
+        server = DummyServer()
+        adj = Adjustments()
+        socks = [DummySock() for i in range(count)]
+        for fd, sock in enumerate(socks, 100):
+            sock.fileno = lambda fd=fd: fd
+        map = {}
+        channels = []
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for sock in socks:
+                channels.append(HTTPChannel(server, sock, "127.0.0.1", adj, map))
+            used = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+
+        per_connection = used // count
+        sys.stderr.write(f"{per_connection} bytes per idle connection\n")
+        self.assertEqual(len(map), count)
+        # about 1000 bytes on CPython 3.11, 3200 with eagerly created locks
+        self.assertLess(per_connection, 1500)
+
+    def _registerPoller(self, map):
+        from waitress import wasyncore
+
+        poller = DummyPoller()
+        wasyncore._selector_polls[id(map)] = poller
+        self.addCleanup(wasyncore._selector_polls.pop, id(map), None)
+        return poller
+
+    def test_write_soon_marks_dirty(self):
+        inst, sock, map = self._makeOneWithMap()
+        poller = self._registerPoller(map)
+        inst.write_soon(b"abc")
+        self.assertIn(100, poller.dirty)
+
+    def test_received_marks_dirty(self):
+        inst, sock, map = self._makeOneWithMap()
+        poller = self._registerPoller(map)
+        inst.received(b"GET / HTTP/1.1\r\n\r\n")
+        self.assertEqual(poller.dirty, [100])
+
+    def test_service_marks_dirty(self):
+        inst, sock, map = self._makeOneWithMap()
+        poller = self._registerPoller(map)
+        inst.task_class = DummyTaskClass()
+        inst.requests = [DummyRequest()]
+        inst.service()
+        self.assertEqual(poller.dirty, [100])
+
+    def test_cancel_marks_dirty(self):
+        inst, sock, map = self._makeOneWithMap()
+        poller = self._registerPoller(map)
+        inst.cancel()
+        self.assertEqual(poller.dirty, [100])
+
+    def test_pull_trigger_server_loop(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.pull_trigger()
+        self.assertTrue(inst.server.trigger_pulled)
+
+    def test_pull_trigger_event_loop(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.loop = DummyEventLoop()
+        inst.pull_trigger()
+        self.assertFalse(inst.server.trigger_pulled)
+        self.assertTrue(inst.loop.trigger_pulled)
+
     def test_total_outbufs_len_an_outbuf_size_gt_sys_maxint(self):
         from waitress.compat import MAXINT
 
@@ -53,6 +153,12 @@ class TestHTTPChannel(unittest.TestCase):
         inst.total_outbufs_len = 3
         self.assertTrue(inst.writable())
 
+    def test_writable_outbuf_waiting(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.total_outbufs_len = 3
+        inst.outbuf_waiting = True
+        self.assertFalse(inst.writable())
+
     def test_writable_nothing_in_outbuf(self):
         inst, sock, map = self._makeOneWithMap()
         self.assertFalse(inst.writable())
@@ -178,26 +284,62 @@ class TestHTTPChannel(unittest.TestCase):
         inst.requests = [True]
         self.assertEqual(inst.readable(), False)
 
+    def test_readable_body_full(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.request = DummyParser()
+        self.assertEqual(inst.readable(), True)
+        inst.request.full = True
+        self.assertEqual(inst.readable(), False)
+
     def test_handle_read_no_error(self):
         inst, sock, map = self._makeOneWithMap()
         inst.will_close = False
-        inst.recv = lambda *arg: b"abc"
+        sock.sent = b"abc"
         inst.last_activity = 0
         L = []
-        inst.received = lambda x: L.append(x)
+        inst.received = lambda x: L.append(bytes(x))
         result = inst.handle_read()
         self.assertEqual(result, None)
         self.assertNotEqual(inst.last_activity, 0)
         self.assertEqual(L, [b"abc"])
 
+    def test_handle_read_reuses_buffer(self):
+        inst, sock, map = self._makeOneWithMap()
+        L = []
+        inst.received = lambda x: L.append(x)
+        sock.sent = b"abc"
+        inst.handle_read()
+        sock.sent = b"de"
+        inst.handle_read()
+        self.assertIs(L[0].obj, L[1].obj)
+        self.assertEqual(len(L[0].obj), inst.adj.recv_bytes)
+        self.assertEqual(bytes(L[1]), b"de")
+
+    def test_handle_read_disconnected(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.recv_into = lambda buf: 0
+        inst.received = lambda x: self.fail("received called")  # pragma: no cover
+        inst.handle_read()
+        self.assertFalse(inst.connected)
+
+    def test_received_memoryview(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.server = DummyServer()
+        buf = bytearray(b"GET / HTTP/1.1\r\n\r\nGET /x HTTP/1.1\r\n")
+        inst.received(memoryview(buf))
+        # nothing keeps a view of the buffer
+        buf[:] = b"x" * len(buf)
+        self.assertEqual(inst.requests[0].path, "/")
+        self.assertEqual(inst.request.header_plus, b"GET /x HTTP/1.1\r\n")
+
     def test_handle_read_error(self):
         inst, sock, map = self._makeOneWithMap()
         inst.will_close = False
 
-        def recv(b):
+        def recv_into(b):
             raise OSError
 
-        inst.recv = recv
+        inst.recv_into = recv_into
         inst.last_activity = 0
         inst.logger = DummyLogger()
         result = inst.handle_read()
@@ -243,7 +385,7 @@ class TestHTTPChannel(unittest.TestCase):
         self.assertEqual(wrote, 3)
         self.assertEqual(len(outbufs), 2)
         self.assertEqual(outbufs[0], wrapper)
-        self.assertEqual(outbufs[1].__class__.__name__, "OverflowableBuffer")
+        self.assertEqual(outbufs[1].__class__.__name__, "SegmentedBuffer")
 
     def test_write_soon_disconnected(self):
         from waitress.channel import ClientDisconnected
@@ -272,11 +414,50 @@ class TestHTTPChannel(unittest.TestCase):
 
         sock.send = send
 
+        inst.adj.outbuf_high_watermark = 3
+        inst.current_outbuf_count = 4
+        inst.outbufs[0].append(b"abcd")
+        wrote = inst.write_soon(b"xyz")
+        self.assertEqual(wrote, 3)
+        self.assertEqual(len(inst.outbufs), 2)
+        self.assertEqual(inst.outbufs[0].get(), b"abcd")
+        self.assertEqual(inst.outbufs[1].get(), b"xyz")
+        self.assertEqual(inst.current_outbuf_count, 3)
+
+    def test_write_soon_reuses_sent_outbuf_on_overflow(self):
+        inst, sock, map = self._makeOneWithMap()
+
+        # _flush_some will no longer flush
+        def send(_):
+            return 0
+
+        sock.send = send
+
+        outbuf = inst.outbufs[0]
+        inst.adj.outbuf_high_watermark = 3
+        inst.current_outbuf_count = 4
+        wrote = inst.write_soon(b"xyz")
+        self.assertEqual(wrote, 3)
+        self.assertEqual(inst.outbufs, [outbuf])
+        self.assertEqual(outbuf.get(), b"xyz")
+        self.assertEqual(inst.current_outbuf_count, 3)
+
+    def test_write_soon_rotates_overflowed_outbuf(self):
+        inst, sock, map = self._makeOneWithMap()
+
+        # _flush_some will no longer flush
+        def send(_):
+            return 0
+
+        sock.send = send
+
+        inst.outbufs[0].overflowed = True
         inst.adj.outbuf_high_watermark = 3
         inst.current_outbuf_count = 4
         wrote = inst.write_soon(b"xyz")
         self.assertEqual(wrote, 3)
         self.assertEqual(len(inst.outbufs), 1)
+        self.assertFalse(inst.outbufs[0].overflowed)
         self.assertEqual(inst.outbufs[0].get(), b"xyz")
 
     def test_write_soon_waits_on_backpressure(self):
@@ -398,6 +579,42 @@ class TestHTTPChannel(unittest.TestCase):
         result = inst._flush_some()
         self.assertEqual(result, True)
 
+    def test__flush_some_outbuf_not_ready(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.outbufs[0].append(b"abc")
+        inst.outbufs[0].ready = lambda: False
+        inst.total_outbufs_len = 3
+        result = inst._flush_some()
+        self.assertEqual(result, False)
+        self.assertEqual(sock.sent, b"")
+        self.assertTrue(inst.outbuf_waiting)
+        self.assertFalse(inst.writable())
+
+    def test__flush_some_outbuf_ready(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.outbufs[0].append(b"abc")
+        inst.outbuf_waiting = True
+        inst.total_outbufs_len = 3
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(sock.sent, b"abc")
+        self.assertFalse(inst.outbuf_waiting)
+
+    def test__outbuf_ready(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.outbuf_waiting = True
+        inst._outbuf_ready()
+        self.assertFalse(inst.outbuf_waiting)
+        self.assertTrue(inst.server.trigger_pulled)
+
+    def test_outbufs_background_disk_io(self):
+        adj = DummyAdjustments()
+        adj.background_disk_io = True
+        inst, sock, map = self._makeOneWithMap(adj=adj)
+        outbuf = inst.outbufs[0]
+        self.assertTrue(outbuf.background)
+        self.assertEqual(outbuf.on_ready, inst._outbuf_ready)
+
     def test__flush_some_full_outbuf_socket_returns_zero(self):
         inst, sock, map = self._makeOneWithMap()
         sock.send = lambda x: False
@@ -406,6 +623,228 @@ class TestHTTPChannel(unittest.TestCase):
         result = inst._flush_some()
         self.assertEqual(result, False)
 
+    def test__flush_some_gathers_outbufs(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.outbufs[0].append(b"abc")
+        inst.outbufs.append(DummyBuffer(b"de"))
+        inst.outbufs.append(DummyBuffer(b"f"))
+        inst.total_outbufs_len = 6
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(sock.sent, b"abcdef")
+        self.assertEqual(sock.sendmsgs, 1)
+        self.assertEqual(inst.total_outbufs_len, 0)
+        self.assertEqual(len(inst.outbufs), 1)
+
+    def test__flush_some_gathers_partial_send(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.outbufs[0].append(b"abc")
+        second = DummyBuffer(b"defg")
+        inst.outbufs.append(second)
+        inst.total_outbufs_len = 7
+        L = []
+
+        def sendmsg(buffers, do_close=True):
+            L.append(list(buffers))
+            if len(L) > 1:
+                return 0
+            return 5
+
+        inst.sendmsg = sendmsg
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(L[0], [b"abc", b"defg"])
+        self.assertEqual(second.skipped, 2)
+        self.assertEqual(inst.total_outbufs_len, 2)
+        self.assertEqual(inst.outbufs, [second])
+
+    def test__flush_some_gathers_up_to_sendbuf_len(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.sendbuf_len = 4
+        inst.outbufs[0].append(b"abc")
+        inst.outbufs.append(DummyBuffer(b"de"))
+        inst.outbufs.append(DummyBuffer(b"f"))
+        inst.total_outbufs_len = 6
+        L = []
+
+        def sendmsg(buffers, do_close=True):
+            L.append(list(buffers))
+            return 0
+
+        inst.sendmsg = sendmsg
+        inst._flush_some()
+        self.assertEqual(L, [[b"abc", b"de"]])
+
+    def test__send_outbufs_grows_send_chunk(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.sendbuf_len = 4
+        inst.outbufs[0].append(b"abcdefghijklmnop")
+        inst.total_outbufs_len = 16
+        inst._send_outbufs()
+        self.assertEqual(sock.sent, b"abcd")
+        self.assertEqual(inst.send_chunk_len, 8)
+        inst._send_outbufs()
+        self.assertEqual(sock.sent, b"abcdefghijkl")
+        self.assertEqual(inst.send_chunk_len, 16)
+
+    def test__send_outbufs_send_chunk_max(self):
+        from waitress.channel import MAX_SEND_CHUNK
+
+        inst, sock, map = self._makeOneWithMap()
+        inst.send_chunk_len = MAX_SEND_CHUNK
+        inst.outbufs[0].append(b"x" * (MAX_SEND_CHUNK + 1))
+        inst.total_outbufs_len = MAX_SEND_CHUNK + 1
+        inst._send_outbufs()
+        self.assertEqual(inst.send_chunk_len, MAX_SEND_CHUNK)
+
+    def test__send_outbufs_shrinks_send_chunk(self):
+        from waitress.channel import MIN_SEND_CHUNK
+
+        inst, sock, map = self._makeOneWithMap()
+        inst.sendbuf_len = 65536
+        inst.send_chunk_len = 65536
+        inst.outbufs[0].append(b"x" * 65536)
+        inst.total_outbufs_len = 65536
+        sent = [10000, 100]
+
+        def send(data, do_close=True):
+            return sent.pop(0)
+
+        inst.send = send
+        inst._send_outbufs()
+        self.assertEqual(inst.send_chunk_len, 10000)
+        inst._send_outbufs()
+        self.assertEqual(inst.send_chunk_len, MIN_SEND_CHUNK)
+
+    def test__flush_some_gathers_segments(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.outbufs[0].append(b"abc")
+        inst.outbufs[0].append(b"de")
+        inst.outbufs[0].skip(1)
+        inst.total_outbufs_len = 4
+        L = []
+
+        def sendmsg(buffers, do_close=True):
+            L.append([bytes(x) for x in buffers])
+            return 3
+
+        inst.sendmsg = sendmsg
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(L[0], [b"bc", b"de"])
+        self.assertEqual(inst.total_outbufs_len, 0)
+
+    def test__flush_some_no_sendmsg(self):
+        inst, sock, map = self._makeOneWithMap()
+        # e.g. Windows
+        inst.socket = object()
+        inst.outbufs[0].append(b"abc")
+        inst.outbufs.append(DummyBuffer(b"de"))
+        inst.total_outbufs_len = 5
+        L = []
+        inst.send = lambda data, do_close=True: L.append(data) or len(data)
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(L, [b"abc", b"de"])
+
+    def _makeFileBuffer(self, data):
+        import tempfile
+
+        from waitress.buffers import ReadOnlyFileBasedBuffer
+
+        f = tempfile.TemporaryFile()
+        self.addCleanup(f.close)
+        f.write(data)
+        f.seek(0)
+        buf = ReadOnlyFileBasedBuffer(f)
+        buf.prepare()
+        return buf
+
+    def test__flush_some_sendfile(self):
+        inst, sock, map = self._makeOneWithMap()
+        buf = self._makeFileBuffer(b"abcdef")
+        buf.fileno = 42
+        inst.outbufs.insert(0, buf)
+        inst.total_outbufs_len = 6
+        L = []
+
+        def sendfile(fd, offset, count, do_close=True):
+            L.append((fd, offset, count))
+            return min(count, 4)
+
+        inst.sendfile = sendfile
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(L, [(42, 0, 6), (42, 4, 2)])
+        self.assertEqual(inst.total_outbufs_len, 0)
+        self.assertEqual(len(inst.outbufs), 1)
+        self.assertEqual(sock.sent, b"")
+
+    def test__flush_some_sendfile_would_block(self):
+        inst, sock, map = self._makeOneWithMap()
+        buf = self._makeFileBuffer(b"abcdef")
+        buf.fileno = 42
+        inst.outbufs.insert(0, buf)
+        inst.total_outbufs_len = 6
+        inst.sendfile = lambda fd, offset, count, do_close=True: 0
+        result = inst._flush_some()
+        self.assertEqual(result, False)
+        self.assertEqual(inst.total_outbufs_len, 6)
+        self.assertEqual(buf.remain, 6)
+
+    def test__flush_some_sendfile_unsupported(self):
+        import errno
+
+        inst, sock, map = self._makeOneWithMap()
+        buf = self._makeFileBuffer(b"abcdef")
+        buf.fileno = 42
+        inst.outbufs.insert(0, buf)
+        inst.total_outbufs_len = 6
+
+        def sendfile(fd, offset, count, do_close=True):
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+        inst.sendfile = sendfile
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(buf.fileno, None)
+        self.assertEqual(sock.sent, b"abcdef")
+
+    def test__flush_some_sendfile_error(self):
+        import errno
+
+        inst, sock, map = self._makeOneWithMap()
+        buf = self._makeFileBuffer(b"abcdef")
+        buf.fileno = 42
+        inst.outbufs.insert(0, buf)
+        inst.total_outbufs_len = 6
+
+        def sendfile(fd, offset, count, do_close=True):
+            raise OSError(errno.EIO, "I/O error")
+
+        inst.sendfile = sendfile
+        self.assertRaises(OSError, inst._flush_some)
+
+    def test__flush_some_sendfile_socketpair(self):
+        import os
+        import socket
+
+        if not hasattr(os, "sendfile"):  # pragma: no cover
+            self.skipTest("needs os.sendfile")
+        inst, sock, map = self._makeOneWithMap()
+        a, b = socket.socketpair()
+        self.addCleanup(a.close)
+        self.addCleanup(b.close)
+        inst.socket = a
+        buf = self._makeFileBuffer(b"abcdef")
+        self.assertIsNotNone(buf.fileno)
+        buf.skip(1)
+        inst.outbufs.insert(0, buf)
+        inst.total_outbufs_len = 5
+        result = inst._flush_some()
+        self.assertEqual(result, True)
+        self.assertEqual(b.recv(10), b"bcdef")
+
     def test_flush_some_multiple_buffers_first_empty(self):
         inst, sock, map = self._makeOneWithMap()
         sock.send = lambda x: len(x)
@@ -492,6 +931,129 @@ class TestHTTPChannel(unittest.TestCase):
         inst.del_channel(map)
         self.assertEqual(map.get(fileno), None)
         self.assertEqual(inst.server.active_channels.get(fileno), None)
+        self.assertEqual(inst.server.timers.deadline(inst), None)
+
+    def test_ctor_arms_timeout(self):
+        inst, sock, map = self._makeOneWithMap()
+        self.assertEqual(
+            inst.server.timers.deadline(inst),
+            inst.last_activity + inst.adj.channel_timeout,
+        )
+
+    def _makeOneWithTimeouts(self):
+        adj = DummyAdjustments()
+        adj.header_timeout = 10
+        adj.body_timeout = 20
+        adj.keepalive_timeout = 30
+        adj.write_timeout = 40
+        inst, sock, map = self._makeOneWithMap(adj=adj)
+        inst.last_activity = 1000
+        return inst
+
+    def test_timeout_deadline_keepalive(self):
+        inst = self._makeOneWithTimeouts()
+        self.assertEqual(inst.timeout_deadline(), 1030)
+
+    def test_timeout_deadline_channel_timeout(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.last_activity = 1000
+        self.assertEqual(inst.timeout_deadline(), 1300)
+
+    def test_timeout_deadline_headers(self):
+        inst = self._makeOneWithTimeouts()
+        inst.request = DummyParser()
+        inst.request.headers_finished = False
+        inst.request_started = 900
+        self.assertEqual(inst.timeout_deadline(), 910)
+
+    def test_timeout_deadline_body(self):
+        inst = self._makeOneWithTimeouts()
+        inst.request = DummyParser()
+        inst.request.headers_finished = True
+        inst.request_started = 900
+        self.assertEqual(inst.timeout_deadline(), 1020)
+
+    def test_timeout_deadline_body_full(self):
+        inst = self._makeOneWithTimeouts()
+        inst.request = DummyParser()
+        inst.request.headers_finished = True
+        inst.request.full = True
+        # waiting for the DiskIO thread to write the body
+        self.assertEqual(inst.timeout_deadline(), None)
+
+    def test_timeout_deadline_servicing(self):
+        inst = self._makeOneWithTimeouts()
+        inst.requests = [DummyParser()]
+        self.assertEqual(inst.timeout_deadline(), None)
+
+    def test_timeout_deadline_write(self):
+        inst = self._makeOneWithTimeouts()
+        inst.requests = [DummyParser()]
+        inst.total_outbufs_len = 1
+        inst.output_started = 1100
+        self.assertEqual(inst.timeout_deadline(), 1140)
+
+    def test_arm_timeout_only_earlier(self):
+        inst = self._makeOneWithTimeouts()
+        timers = inst.server.timers
+        timers.schedule(inst, 1050)
+        inst.arm_timeout()
+        self.assertEqual(timers.deadline(inst), 1030)
+        inst.last_activity = 2000
+        inst.arm_timeout()
+        self.assertEqual(timers.deadline(inst), 1030)
+
+    def test_arm_timeout_servicing(self):
+        inst = self._makeOneWithTimeouts()
+        inst.server.timers.cancel(inst)
+        inst.requests = [DummyParser()]
+        inst.arm_timeout()
+        self.assertEqual(inst.server.timers.deadline(inst), None)
+
+    def test_received_partial_request_arms_header_timeout(self):
+        adj = DummyAdjustments()
+        adj.header_timeout = 10
+        inst, sock, map = self._makeOneWithMap(adj=adj)
+        inst.server = DummyServer()
+        inst.last_activity = 1000
+        inst.received(b"GET / HTTP/1.1\r\n")
+        self.assertEqual(inst.request_started, 1000)
+        self.assertEqual(inst.server.timers.deadline(inst), 1010)
+
+    def test_write_soon_arms_write_timeout(self):
+        adj = DummyAdjustments()
+        adj.write_timeout = 10
+        inst, sock, map = self._makeOneWithMap(adj=adj)
+        inst.requests = [DummyParser()]
+        inst.server.timers.cancel(inst)
+        inst._flush_some = lambda do_close=True: False
+        inst.write_soon(b"abc")
+        self.assertTrue(inst.output_started)
+        self.assertEqual(inst.server.timers.deadline(inst), inst.output_started + 10)
+
+    def test__flush_some_arms_keepalive_timeout(self):
+        adj = DummyAdjustments()
+        adj.write_timeout = 100
+        adj.keepalive_timeout = 1
+        inst, sock, map = self._makeOneWithMap(adj=adj)
+        inst.outbufs[0].append(b"abc")
+        inst.total_outbufs_len = 3
+        inst.server.timers.schedule(inst, inst.last_activity + 100)
+        inst._flush_some()
+        self.assertEqual(inst.server.timers.deadline(inst), inst.last_activity + 1)
+
+    def test_handle_timeout(self):
+        inst, sock, map = self._makeOneWithMap()
+        inst.outbufs[0].append(b"abc")
+        inst.total_outbufs_len = 3
+        inst.handle_timeout()
+        self.assertTrue(inst.will_close)
+        self.assertFalse(inst.connected)
+        self.assertTrue(sock.closed)
+        self.assertEqual(sock.sent, b"")
+        self.assertEqual(map, {})
+        # closed already
+        inst.handle_timeout()
 
     def test_received(self):
         inst, sock, map = self._makeOneWithMap()
@@ -500,6 +1062,124 @@ class TestHTTPChannel(unittest.TestCase):
         self.assertEqual(inst.server.tasks, [inst])
         self.assertTrue(inst.requests)
 
+    def _makeOneStreaming(self):
+        adj = DummyAdjustments()
+        adj.stream_request_body = True
+        adj.inbuf_overflow = 4
+        inst, sock, map = self._makeOneWithMap(adj=adj)
+        inst.server = DummyServer()
+        return inst
+
+    def test_received_streaming_queued_after_headers(self):
+        inst = self._makeOneStreaming()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 6\r\n\r\nab")
+        request = inst.request
+        self.assertEqual(inst.streaming_request, request)
+        self.assertEqual(inst.requests, [request])
+        self.assertEqual(inst.server.tasks, [inst])
+        self.assertEqual(request.body_drained, inst._body_drained)
+        self.assertEqual(request.body_stream.read1(), b"ab")
+        self.assertTrue(inst.readable())
+        inst.received(b"cdef")
+        self.assertEqual(inst.request, None)
+        self.assertEqual(inst.streaming_request, None)
+        self.assertEqual(inst.requests, [request])
+        self.assertEqual(inst.server.tasks, [inst])
+        self.assertEqual(request.body_stream.read(), b"cdef")
+
+    def test_received_streaming_then_pipelined(self):
+        inst = self._makeOneStreaming()
+        inst.received(
+            b"POST / HTTP/1.1\r\nContent-Length: 2\r\n\r\nabGET / HTTP/1.1\r\n\r\n"
+        )
+        self.assertEqual(inst.streaming_request, None)
+        self.assertEqual(len(inst.requests), 2)
+        self.assertEqual(inst.server.tasks, [inst])
+
+    def test_readable_streaming_full(self):
+        inst = self._makeOneStreaming()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nabcd")
+        self.assertFalse(inst.readable())
+        inst.streaming_request.body_stream.read(2)
+        self.assertTrue(inst.readable())
+        inst.will_close = True
+        self.assertFalse(inst.readable())
+
+    def test_timeout_deadline_streaming(self):
+        inst = self._makeOneStreaming()
+        inst.adj.body_timeout = 20
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        inst.last_activity = 1000
+        self.assertEqual(inst.timeout_deadline(), 1020)
+        inst.received(b"cd")
+        # waiting for the task to read the body
+        self.assertEqual(inst.timeout_deadline(), None)
+
+    def test_received_background_disk_io(self):
+        adj = DummyAdjustments()
+        adj.background_disk_io = True
+        inst, sock, map = self._makeOneWithMap(adj=adj)
+        inst.server = DummyServer()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 6\r\n\r\nab")
+        self.assertEqual(inst.request.body_drained, inst._body_drained)
+
+    def test__body_drained(self):
+        inst = self._makeOneStreaming()
+        inst._body_drained()
+        self.assertTrue(inst.server.trigger_pulled)
+
+    def test_handle_read_no_data_aborts_streaming(self):
+        from waitress.channel import ClientDisconnected
+
+        inst = self._makeOneStreaming()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        stream = inst.streaming_request.body_stream
+        inst.socket.recv_into = lambda buf: 0
+        inst.handle_read()
+        self.assertFalse(inst.connected)
+        self.assertRaises(ClientDisconnected, stream.read)
+
+    def test_handle_close_aborts_streaming(self):
+        from waitress.channel import ClientDisconnected
+
+        inst = self._makeOneStreaming()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        stream = inst.streaming_request.body_stream
+        inst.handle_close()
+        self.assertRaises(ClientDisconnected, stream.read)
+
+    def test_service_streaming_body_not_read(self):
+        inst = self._makeOneStreaming()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        request = inst.request
+        inst.task_class = DummyTaskClass()
+        inst.service()
+        self.assertTrue(inst.close_when_flushed)
+        self.assertEqual(inst.streaming_request, None)
+        self.assertEqual(inst.requests, [])
+        self.assertTrue(request.body_stream.closed)
+
+    def test_service_streaming_body_read(self):
+        inst = self._makeOneStreaming()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 2\r\n\r\nab")
+        inst.task_class = DummyTaskClass()
+        inst.service()
+        self.assertFalse(inst.close_when_flushed)
+        self.assertEqual(inst.requests, [])
+
+    def test_service_streaming_sends_continue(self):
+        inst = self._makeOneStreaming()
+        inst.requests = [DummyRequest()]
+        inst.received(
+            b"POST / HTTP/1.1\r\nContent-Length: 2\r\nExpect: 100-continue\r\n\r\n"
+        )
+        self.assertEqual(inst.sent_continue, False)
+        inst.task_class = DummyTaskClass()
+        inst.service()
+        self.assertEqual(inst.requests, [inst.request])
+        self.assertEqual(inst.sent_continue, True)
+        self.assertEqual(inst.socket.sent, b"HTTP/1.1 100 Continue\r\n\r\n")
+
     def test_received_no_chunk(self):
         inst, sock, map = self._makeOneWithMap()
         self.assertEqual(inst.received(b""), False)
@@ -758,6 +1438,59 @@ class TestHTTPChannel(unittest.TestCase):
         self.assertEqual(inst.error_task_class.serviced, True)
         self.assertTrue(request.closed)
 
+    def test_service_with_request_raises_parsing_error(self):
+        from waitress.parser import ParsingError
+
+        inst, sock, map = self._makeOneWithMap()
+        inst.server = DummyServer()
+        request = DummyRequest()
+        inst.requests = [request]
+        inst.task_class = DummyTaskClass(ParsingError)
+        inst.task_class.wrote_header = False
+        inst.error_task_class = DummyTaskClass()
+        inst.logger = DummyLogger()
+        inst.service()
+        self.assertTrue(inst.error_task_class.serviced)
+        self.assertEqual(inst.error_task_class.request, request)
+        self.assertTrue(inst.close_when_flushed)
+        self.assertEqual(len(inst.logger.exceptions), 0)
+
+    def test_service_with_request_raises_parsing_error_wrote_header(self):
+        from waitress.parser import ParsingError
+
+        inst, sock, map = self._makeOneWithMap()
+        inst.server = DummyServer()
+        request = DummyRequest()
+        inst.requests = [request]
+        inst.task_class = DummyTaskClass(ParsingError)
+        inst.error_task_class = DummyTaskClass()
+        inst.service()
+        self.assertFalse(inst.error_task_class.serviced)
+        self.assertTrue(inst.close_when_flushed)
+
+    def test_service_with_request_raises_parsing_error_disconnect(self):
+        from waitress.channel import ClientDisconnected
+        from waitress.parser import ParsingError
+
+        inst, sock, map = self._makeOneWithMap()
+        inst.server = DummyServer()
+        inst.requests = [DummyRequest()]
+        inst.task_class = DummyTaskClass(ParsingError)
+        inst.task_class.wrote_header = False
+        inst.error_task_class = DummyTaskClass(ClientDisconnected)
+        inst.service()
+        self.assertTrue(inst.error_task_class.serviced)
+        self.assertTrue(inst.close_when_flushed)
+
+    def test_cancel_aborts_streaming(self):
+        from waitress.channel import ClientDisconnected
+
+        inst = self._makeOneStreaming()
+        inst.received(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nab")
+        stream = inst.streaming_request.body_stream
+        inst.cancel()
+        self.assertRaises(ClientDisconnected, stream.read)
+
     def test_cancel_no_requests(self):
         inst, sock, map = self._makeOneWithMap()
         inst.requests = ()
@@ -823,6 +1556,44 @@ class TestHTTPChannelLookahead(TestHTTPChannel):
         """
         self.sock.send("".join(line + "\r\n" for line in lines).encode("ascii"))
 
+    def test_requests_leave_no_garbage(self):
+        # Everything allocated for a request is freed by reference counting
+        # once it was serviced, so keep-alive traffic doesn't make the cyclic
+        # garbage collector run, and the outbuf is reused once it was sent.
+        import gc
+        import weakref
+
+        self._make_app_with_lookahead()
+        outbuf = self.channel.outbufs[0]
+        refs = []
+
+        def app(environ, start_response):
+            refs.append(weakref.ref(environ["wsgi.input"]))
+            return self.app_check_disconnect(environ, start_response)
+
+        self.channel.server.application = app
+        gc.disable()
+
+        try:
+            for i in range(20):
+                self._send(
+                    "POST / HTTP/1.1",
+                    "Host: localhost:8080",
+                    "Content-Length: 1",
+                    "",
+                    "x",
+                )
+                self.channel.handle_read()
+                refs.append(weakref.ref(self.channel.requests[0]))
+                self.channel.server.tasks.pop().service()
+                self.channel._flush_some()
+                self.assertTrue(self.sock.recv(256).endswith(b"finished"))
+                self.assertEqual([ref() for ref in refs], [None, None])
+                del refs[:]
+                self.assertEqual(self.channel.outbufs, [outbuf])
+        finally:
+            gc.enable()
+
     def test_client_disconnect(self, close_before_start=False):
         """Disconnect the socket after starting the task."""
         import threading
@@ -928,11 +1699,20 @@ class DummySock:
         self.sent += data
         return len(data)
 
+    def sendmsg(self, buffers):
+        self.sendmsgs = getattr(self, "sendmsgs", 0) + 1
+        return self.send(b"".join(buffers))
+
     def recv(self, buffer_size):
         result = self.sent[:buffer_size]
         self.sent = self.sent[buffer_size:]
         return result
 
+    def recv_into(self, buffer):
+        result = self.recv(len(buffer))
+        buffer[: len(result)] = result
+        return len(result)
+
 
 class DummyLock:
     notified = False
@@ -989,9 +1769,17 @@ class DummyAdjustments:
     outbuf_overflow = 1048576
     outbuf_high_watermark = 1048576
     inbuf_overflow = 512000
+    background_disk_io = False
+    stream_request_body = False
+    lazy_headers = False
     cleanup_interval = 900
+    workers = 0
     url_scheme = "http"
     channel_timeout = 300
+    header_timeout = 0
+    body_timeout = 0
+    keepalive_timeout = 0
+    write_timeout = 0
     log_socket_errors = True
     recv_bytes = 8192
     send_bytes = 1
@@ -1008,10 +1796,15 @@ class DummyServer:
     adj = DummyAdjustments()
     effective_port = 8080
     server_name = ""
+    environ_template = None
+    sendbuf_len = None
 
     def __init__(self):
+        from waitress.timers import TimerWheel
+
         self.tasks = []
         self.active_channels = {}
+        self.timers = TimerWheel()
 
     def add_task(self, task):
         self.tasks.append(task)
@@ -1030,6 +1823,8 @@ class DummyParser:
     retval = None
     error = None
     connection_close = False
+    body_stream = None
+    full = False
 
     def received(self, data):
         self.data = data
@@ -1037,6 +1832,9 @@ class DummyParser:
             return self.retval
         return len(data)
 
+    def body_full(self):
+        return self.full
+
 
 class DummyRequest:
     error = None
@@ -1087,3 +1885,18 @@ class DummyTaskClass:
         self.request.serviced = True
         if self.toraise:
             raise self.toraise
+
+
+class DummyPoller:
+    def __init__(self):
+        self.dirty = []
+
+    def mark_dirty(self, fd):
+        self.dirty.append(fd)
+
+
+class DummyEventLoop:
+    trigger_pulled = False
+
+    def pull_trigger(self):
+        self.trigger_pulled = True
@@ -11,7 +11,7 @@ import sys
 import time
 import unittest
 
-from waitress import server
+from waitress import aioserver, server
 from waitress.compat import WIN
 from waitress.utilities import cleanup_unix_socket
 
@@ -62,6 +62,39 @@ class FixtureTcpWSGIServer(server.TcpWSGIServer):
         queue.put((host, port))
 
 
+class FixtureSelectorTcpWSGIServer(FixtureTcpWSGIServer):
+    """A version of FixtureTcpWSGIServer that uses the selectors main loop."""
+
+    def __init__(self, application, queue, **kw):  # pragma: no cover
+        kw["asyncore_use_selector"] = True
+        super().__init__(application, queue, **kw)
+
+
+class FixtureMultiLoopTcpWSGIServer(FixtureTcpWSGIServer):
+    """A version of FixtureTcpWSGIServer that runs several event loops."""
+
+    def __init__(self, application, queue, **kw):  # pragma: no cover
+        kw.setdefault("event_loops", 3)
+        super().__init__(application, queue, **kw)
+
+
+class FixtureAsyncioTcpWSGIServer(aioserver.AsyncioWSGIServer):
+    """A version of AsyncioWSGIServer that relays back what it's bound to."""
+
+    family = socket.AF_INET  # Testing
+
+    def __init__(self, application, queue, **kw):  # pragma: no cover
+        # Coverage doesn't see this as it's ran in a separate process.
+        kw["host"] = "127.0.0.1"
+        kw["port"] = 0  # Bind to any available port.
+        super().__init__(application, **kw)
+        host, port = self.sockets[0].getsockname()
+
+        if os.name == "nt":
+            host = "127.0.0.1"
+        queue.put((host, port))
+
+
 class SubprocessTests:
     exe = sys.executable
 
@@ -618,6 +651,192 @@ class ExpectContinueTests:
             self.assertEqual(response_body, data)
 
 
+class StreamingBodyTests:
+    def setUp(self):
+        from tests.fixtureapps import echo
+
+        self.start_subprocess(
+            echo.app_body_only, stream_request_body=True, inbuf_overflow=65536
+        )
+
+    def tearDown(self):
+        self.stop_subprocess()
+
+    def _send_and_read(self, to_send):
+        self.connect()
+        # fail rather than hang if the body is never read
+        self.sock.settimeout(10)
+        self.sock.sendall(to_send)
+        with self.sock.makefile("rb", 0) as fp:
+            line, headers, response_body = read_http(fp)
+            self.assertline(line, "200", "OK", "HTTP/1.1")
+            return response_body
+
+    def test_read_size_larger_than_inbuf_overflow(self):
+        # the application reads CONTENT_LENGTH bytes at once
+        data = string.ascii_letters.encode("latin-1") * 4000
+        to_send = (
+            b"POST / HTTP/1.1\r\n"
+            b"Connection: close\r\n"
+            b"Content-Length: %d\r\n"
+            b"\r\n"
+            b"%s" % (len(data), data)
+        )
+        self.assertEqual(self._send_and_read(to_send), data)
+
+    def test_read_all_larger_than_inbuf_overflow(self):
+        # without a Content-Length the application reads until the end
+        data = string.ascii_letters.encode("latin-1") * 4000
+        to_send = (
+            b"POST / HTTP/1.1\r\n"
+            b"Connection: close\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"\r\n"
+        )
+        for chunk in chunks(data, 10000):
+            to_send += b"%x\r\n%s\r\n" % (len(chunk), chunk)
+        to_send += b"0\r\n\r\n"
+        self.assertEqual(self._send_and_read(to_send), data)
+
+
+class LazyHeadersTests:
+    def setUp(self):
+        from tests.fixtureapps import echo
+
+        self.start_subprocess(echo.app, lazy_headers=True)
+
+    def tearDown(self):
+        self.stop_subprocess()
+
+    def _send_and_read(self, to_send):
+        self.connect()
+        self.sock.settimeout(10)
+        self.sock.send(to_send)
+        with self.sock.makefile("rb", 0) as fp:
+            return read_http(fp)
+
+    def test_headers(self):
+        from tests.fixtureapps import echo
+
+        line, headers, response_body = self._send_and_read(
+            b"GET / HTTP/1.0\r\nX-Foo: bar \r\nx-foo: baz\r\n\r\n"
+        )
+        self.assertline(line, "200", "OK", "HTTP/1.0")
+        self.assertEqual(
+            echo.parse_response(response_body).headers["X_FOO"], "bar, baz"
+        )
+
+    def test_bad_header_value(self):
+        line, headers, response_body = self._send_and_read(
+            b"GET / HTTP/1.0\r\nX-Foo: a\x00b\r\n\r\n"
+        )
+        self.assertline(line, "400", "Bad Request", "HTTP/1.0")
+
+    def test_bad_header_value_with_underscore(self):
+        line, headers, response_body = self._send_and_read(
+            b"GET / HTTP/1.0\r\nX_Foo: a\x7fb\r\n\r\n"
+        )
+        self.assertline(line, "400", "Bad Request", "HTTP/1.0")
+
+
+class ConcurrentClientsTests:
+    server_kw = {}
+
+    def setUp(self):
+        from tests.fixtureapps import echo
+
+        self.start_subprocess(echo.app, **self.server_kw)
+
+    def tearDown(self):
+        self.stop_subprocess()
+
+    def test_keepalive_clients(self):
+        # Every client opens connections one after the other and sends a few
+        # requests on each, so that tasks finish and connections are handed
+        # to the event loops while the loops are busy; a wakeup that is lost
+        # leaves a response or a new connection waiting for the poll timeout,
+        # or for good.
+        import threading
+
+        errors = []
+        latencies = []
+
+        def client():
+            try:
+                for i in range(20):
+                    h = httplib.HTTPConnection(*self.bound_to, timeout=10)
+                    for j in range(5):
+                        start = time.monotonic()
+                        h.request("GET", "/")
+                        response = h.getresponse()
+                        response.read()
+                        latencies.append(time.monotonic() - start)
+                        if response.status != 200:  # pragma: no cover
+                            errors.append(response.status)
+                    h.close()
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        clients = [threading.Thread(target=client) for i in range(8)]
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join(60)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(latencies), 800)
+        latencies.sort()
+        self.assertLess(latencies[int(len(latencies) * 0.99)], 0.5)
+
+
+class TimeoutTests:
+    def setUp(self):
+        from tests.fixtureapps import largeresponse
+
+        self.start_subprocess(
+            largeresponse.app, write_timeout=4, keepalive_timeout=1, threads=1
+        )
+
+    def tearDown(self):
+        self.stop_subprocess()
+
+    def test_client_not_reading(self):
+        # send a request and never read the response; with the client's
+        # receive buffer kept small the server soon can't send any more of it
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.connect()
+        self.sock.sendall(b"GET / HTTP/1.0\r\n\r\n")
+        # past write_timeout and the next look at the timers
+        time.sleep(6)
+        # the stalled connection was closed, which let go of the only thread
+        # that services requests
+        sock = self.create_socket()
+        try:
+            sock.settimeout(5)
+            sock.connect(self.bound_to)
+            sock.sendall(b"GET /small HTTP/1.0\r\n\r\n")
+            with sock.makefile("rb", 0) as fp:
+                line, headers, response_body = read_http(fp)
+                self.assertline(line, "200", "OK", "HTTP/1.0")
+        finally:
+            sock.close()
+
+    def test_keepalive_timeout_after_response(self):
+        self.connect()
+        self.sock.sendall(b"GET / HTTP/1.1\r\n\r\n")
+        with self.sock.makefile("rb", 0) as fp:
+            line = fp.readline()
+            self.assertline(line, "200", "OK", "HTTP/1.1")
+            left = int(parse_headers(fp)["content-length"])
+            # the response is still being sent when the timer the connection
+            # started with expires
+            time.sleep(1.5)
+            while left:
+                left -= len(fp.read(left))
+            # closed after keepalive_timeout rather than write_timeout
+            self.sock.settimeout(2.5)
+            self.assertEqual(fp.read(), b"")
+
+
 class BadContentLengthTests:
     def setUp(self):
         from tests.fixtureapps import badcl
@@ -1556,6 +1775,22 @@ class TcpExpectContinueTests(ExpectContinueTests, TcpTests, unittest.TestCase):
     pass
 
 
+class TcpStreamingBodyTests(StreamingBodyTests, TcpTests, unittest.TestCase):
+    pass
+
+
+class TcpLazyHeadersTests(LazyHeadersTests, TcpTests, unittest.TestCase):
+    pass
+
+
+class TcpTimeoutTests(TimeoutTests, TcpTests, unittest.TestCase):
+    pass
+
+
+class TcpConcurrentClientsTests(ConcurrentClientsTests, TcpTests, unittest.TestCase):
+    pass
+
+
 class TcpBadContentLengthTests(BadContentLengthTests, TcpTests, unittest.TestCase):
     pass
 
@@ -1588,6 +1823,185 @@ class TcpFileWrapperTests(FileWrapperTests, TcpTests, unittest.TestCase):
     pass
 
 
+class SelectorTcpTests(TcpTests):
+    server = FixtureSelectorTcpWSGIServer
+
+
+class SelectorTcpEchoTests(EchoTests, SelectorTcpTests, unittest.TestCase):
+    pass
+
+
+class SelectorTcpConcurrentClientsTests(
+    ConcurrentClientsTests, SelectorTcpTests, unittest.TestCase
+):
+    pass
+
+
+class SelectorTcpPipeliningTests(PipeliningTests, SelectorTcpTests, unittest.TestCase):
+    pass
+
+
+class SelectorTcpExpectContinueTests(
+    ExpectContinueTests, SelectorTcpTests, unittest.TestCase
+):
+    pass
+
+
+class SelectorTcpWriteCallbackTests(
+    WriteCallbackTests, SelectorTcpTests, unittest.TestCase
+):
+    pass
+
+
+class SelectorTcpTooLargeTests(TooLargeTests, SelectorTcpTests, unittest.TestCase):
+    pass
+
+
+class SelectorTcpFileWrapperTests(
+    FileWrapperTests, SelectorTcpTests, unittest.TestCase
+):
+    pass
+
+
+class MultiLoopTcpTests(TcpTests):
+    server = FixtureMultiLoopTcpWSGIServer
+
+
+class MultiLoopTcpEchoTests(EchoTests, MultiLoopTcpTests, unittest.TestCase):
+    pass
+
+
+class MultiLoopTcpPipeliningTests(
+    PipeliningTests, MultiLoopTcpTests, unittest.TestCase
+):
+    pass
+
+
+class MultiLoopTcpExpectContinueTests(
+    ExpectContinueTests, MultiLoopTcpTests, unittest.TestCase
+):
+    pass
+
+
+class MultiLoopTcpTimeoutTests(TimeoutTests, MultiLoopTcpTests, unittest.TestCase):
+    pass
+
+
+class MultiLoopTcpConnectionLimitTests(MultiLoopTcpTests, unittest.TestCase):
+    def setUp(self):
+        from tests.fixtureapps import echo
+
+        # the listening socket and the trigger of the main loop count as
+        # connections, the triggers of the event loops don't
+        self.start_subprocess(echo.app, connection_limit=6)
+
+    def tearDown(self):
+        self.stop_subprocess()
+
+    def test_connections_up_to_limit(self):
+        # each connection is kept open once it was served
+        conns = []
+        try:
+            for i in range(4):
+                h = httplib.HTTPConnection(*self.bound_to, timeout=5)
+                conns.append(h)
+                h.request("GET", "/")
+                response = h.getresponse()
+                response.read()
+                self.assertEqual(response.status, 200)
+        finally:
+            for h in conns:
+                h.close()
+
+
+class MultiLoopTcpConcurrentClientsTests(
+    ConcurrentClientsTests, MultiLoopTcpTests, unittest.TestCase
+):
+    server_kw = {"event_loops": 4}
+
+
+class MultiLoopTcpWriteCallbackTests(
+    WriteCallbackTests, MultiLoopTcpTests, unittest.TestCase
+):
+    pass
+
+
+class MultiLoopTcpFileWrapperTests(
+    FileWrapperTests, MultiLoopTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpTests(TcpTests):
+    server = FixtureAsyncioTcpWSGIServer
+
+
+class AsyncioTcpEchoTests(EchoTests, AsyncioTcpTests, unittest.TestCase):
+    pass
+
+
+class AsyncioTcpPipeliningTests(PipeliningTests, AsyncioTcpTests, unittest.TestCase):
+    pass
+
+
+class AsyncioTcpExpectContinueTests(
+    ExpectContinueTests, AsyncioTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpStreamingBodyTests(
+    StreamingBodyTests, AsyncioTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpLazyHeadersTests(LazyHeadersTests, AsyncioTcpTests, unittest.TestCase):
+    pass
+
+
+class AsyncioTcpTimeoutTests(TimeoutTests, AsyncioTcpTests, unittest.TestCase):
+    pass
+
+
+class AsyncioTcpConcurrentClientsTests(
+    ConcurrentClientsTests, AsyncioTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpBadContentLengthTests(
+    BadContentLengthTests, AsyncioTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpNoContentLengthTests(
+    NoContentLengthTests, AsyncioTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpWriteCallbackTests(
+    WriteCallbackTests, AsyncioTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpTooLargeTests(TooLargeTests, AsyncioTcpTests, unittest.TestCase):
+    pass
+
+
+class AsyncioTcpInternalServerErrorTests(
+    InternalServerErrorTests, AsyncioTcpTests, unittest.TestCase
+):
+    pass
+
+
+class AsyncioTcpFileWrapperTests(FileWrapperTests, AsyncioTcpTests, unittest.TestCase):
+    pass
+
+
 if hasattr(socket, "AF_UNIX"):
 
     class FixtureUnixWSGIServer(server.UnixWSGIServer):
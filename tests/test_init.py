@@ -15,6 +15,21 @@ class Test_serve(unittest.TestCase):
         self.assertEqual(result, None)
         self.assertEqual(server.ran, True)
 
+    def test_workers(self):
+        server = DummyServerFactory()
+        app = object()
+        served = []
+
+        def serve_workers(app_factory, **kw):
+            served.append((app_factory(), kw))
+
+        result = self._callFUT(
+            app, workers="2", _server=server, _serve_workers=serve_workers, _quiet=True
+        )
+        self.assertEqual(result, None)
+        self.assertEqual(served, [(app, {"workers": "2", "_quiet": True})])
+        self.assertEqual(server.ran, False)
+
 
 class Test_serve_paste(unittest.TestCase):
     def _callFUT(self, app, **kw):
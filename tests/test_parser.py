@@ -13,6 +13,7 @@
 ##############################################################################
 """HTTP Request Parser tests
 """
+
 import unittest
 
 from waitress.adjustments import Adjustments
@@ -49,6 +50,27 @@ class TestHTTPRequestParser(unittest.TestCase):
         result = self.parser.get_body_stream()
         self.assertEqual(result, body_rcv)
 
+    def test_get_body_view_None(self):
+        self.parser.body_recv = None
+        result = self.parser.get_body_view()
+        self.assertEqual(result, b"")
+
+    def test_get_body_view_nonNone(self):
+        body_rcv = DummyBodyStream()
+        self.parser.body_rcv = body_rcv
+        result = self.parser.get_body_view()
+        self.assertEqual(result, "view")
+
+    def test_body_full_no_body(self):
+        self.assertFalse(self.parser.body_full())
+
+    def test_body_full(self):
+        body_rcv = DummyBodyStream()
+        self.parser.body_rcv = body_rcv
+        self.assertFalse(self.parser.body_full())
+        body_rcv.is_full = True
+        self.assertTrue(self.parser.body_full())
+
     def test_received_get_no_headers(self):
         data = b"HTTP/1.0 GET /foobar\r\n\r\n"
         result = self.parser.received(data)
@@ -175,6 +197,94 @@ class TestHTTPRequestParser(unittest.TestCase):
         self.assertTrue(self.parser.error is None)
         self.assertEqual(self.parser.headers["CONTENT_LENGTH"], "29")
 
+    def test_received_streaming(self):
+        from waitress.buffers import StreamingBuffer
+
+        self.parser.adj.stream_request_body = True
+        drained = []
+        self.parser.body_drained = lambda: drained.append(True)
+        data = b"POST /foobar HTTP/1.1\r\nContent-Length: 6\r\n\r\nabc"
+        result = self.parser.received(data)
+        self.assertEqual(result, 44)
+        stream = self.parser.body_stream
+        self.assertEqual(stream.__class__, StreamingBuffer)
+        self.assertEqual(stream.on_drained(), None)
+        self.assertEqual(drained, [True])
+        self.assertEqual(stream.limit, self.parser.adj.inbuf_overflow)
+        self.assertIs(self.parser.get_body_stream(), stream)
+        self.assertRaises(ValueError, self.parser.get_body_view)
+        self.parser.received(data[result:])
+        self.assertFalse(self.parser.completed)
+        self.assertFalse(stream.finished)
+        self.parser.received(b"def")
+        self.assertTrue(self.parser.completed)
+        self.assertTrue(stream.finished)
+        self.assertEqual(stream.read(), b"abcdef")
+
+    def test_received_background_disk_io(self):
+        self.parser.adj.background_disk_io = True
+        self.parser.body_drained = drained = lambda: None
+        data = b"POST /foobar HTTP/1.1\r\nContent-Length: 6\r\n\r\nabc"
+        self.parser.received(data)
+        buf = self.parser.body_rcv.getbuf()
+        self.assertTrue(buf.background)
+        self.assertIs(buf.on_drained, drained)
+        self.assertFalse(self.parser.body_full())
+
+    def test_received_streaming_error(self):
+        self.parser.adj.stream_request_body = True
+        data = b"GET /foobar HTTP/1.1\r\n" b"Transfer-Encoding: chunked\r\n" b"\r\n"
+        self.parser.received(data)
+        stream = self.parser.body_stream
+        self.parser.received(b"garbage\r\n")
+        self.assertTrue(isinstance(self.parser.error, BadRequest))
+        self.assertRaises(ParsingError, stream.read)
+
+    def test_received_header_in_pieces(self):
+        data = b"GET /foobar HTTP/1.1\r\nX-Foo: bar\r\n\r\n"
+
+        for i in range(len(data) - 1):
+            self.assertEqual(self.parser.received(data[i : i + 1]), 1)
+            self.assertEqual(self.parser.header_plus, data[: i + 1])
+            self.assertEqual(self.parser.header_scanned, i + 1)
+        self.assertEqual(self.parser.header_plus.__class__, bytearray)
+        self.assertFalse(self.parser.completed)
+        self.assertEqual(self.parser.received(data[-1:] + b"extra"), 1)
+        self.assertTrue(self.parser.completed)
+        self.assertEqual(self.parser.header_plus, b"")
+        self.assertEqual(self.parser.first_line, b"GET /foobar HTTP/1.1")
+        self.assertEqual(self.parser.headers["X_FOO"], "bar")
+
+    def test_received_header_in_pieces_scanned_once(self):
+        # a header trickled in small pieces is searched for its end about
+        # once, rather than from the start again for every piece
+        scanned = []
+
+        class Header(bytearray):
+            def find(self, sub, start=0):
+                scanned.append(len(self) - start)
+                return super().find(sub, start)
+
+        self.parser.adj.max_request_header_size = 1 << 20
+        self.parser.received(b"GET /foobar HTTP/1.1\r\n")
+        pieces = 4096
+        for i in range(pieces):
+            self.parser.header_plus = Header(self.parser.header_plus)
+            self.parser.received(b"X-%06d: " % i + b"x" * 52 + b"\r\n")
+        self.assertFalse(self.parser.completed)
+        self.assertEqual(len(self.parser.header_plus), 22 + pieces * 64)
+        self.assertEqual(len(scanned), pieces)
+        # each search backs up 3 bytes for a CRLFCRLF split between pieces
+        self.assertLessEqual(sum(scanned), pieces * (64 + 3))
+
+    def test_received_header_split_in_terminator(self):
+        data = b"GET /foobar HTTP/1.1\r\nX-Foo: bar\r\n\r"
+        self.assertEqual(self.parser.received(data), len(data))
+        self.assertFalse(self.parser.completed)
+        self.assertEqual(self.parser.received(memoryview(b"\nabc")), 1)
+        self.assertTrue(self.parser.completed)
+        self.assertEqual(self.parser.headers["X_FOO"], "bar")
+
     def test_parse_header_gardenpath(self):
         data = b"GET /foobar HTTP/8.4\r\nfoo: bar\r\n"
         self.parser.parse_header(data)
@@ -389,6 +499,27 @@ class TestHTTPRequestParser(unittest.TestCase):
         self.parser.parse_header(data)
         self.assertEqual(self.parser.headers["FOO"], "\xa0something\x85")
 
+    def test_parse_header_invalid_no_colon_known_name(self):
+        data = b"GET /foobar HTTP/1.1\r\nHost: localhost\r\nHost\r\n"
+        self.assertRaises(ParsingError, self.parser.parse_header, data)
+
+    def test_parse_header_invalid_empty_name(self):
+        data = b"GET /foobar HTTP/1.1\r\n: bar\r\n"
+        self.assertRaises(ParsingError, self.parser.parse_header, data)
+
+    def test_parse_header_invalid_name(self):
+        data = b"GET /foobar HTTP/1.1\r\nfo(o): bar\r\n"
+        self.assertRaises(ParsingError, self.parser.parse_header, data)
+
+    def test_parse_header_invalid_underscore_name(self):
+        data = b"GET /foobar HTTP/1.1\r\nfoo_bar: \x00\r\n"
+        self.assertRaises(ParsingError, self.parser.parse_header, data)
+
+    def test_parse_header_whitespace_in_value(self):
+        data = b"GET /foobar HTTP/1.1\r\nfoo: \t a \t\x80b\t \r\n"
+        self.parser.parse_header(data)
+        self.assertEqual(self.parser.headers["FOO"], "a \t\x80b")
+
     def test_parse_header_empty(self):
         data = b"GET /foobar HTTP/1.1\r\nfoo: bar\r\nempty:\r\n"
         self.parser.parse_header(data)
@@ -519,6 +650,271 @@ class Test_split_uri(unittest.TestCase):
         self.assertEqual(self.query, "a=1&b=2")
         self.assertEqual(self.fragment, "fragment")
 
+    def test_split_uri_origin_form(self):
+        self._callFUT(b"/abc%20def?a=1&b=%20#frag?ment")
+        self.assertEqual(self.path, "/abc def")
+        self.assertEqual(self.proxy_scheme, "")
+        self.assertEqual(self.proxy_netloc, "")
+        self.assertEqual(self.query, "a=1&b=%20")
+        self.assertEqual(self.fragment, "frag?ment")
+
+    def test_split_uri_origin_form_with_tab(self):
+        # urlsplit removes tabs
+        self._callFUT(b"/abc\tdef?a=\t1")
+        self.assertEqual(self.path, "/abcdef")
+        self.assertEqual(self.query, "a=1")
+
+
+class Test_parse_first_line(unittest.TestCase):
+    def setUp(self):
+        from waitress import parser
+
+        self.parser = parser
+        parser._cached_parse_first_line.cache_clear()
+
+    def _callFUT(self, line):
+        return self.parser.parse_first_line(line)
+
+    def test_parse_first_line(self):
+        result = self._callFUT(b"GET /foo%20bar?a=1 HTTP/1.1")
+        self.assertEqual(
+            result,
+            ("GET", "1.1", "/foo%20bar?a=1", ("", "", "/foo bar", "a=1", "")),
+        )
+        self.assertIs(self._callFUT(b"GET /foo%20bar?a=1 HTTP/1.1"), result)
+        info = self.parser._cached_parse_first_line.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_parse_first_line_invalid(self):
+        self.assertRaises(ParsingError, self._callFUT, b"GET / bleh")
+        self.assertRaises(ParsingError, self._callFUT, b"GET / bleh")
+        self.assertEqual(self.parser._cached_parse_first_line.cache_info().currsize, 0)
+
+    def test_parse_first_line_long_not_cached(self):
+        path = b"/" + b"a" * self.parser.MAX_CACHED_FIRST_LINE
+        result = self._callFUT(b"GET " + path + b" HTTP/1.0")
+        self.assertEqual(result[1:3], ("1.0", path.decode("latin-1")))
+        self.assertEqual(self.parser._cached_parse_first_line.cache_info().misses, 0)
+
+
+class TestLazyHeaders(unittest.TestCase):
+    def _makeOne(self, block):
+        from waitress.parser import LazyHeaders
+
+        return LazyHeaders(block)
+
+    def test_values_decoded_on_lookup(self):
+        block = b"Foo: bar \r\nX-Bar:\tb\xe9z\r\nfoo: baz\r\n\r\n"
+        inst = self._makeOne(block)
+        self.assertEqual(list(inst), ["FOO", "X_BAR"])
+        self.assertEqual(len(inst), 2)
+        self.assertEqual(inst.values["FOO"], (4, 9, 27, 31))
+        self.assertIn("X_BAR", inst)
+        self.assertEqual(inst["X_BAR"], "b\xe9z")
+        self.assertEqual(inst.values["X_BAR"], "b\xe9z")
+        self.assertEqual(inst, {"FOO": "bar, baz", "X_BAR": "b\xe9z"})
+
+    def test_mutation(self):
+        inst = self._makeOne(b"Foo: bar\r\nTransfer-Encoding: chunked")
+        self.assertEqual(inst.pop("TRANSFER_ENCODING"), "chunked")
+        inst["CONTENT_LENGTH"] = "5"
+        self.assertEqual(inst.get("TRANSFER_ENCODING", ""), "")
+        self.assertEqual(dict(inst), {"FOO": "bar", "CONTENT_LENGTH": "5"})
+        del inst["FOO"]
+        self.assertRaises(KeyError, inst.__getitem__, "FOO")
+        self.assertEqual(repr(inst), "<LazyHeaders ['CONTENT_LENGTH']>")
+
+    def test_invalid_value(self):
+        self.assertRaises(ParsingError, self._makeOne, b"Foo: \x0bbar\r\nBar: baz")
+        self.assertRaises(ParsingError, self._makeOne, b"Foo: a\x00b")
+        self.assertRaises(ParsingError, self._makeOne, b"Foo: a\x7fb")
+
+    def test_invalid_value_of_underscore_header(self):
+        self.assertRaises(ParsingError, self._makeOne, b"Foo_Bar: a\x00b")
+
+    def test_invalid_name(self):
+        self.assertRaises(ParsingError, self._makeOne, b"Fo o: bar")
+        self.assertRaises(ParsingError, self._makeOne, b"Foo bar")
+
+    def test_bare_cr_or_lf(self):
+        self.assertRaises(ParsingError, self._makeOne, b"Foo: bar\nBar: baz")
+        self.assertRaises(ParsingError, self._makeOne, b"Foo: bar\rBar: baz")
+        self.assertRaises(ParsingError, self._makeOne, b"Foo: bar\n\r\n")
+
+    def test_underscore_dropped(self):
+        inst = self._makeOne(b"Foo_Bar: baz\r\nFoo-Bar: bar")
+        self.assertEqual(dict(inst), {"FOO_BAR": "bar"})
+
+
+class TestHTTPRequestParserLazyHeaders(unittest.TestCase):
+    def setUp(self):
+        self.parser = HTTPRequestParser(Adjustments(lazy_headers=True))
+
+    def test_parse_header(self):
+        from waitress.parser import LazyHeaders
+
+        data = (
+            b"POST /foobar HTTP/1.1\r\n"
+            b"Content-Length: 7\r\n"
+            b"Connection: close\r\n"
+            b"X-Foo: bar\r\n"
+        )
+        self.parser.parse_header(data)
+        headers = self.parser.headers
+        self.assertEqual(headers.__class__, LazyHeaders)
+        self.assertEqual(self.parser.content_length, 7)
+        self.assertTrue(self.parser.connection_close)
+        self.assertEqual(headers.values["X_FOO"].__class__, tuple)
+        self.assertEqual(headers["X_FOO"], "bar")
+
+    def test_parse_header_folded_is_eager(self):
+        data = b"GET /foobar HTTP/1.1\r\nX-Foo: bar\r\n baz\r\n"
+        self.parser.parse_header(data)
+        self.assertEqual(self.parser.headers, {"X_FOO": "bar baz"})
+        self.assertEqual(self.parser.headers.__class__, dict)
+
+    def test_parse_header_invalid_content_length(self):
+        data = b"GET /foobar HTTP/1.1\r\nContent-Length: \x0b5\r\n"
+        self.assertRaises(ParsingError, self.parser.parse_header, data)
+
+    def test_received_invalid_value(self):
+        data = b"GET /foobar HTTP/1.1\r\nX-Foo: a\x00b\r\n\r\n"
+        self.parser.received(data)
+        self.assertTrue(self.parser.completed)
+        self.assertTrue(isinstance(self.parser.error, BadRequest))
+
+    def test_received_invalid_transfer_encoding(self):
+        data = b"GET /foobar HTTP/1.1\r\nTransfer-Encoding: \x00\r\n\r\n"
+        self.parser.received(data)
+        self.assertTrue(self.parser.completed)
+        self.assertTrue(isinstance(self.parser.error, BadRequest))
+
+
+class Test_is_token(unittest.TestCase):
+    def _callFUT(self, name):
+        from waitress.parser import is_token
+
+        return is_token(name)
+
+    def test_valid(self):
+        self.assertTrue(self._callFUT(b"X-Foo_bar!#$%&'*+.^`|~09"))
+
+    def test_invalid(self):
+        self.assertFalse(self._callFUT(b""))
+
+        for c in b'(),/:;<=>?@[\\]{}" \t\x00\x7f\x80':
+            self.assertFalse(self._callFUT(b"a" + bytes((c,))))
+
+
+class TestParseHeaderRFC7230(unittest.TestCase):
+    # parse_header checks header fields with the TCHAR_BYTES and
+    # FIELD_VALUE_BYTES tables; they must accept exactly the fields
+    # HEADER_FIELD_RE does.
+
+    ALPHABET = (
+        b"aZ09-!#$%&'*+.^_`|~" * 4
+        + b" \t" * 4
+        + b":" * 4
+        + b'"(),/;<=>?@[\\]{}'
+        + b"\x00\x01\x08\x0b\x0c\x1f\x7f\x80\xa0\xff"
+    )
+
+    def setUp(self):
+        from waitress import parser
+
+        self.parser = parser
+        self.saved = dict(parser.header_keys)
+
+    def tearDown(self):
+        self.parser.header_keys.clear()
+        self.parser.header_keys.update(self.saved)
+
+    def _regex(self, line):
+        from waitress.parser import header_key
+        from waitress.rfc7230 import HEADER_FIELD_RE
+
+        header = HEADER_FIELD_RE.match(line)
+
+        if header is None:
+            return None
+        key, value = header.group("name", "value")
+
+        if b"_" in key:
+            return {}
+
+        return {header_key(key): value.strip(b" \t").decode("latin-1")}
+
+    def _tables(self, line):
+        inst = self.parser.HTTPRequestParser(Adjustments())
+
+        try:
+            inst.parse_header(b"GET / HTTP/1.1\r\n" + line)
+        except ParsingError:
+            return None
+
+        return inst.headers
+
+    def _random_line(self, rnd):
+        choices = rnd.choices
+        name = bytes(choices(self.ALPHABET, k=rnd.randrange(0, 8)))
+        value = bytes(choices(self.ALPHABET, k=rnd.randrange(0, 12)))
+        # mix in some valid names, so that the values get checked
+        name = rnd.choice([name, name, b"X-Foo", b"x"])
+
+        # an empty line ends the header, so isn't a field
+        return name + b":" * rnd.randrange(0, 2) + value or b"x"
+
+    def test_same_as_header_field_re(self):
+        import random
+
+        rnd = random.Random(7230)
+        valid = 0
+
+        for i in range(20000):
+            line = self._random_line(rnd)
+            expected = self._regex(line)
+            self.assertEqual(self._tables(line), expected, line)
+            valid += expected is not None
+
+        # both outcomes were exercised
+        self.assertGreater(valid, 1000)
+        self.assertLess(valid, 19000)
+
+
+class Test_header_key(unittest.TestCase):
+    def setUp(self):
+        from waitress import parser
+
+        self.parser = parser
+        self.saved = dict(parser.header_keys)
+        parser.header_keys.clear()
+
+    def tearDown(self):
+        self.parser.header_keys.clear()
+        self.parser.header_keys.update(self.saved)
+
+    def _callFUT(self, name):
+        return self.parser.header_key(name)
+
+    def test_translates_and_caches(self):
+        result = self._callFUT(b"x-Forwarded-For")
+        self.assertEqual(result, "X_FORWARDED_FOR")
+        self.assertIs(self.parser.header_keys[b"x-Forwarded-For"], result)
+
+    def test_bounded(self):
+        self.parser.header_keys.update(
+            (b"x-%d" % i, "X_%d" % i) for i in range(self.parser.MAX_HEADER_KEYS)
+        )
+        self.assertEqual(self._callFUT(b"foo"), "FOO")
+        self.assertNotIn(b"foo", self.parser.header_keys)
+
+    def test_used_by_parse_header(self):
+        self.parser.header_keys[b"X-Foo"] = "CACHED"
+        inst = self.parser.HTTPRequestParser(Adjustments())
+        inst.parse_header(b"GET / HTTP/1.1\r\nX-Foo: a\r\nX-Bar: b")
+        self.assertEqual(inst.headers, {"CACHED": "a", "X_BAR": "b"})
+        self.assertEqual(self.parser.header_keys[b"X-Bar"], "X_BAR")
+
 
 class Test_get_header_lines(unittest.TestCase):
     def _callFUT(self, data):
@@ -731,11 +1127,19 @@ class Test_unquote_bytes_to_wsgi(unittest.TestCase):
 
 
 class DummyBodyStream:
+    is_full = False
+
     def getfile(self):
         return self
 
     def getbuf(self):
         return self
 
+    def getview(self):
+        return "view"
+
+    def full(self):
+        return self.is_full
+
     def close(self):
         self.closed = True
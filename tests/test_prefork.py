@@ -0,0 +1,573 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from waitress.aioserver import AsyncioWSGIServer
+from waitress.compat import WIN
+from waitress.server import BaseWSGIServer
+
+
+class Test_get_rss(unittest.TestCase):
+    def test_it(self):
+        from waitress.prefork import get_rss
+
+        rss = get_rss()
+        self.assertTrue(rss is None or rss > 0)
+
+
+class TestWorkerMonitor(unittest.TestCase):
+    def _makeOne(self, application=None, **kw):
+        from waitress.prefork import WorkerMonitor
+
+        inst = WorkerMonitor(application or DummyApp(), **kw)
+        inst.sleep = lambda seconds: None
+        inst.killed = []
+        inst.kill = lambda pid, signum: inst.killed.append((pid, signum))
+        return inst
+
+    def test_call_counts_requests(self):
+        app = DummyApp()
+        inst = self._makeOne(app)
+        self.assertEqual(inst({}, None), [b"ok"])
+        self.assertEqual(inst({}, None), [b"ok"])
+        self.assertEqual(inst.requests, 2)
+        self.assertEqual(app.calls, 2)
+
+    def test_should_recycle_disabled(self):
+        inst = self._makeOne()
+        inst.requests = 1000
+        self.assertFalse(inst.should_recycle())
+
+    def test_should_recycle_max_requests(self):
+        inst = self._makeOne(max_requests=2)
+        inst.requests = 1
+        self.assertFalse(inst.should_recycle())
+        inst.requests = 2
+        self.assertTrue(inst.should_recycle())
+
+    def test_should_recycle_max_memory(self):
+        inst = self._makeOne(max_memory=100)
+        inst.get_rss = lambda: 100
+        self.assertFalse(inst.should_recycle())
+        inst.get_rss = lambda: 101
+        self.assertTrue(inst.should_recycle())
+
+    def test_should_recycle_max_memory_unknown(self):
+        inst = self._makeOne(max_memory=100)
+        inst.get_rss = lambda: None
+        self.assertFalse(inst.should_recycle())
+
+    def test_recycle(self):
+        server = DummyListener()
+        channel = DummyChannel(requests=[True])
+        server.active_channels[1] = channel
+        inst = self._makeOne(graceful_timeout=10)
+
+        def sleep(seconds):
+            channel.requests = []
+
+        inst.sleep = sleep
+        inst.recycle(server)
+        self.assertFalse(server.accepting)
+        self.assertEqual(channel.requests, [])
+        self.assertEqual(inst.killed, [(os.getpid(), signal.SIGTERM)])
+
+    def test_recycle_multisocket(self):
+        server1 = DummyListener()
+        server2 = DummyListener()
+        server = DummyMultiSocketServer({1: server1, 2: server2, 3: object()})
+        inst = self._makeOne()
+        inst.recycle(server)
+        self.assertFalse(server1.accepting)
+        self.assertFalse(server2.accepting)
+        self.assertEqual(inst.killed, [(os.getpid(), signal.SIGTERM)])
+
+    def test_recycle_asyncio(self):
+        server = DummyAsyncioServer()
+        inst = self._makeOne()
+        inst.recycle(server)
+        self.assertEqual(server.loop.callbacks, [server.stop_accepting])
+        self.assertEqual(inst.killed, [(os.getpid(), signal.SIGTERM)])
+
+    def test_recycle_graceful_timeout(self):
+        server = DummyListener()
+        server.active_channels[1] = DummyChannel(total_outbufs_len=1)
+        inst = self._makeOne(graceful_timeout=0)
+        inst.recycle(server)
+        self.assertEqual(inst.killed, [(os.getpid(), signal.SIGTERM)])
+
+    def test_busy(self):
+        server = DummyListener()
+        inst = self._makeOne()
+        self.assertFalse(inst.busy([server]))
+        server.active_channels[1] = DummyChannel()
+        self.assertFalse(inst.busy([server]))
+        server.active_channels[2] = DummyChannel(total_outbufs_len=10)
+        self.assertTrue(inst.busy([server]))
+
+    def test_run(self):
+        server = DummyListener()
+        inst = self._makeOne(max_requests=1)
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            inst.requests = 1
+
+        inst.sleep = sleep
+        inst.run(server)
+        self.assertEqual(sleeps, [inst.interval])
+        self.assertFalse(server.accepting)
+        self.assertEqual(inst.killed, [(os.getpid(), signal.SIGTERM)])
+
+    def test_start(self):
+        server = DummyListener()
+        inst = self._makeOne(max_requests=1)
+        inst.requests = 1
+        thread = inst.start(server)
+        thread.join()
+        self.assertTrue(thread.daemon)
+        self.assertEqual(inst.killed, [(os.getpid(), signal.SIGTERM)])
+
+
+class TestArbiter(unittest.TestCase):
+    def setUp(self):
+        self.handlers = {
+            signum: signal.getsignal(signum)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+    def tearDown(self):
+        for signum, handler in self.handlers.items():
+            signal.signal(signum, handler)
+
+    def _makeOne(self, app_factory=None, preload=True, **kw):
+        from waitress.prefork import Arbiter
+
+        kw.setdefault("workers", 2)
+        inst = Arbiter(app_factory or DummyApp, preload=preload, **kw)
+        inst.osmod = DummyOs()
+        inst.server_factory = DummyServerFactory()
+        inst.sleep = lambda seconds: None
+        inst.quiet = True
+        return inst
+
+    def test_ctor(self):
+        inst = self._makeOne(listen="127.0.0.1:0", threads=2, worker_max_requests=5)
+        self.assertEqual(inst.adj.workers, 2)
+        self.assertEqual(
+            inst.worker_kw, {"listen": "127.0.0.1:0", "threads": 2, "workers": 2}
+        )
+        self.assertFalse(inst.bind_in_workers)
+        self.assertEqual(inst.workers, {})
+
+    @unittest.skipIf(not hasattr(socket, "SO_REUSEPORT"), "needs SO_REUSEPORT")
+    def test_ctor_reuse_port(self):
+        inst = self._makeOne(listen="127.0.0.1:0", reuse_port=True)
+        self.assertTrue(inst.bind_in_workers)
+
+    def test_spawn_worker_parent(self):
+        inst = self._makeOne()
+        inst.osmod.pids = [42]
+        self.assertEqual(inst.spawn_worker(1), 42)
+        self.assertEqual(inst.workers, {42: 1})
+
+    def test_spawn_worker_child(self):
+        inst = self._makeOne()
+        inst.osmod.pids = [0]
+        inst.run_worker = lambda number: 0
+        self.assertRaises(DummyExit, inst.spawn_worker, 1)
+        self.assertEqual(inst.osmod.exited, [0])
+        self.assertEqual(inst.workers, {})
+
+    def test_spawn_worker_child_error(self):
+        inst = self._makeOne()
+        inst.osmod.pids = [0]
+
+        def run_worker(number):
+            raise ValueError
+
+        inst.run_worker = run_worker
+        self.assertRaises(DummyExit, inst.spawn_worker, 1)
+        self.assertEqual(inst.osmod.exited, [1])
+
+    def test_spawn_workers(self):
+        inst = self._makeOne(workers=3)
+        inst.osmod.pids = [11, 12]
+        inst.workers = {10: 2}
+        inst.spawn_workers()
+        self.assertEqual(inst.workers, {10: 2, 11: 1, 12: 3})
+
+    def test_run_worker_preloaded(self):
+        app = DummyApp()
+        inst = self._makeOne(app_factory=None, threads=3)
+        inst.application = app
+        self.assertEqual(inst.run_worker(1), 0)
+        factory = inst.server_factory
+        self.assertIs(factory.app, app)
+        self.assertEqual(factory.kw, {"threads": 3, "workers": 2})
+        self.assertTrue(factory.server.ran)
+        self.assertIs(signal.getsignal(signal.SIGINT), signal.default_int_handler)
+        self.assertRaises(SystemExit, signal.getsignal(signal.SIGTERM), 15, None)
+
+    def test_run_worker_not_preloaded(self):
+        app = DummyApp()
+        inst = self._makeOne(app_factory=lambda: app, preload=False)
+        self.assertEqual(inst.run_worker(1), 0)
+        self.assertIs(inst.server_factory.app, app)
+
+    def test_run_worker_monitor(self):
+        from waitress.prefork import WorkerMonitor
+
+        app = DummyApp()
+        inst = self._makeOne(worker_max_requests=5, worker_max_memory=10)
+        inst.application = app
+        started = []
+        inst.worker_monitor = type(
+            "Monitor", (WorkerMonitor,), {"start": lambda self, s: started.append(s)}
+        )
+        self.assertEqual(inst.run_worker(1), 0)
+        monitor = inst.server_factory.app
+        self.assertIs(monitor.application, app)
+        self.assertEqual(monitor.max_requests, 5)
+        self.assertEqual(monitor.max_memory, 10)
+        self.assertEqual(started, [inst.server_factory.server])
+
+    def test_run_worker_boot_error(self):
+        from waitress.prefork import WORKER_BOOT_ERROR
+
+        def app_factory():
+            raise ImportError
+
+        inst = self._makeOne(app_factory=app_factory, preload=False)
+        self.assertEqual(inst.run_worker(1), WORKER_BOOT_ERROR)
+        self.assertFalse(hasattr(inst.server_factory, "server"))
+
+    def test_reap_workers_exited(self):
+        inst = self._makeOne()
+        inst.workers = {10: 1, 11: 2}
+        inst.osmod.statuses = [(10, 1 << 8), (99, 0)]
+        inst.reap_workers()
+        self.assertEqual(inst.workers, {11: 2})
+        self.assertTrue(inst.alive)
+
+    def test_reap_workers_signaled(self):
+        inst = self._makeOne()
+        inst.workers = {10: 1}
+        inst.osmod.statuses = [(10, signal.SIGKILL)]
+        inst.reap_workers()
+        self.assertEqual(inst.workers, {})
+        self.assertTrue(inst.alive)
+
+    def test_reap_workers_boot_error(self):
+        from waitress.prefork import WORKER_BOOT_ERROR
+
+        inst = self._makeOne()
+        inst.workers = {10: 1}
+        inst.osmod.statuses = [(10, WORKER_BOOT_ERROR << 8)]
+        inst.reap_workers()
+        self.assertEqual(inst.workers, {})
+        self.assertFalse(inst.alive)
+
+    def test_reap_workers_no_children(self):
+        inst = self._makeOne()
+        inst.workers = {10: 1}
+        inst.osmod.statuses = ChildProcessError
+        inst.reap_workers()
+        self.assertEqual(inst.workers, {10: 1})
+
+    def test_kill_workers(self):
+        inst = self._makeOne()
+        inst.workers = {10: 1, 11: 2}
+        inst.osmod.gone = {11}
+        inst.kill_workers(signal.SIGTERM)
+        self.assertEqual(inst.osmod.killed, [(10, signal.SIGTERM)])
+        self.assertEqual(inst.workers, {10: 1})
+
+    def test_stop(self):
+        inst = self._makeOne()
+        inst.workers = {10: 1}
+        inst.osmod.statuses = [(0, 0), (10, 0)]
+        inst.stop()
+        self.assertFalse(inst.alive)
+        self.assertEqual(inst.osmod.killed, [(10, signal.SIGTERM)])
+        self.assertEqual(inst.workers, {})
+
+    def test_stop_kills_after_graceful_timeout(self):
+        inst = self._makeOne()
+        inst.graceful_timeout = 0
+        inst.workers = {10: 1, 11: 2}
+        inst.osmod.statuses = [(0, 0)]
+        inst.osmod.gone_on_waitpid = {11}
+        inst.stop()
+        self.assertEqual(
+            inst.osmod.killed,
+            [
+                (10, signal.SIGTERM),
+                (11, signal.SIGTERM),
+                (10, signal.SIGKILL),
+                (11, signal.SIGKILL),
+            ],
+        )
+        self.assertEqual(inst.osmod.waited, [10, 11])
+        self.assertEqual(inst.workers, {})
+
+    def test_handle_signal(self):
+        inst = self._makeOne()
+        inst.handle_signal(signal.SIGTERM, None)
+        self.assertFalse(inst.alive)
+
+    def test_run(self):
+        app = DummyApp()
+        inst = self._makeOne(app_factory=lambda: app, listen="127.0.0.1:0")
+        inst.osmod.pids = [10, 11, 12]
+        inst.osmod.statuses = [(11, 1 << 8), (0, 0), (10, 0), (12, 0)]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+
+        inst.sleep = sleep
+        inst.run()
+        self.assertIs(inst.application, app)
+        self.assertEqual(len(inst.sockets), 1)
+        self.assertEqual(inst.worker_kw, {"sockets": inst.sockets, "workers": 2})
+        self.assertEqual(inst.sockets[0].fileno(), -1)
+        # worker 2 exited and was replaced
+        self.assertEqual(
+            inst.osmod.killed, [(10, signal.SIGTERM), (12, signal.SIGTERM)]
+        )
+        self.assertEqual(inst.workers, {})
+
+    def test_run_not_preloaded(self):
+        def app_factory():  # pragma: no cover
+            raise AssertionError("imported in the master")
+
+        inst = self._makeOne(
+            app_factory=app_factory, preload=False, listen="127.0.0.1:0"
+        )
+        inst.alive = False
+        inst.run()
+        self.assertIsNone(inst.application)
+
+
+class Test_serve_workers(unittest.TestCase):
+    def test_it(self):
+        from waitress import prefork
+
+        ran = []
+        orig = prefork.Arbiter.run
+        prefork.Arbiter.run = lambda self: ran.append(self)
+        try:
+            prefork.serve_workers(DummyApp, preload=False, _quiet=True, workers=2)
+        finally:
+            prefork.Arbiter.run = orig
+        self.assertEqual(len(ran), 1)
+        self.assertTrue(ran[0].quiet)
+        self.assertFalse(ran[0].preload)
+        self.assertEqual(ran[0].adj.workers, 2)
+
+
+@unittest.skipIf(WIN or not hasattr(socket, "AF_UNIX"), "needs fork and AF_UNIX")
+class TestWorkersFunctional(unittest.TestCase):
+    extra_args = ()
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "waitress.sock")
+        self.log = os.path.join(self.tempdir, "waitress.log")
+        here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [os.path.join(here, "src"), here, env.get("PYTHONPATH", "")]
+        )
+        with open(self.log, "wb") as log:
+            self.proc = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "waitress",
+                    "--workers=2",
+                    "--worker-max-requests=1",
+                    *self.listen_args(),
+                    *self.extra_args,
+                    "tests.fixtureapps.echo:app",
+                ],
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=log,
+            )
+
+    def tearDown(self):
+        if self.proc.poll() is None:  # pragma: no cover
+            self.proc.kill()
+            self.proc.wait()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        os.unlink(self.log)
+        os.rmdir(self.tempdir)
+
+    def listen_args(self):
+        return [f"--unix-socket={self.path}"]
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:  # pragma: no cover
+            sock.close()
+            raise
+        return sock
+
+    def _request(self):
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                sock = self.connect()
+                break
+            except OSError:  # pragma: no cover
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        try:
+            sock.sendall(b"GET / HTTP/1.0\r\n\r\n")
+            response = b""
+            while True:
+                data = sock.recv(8192)
+                if not data:
+                    break
+                response += data
+        finally:
+            sock.close()
+        return response
+
+    def test_serves_and_recycles(self):
+        # every worker recycles after a single request, so these need the
+        # master to keep forking replacements
+        for _ in range(5):
+            response = self._request()
+            self.assertTrue(response.startswith(b"HTTP/1.0 200 OK"), response)
+        self.proc.send_signal(signal.SIGTERM)
+        self.assertEqual(self.proc.wait(30), 0)
+        with open(self.log, "rb") as f:
+            self.assertNotIn(b"failed to boot", f.read())
+
+
+@unittest.skipIf(not hasattr(socket, "SO_REUSEPORT"), "needs SO_REUSEPORT")
+class TestReusePortAsyncioWorkersFunctional(TestWorkersFunctional):
+    # the master binds nothing; every worker binds its own socket
+    extra_args = ("--reuse-port", "--backend=asyncio")
+
+    def listen_args(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        return [f"--listen=127.0.0.1:{self.port}"]
+
+    def connect(self):
+        return socket.create_connection(("127.0.0.1", self.port))
+
+
+class DummyApp:
+    calls = 0
+
+    def __call__(self, environ, start_response):
+        self.calls += 1
+        return [b"ok"]
+
+
+class DummyChannel:
+    def __init__(self, requests=(), total_outbufs_len=0):
+        self.requests = list(requests)
+        self.total_outbufs_len = total_outbufs_len
+
+
+class DummyListener(BaseWSGIServer):
+    def __init__(self):
+        self.accepting = True
+        self.active_channels = {}
+
+
+class DummyAsyncioServer(AsyncioWSGIServer):
+    def __init__(self):
+        self.loop = DummyLoop()
+        self.active_channels = {}
+
+
+class DummyLoop:
+    def __init__(self):
+        self.callbacks = []
+
+    def call_soon_threadsafe(self, callback):
+        self.callbacks.append(callback)
+
+
+class DummyMultiSocketServer:
+    def __init__(self, map):
+        self.map = map
+
+
+class DummyServer:
+    ran = False
+
+    def run(self):
+        self.ran = True
+
+
+class DummyServerFactory:
+    def __call__(self, app, **kw):
+        self.app = app
+        self.kw = kw
+        self.server = DummyServer()
+        return self.server
+
+
+class DummyExit(Exception):
+    pass
+
+
+class DummyOs:
+    WNOHANG = os.WNOHANG if hasattr(os, "WNOHANG") else 1
+    WIFSIGNALED = staticmethod(lambda status: bool(status & 0x7F))
+    WTERMSIG = staticmethod(lambda status: status & 0x7F)
+    WEXITSTATUS = staticmethod(lambda status: status >> 8)
+
+    def __init__(self):
+        self.pids = []
+        self.statuses = []
+        self.exited = []
+        self.killed = []
+        self.waited = []
+        self.gone = set()
+        self.gone_on_waitpid = set()
+
+    def fork(self):
+        return self.pids.pop(0)
+
+    def _exit(self, status):
+        self.exited.append(status)
+        raise DummyExit(status)
+
+    def waitpid(self, pid, options):
+        if pid != -1:
+            self.waited.append(pid)
+            if pid in self.gone_on_waitpid:
+                raise ChildProcessError
+            return pid, 0
+        if self.statuses is ChildProcessError:
+            raise ChildProcessError
+        if not self.statuses:
+            return 0, 0
+        return self.statuses.pop(0)
+
+    def kill(self, pid, signum):
+        if pid in self.gone:
+            raise ProcessLookupError
+        self.killed.append((pid, signum))
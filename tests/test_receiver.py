@@ -35,6 +35,13 @@ class TestFixedStreamReceiver(unittest.TestCase):
         self.assertEqual(inst.remain, 8)
         self.assertEqual(buf.data, ["aa"])
 
+    def test_received_memoryview(self):
+        buf = DummyBuffer()
+        inst = self._makeOne(2, buf)
+        result = inst.received(memoryview(b"abc"))
+        self.assertEqual(result, 2)
+        self.assertEqual([bytes(x) for x in buf.data], [b"ab"])
+
     def test_getfile(self):
         buf = DummyBuffer()
         inst = self._makeOne(10, buf)
@@ -65,6 +72,15 @@ class TestChunkedReceiver(unittest.TestCase):
         self.assertEqual(result, 0)
         self.assertEqual(inst.completed, True)
 
+    def test_received_memoryview(self):
+        buf = DummyBuffer()
+        inst = self._makeOne(buf)
+        data = b"2\r\nab\r\n1;ext=1\r\nc\r\n0\r\n\r\nGET"
+        result = inst.received(memoryview(data))
+        self.assertEqual(result, len(data) - 3)
+        self.assertEqual(b"".join(bytes(x) for x in buf.data), b"abc")
+        self.assertEqual(inst.completed, True)
+
     def test_received_remain_gt_zero(self):
         buf = DummyBuffer()
         inst = self._makeOne(buf)
@@ -149,6 +149,37 @@ class Test_run(unittest.TestCase):
         ]
         self.assertEqual(runner.run(argv=argv, _serve=check_server), 0)
 
+    def test_workers_preloaded(self):
+        from tests.fixtureapps import runner as _apps
+
+        def check_server(app, **kw):
+            self.assertIs(app, _apps.app)
+            self.assertDictEqual(kw, {"workers": "2"})
+
+        argv = [
+            "waitress-serve",
+            "--workers=2",
+            "tests.fixtureapps.runner:app",
+        ]
+        self.assertEqual(runner.run(argv=argv, _serve=check_server), 0)
+
+    def test_workers_no_preload(self):
+        from tests.fixtureapps import runner as _apps
+
+        def check_workers(app_factory, preload, **kw):
+            self.assertFalse(preload)
+            self.assertDictEqual(kw, {"workers": "2"})
+            self.assertIs(app_factory(), _apps.app)
+
+        argv = [
+            "waitress-serve",
+            "--workers=2",
+            "--no-preload",
+            "--call",
+            "tests.fixtureapps.runner:returns_app",
+        ]
+        self.assertEqual(runner.run(argv=argv, _serve_workers=check_workers), 0)
+
 
 class Test_helper(unittest.TestCase):
     def test_exception_logging(self):
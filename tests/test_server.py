@@ -113,6 +113,40 @@ class TestWSGIServer(unittest.TestCase):
         inst = self._makeOneWithMap(_start=False)
         self.assertEqual(inst.accepting, False)
 
+    @unittest.skipIf(not hasattr(socket, "SO_REUSEPORT"), "needs SO_REUSEPORT")
+    def test_ctor_reuse_port(self):
+        from waitress.server import create_server
+
+        self.inst = create_server(
+            dummy_app,
+            host="127.0.0.1",
+            port=0,
+            map={},
+            _dispatcher=DummyTaskDispatcher(),
+            _start=False,
+            reuse_port=True,
+        )
+        self.assertEqual(
+            self.inst.socket.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT), 1
+        )
+
+    @unittest.skipIf(not hasattr(socket, "TCP_DEFER_ACCEPT"), "needs TCP_DEFER_ACCEPT")
+    def test_ctor_tcp_defer_accept(self):
+        from waitress.server import create_server
+
+        self.inst = create_server(
+            dummy_app,
+            host="127.0.0.1",
+            port=0,
+            map={},
+            _dispatcher=DummyTaskDispatcher(),
+            _start=False,
+            tcp_defer_accept=5,
+        )
+        self.assertTrue(
+            self.inst.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT)
+        )
+
     def test_get_server_multi(self):
         inst = self._makeOneWithMulti()
         self.assertEqual(inst.__class__.__name__, "MultiSocketServer")
@@ -197,7 +231,7 @@ class TestWSGIServer(unittest.TestCase):
         inst.maintenance = lambda t: L.append(t)
         inst.readable()
         self.assertEqual(len(L), 1)
-        self.assertNotEqual(inst.next_channel_cleanup, 0)
+        self.assertEqual(inst.next_channel_cleanup, L[0] + inst.timers.resolution)
 
     def test_writable(self):
         inst = self._makeOneWithMap()
@@ -245,18 +279,201 @@ class TestWSGIServer(unittest.TestCase):
         self.assertEqual(innersock.opts, [("level", "optname", "value")])
         self.assertEqual(L, [(inst, innersock, None, inst.adj)])
 
+    def test_handle_accept_batch(self):
+        inst = self._makeOneWithMap()
+        socks = [DummySock() for _ in range(3)]
+        inst.socket = DummyBacklogSock([(sock, None) for sock in socks])
+        inst.adj.socket_options = [("level", "optname", "value")]
+        L = []
+        inst.channel_class = lambda *arg, **kw: L.append(arg)
+        inst.handle_accept()
+        self.assertEqual(L, [(inst, sock, None, inst.adj) for sock in socks])
+        for sock in socks:
+            self.assertEqual(sock.opts, [("level", "optname", "value")])
+        self.assertEqual(inst.accepted_connections, 3)
+        self.assertEqual(inst.accept_batches, 1)
+        self.assertEqual(inst.accept_batch_max, 3)
+        self.assertEqual(inst.accept_budget_exhausted, 0)
+
+    def test_handle_accept_socket_options_computed_once(self):
+        inst = self._makeOneWithMap()
+        inst.adj.socket_options = [("level", "optname", "value")]
+        inst.socket = DummyBacklogSock([(DummySock(), None)])
+        inst.channel_class = lambda *arg, **kw: None
+        inst.handle_accept()
+        self.assertEqual(inst.accepted_socket_options, [("level", "optname", "value")])
+        inst.adj.socket_options = []
+        sock = DummySock()
+        inst.socket = DummyBacklogSock([(sock, None)])
+        inst.handle_accept()
+        self.assertEqual(sock.opts, [("level", "optname", "value")])
+
+    @unittest.skipIf(
+        not hasattr(socket, "TCP_NOTSENT_LOWAT") or not hasattr(socket, "TCP_QUICKACK"),
+        "needs TCP_NOTSENT_LOWAT and TCP_QUICKACK",
+    )
+    def test_handle_accept_tcp_options(self):
+        inst = self._makeOneWithMap()
+        inst.adj.socket_options = [("level", "optname", "value")]
+        inst.adj.tcp_notsent_lowat = 16384
+        inst.adj.tcp_quickack = True
+        sock = DummySock()
+        inst.socket = DummyBacklogSock([(sock, None)])
+        inst.channel_class = lambda *arg, **kw: None
+        inst.handle_accept()
+        self.assertEqual(
+            sock.opts,
+            [
+                ("level", "optname", "value"),
+                (socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, 16384),
+                (socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1),
+            ],
+        )
+
+    def test_handle_accept_budget(self):
+        inst = self._makeOneWithMap()
+        inst.adj.accept_budget = 2
+        inst.socket = DummyBacklogSock([(DummySock(), None) for _ in range(3)])
+        L = []
+        inst.channel_class = lambda *arg, **kw: L.append(arg)
+        inst.handle_accept()
+        self.assertEqual(len(L), 2)
+        self.assertEqual(len(inst.socket.backlog), 1)
+        self.assertEqual(inst.accept_budget_exhausted, 1)
+        inst.handle_accept()
+        self.assertEqual(len(L), 3)
+        self.assertEqual(inst.accepted_connections, 3)
+        self.assertEqual(inst.accept_batches, 2)
+        self.assertEqual(inst.accept_batch_max, 2)
+        self.assertEqual(inst.accept_budget_exhausted, 1)
+
+    def test_handle_accept_connection_limit(self):
+        inst = self._makeOneWithMap()
+        inst.adj.connection_limit = inst.connection_count() + 2
+        inst.socket = DummyBacklogSock([(DummySock(), None) for _ in range(3)])
+        L = []
+        inst.channel_class = lambda *arg, **kw: L.append(arg)
+        inst.handle_accept()
+        self.assertEqual(len(L), 2)
+        self.assertEqual(inst.accept_budget_exhausted, 0)
+
+    def test_handle_accept_socket_options_error(self):
+        inst = self._makeOneWithMap()
+        bad = DummySock()
+        good = DummySock()
+        inst.socket = DummyBacklogSock([(bad, None), (good, None)])
+
+        def set_socket_options(conn):
+            if conn is bad:
+                raise OSError
+
+        inst.set_socket_options = set_socket_options
+        inst.logger = DummyLogger()
+        L = []
+        inst.channel_class = lambda *arg, **kw: L.append(arg)
+        inst.handle_accept()
+        self.assertEqual(L, [(inst, good, None, inst.adj)])
+        self.assertTrue(bad.closed)
+        self.assertEqual(len(inst.logger.logged), 1)
+
+    def test_handle_accept_event_loops_round_robin(self):
+        from waitress.server import create_server
+
+        self.inst = inst = create_server(
+            dummy_app,
+            host="127.0.0.1",
+            port=0,
+            map={},
+            _dispatcher=DummyTaskDispatcher(),
+            _sock=DummySock(),
+            event_loops=3,
+        )
+        self.assertEqual(len(inst.event_loops), 2)
+        loop1, loop2 = inst.event_loops
+        loop1.add_channel = lambda *arg: L.append(("loop1",) + arg)
+        loop2.add_channel = lambda *arg: L.append(("loop2",) + arg)
+        inst.adj = DummyAdj
+        L = []
+        inst.channel_class = lambda *arg, **kw: L.append(("server",) + arg)
+        socks = [DummySock() for _ in range(4)]
+        for sock in socks:
+            inst.socket = DummySock(acceptresult=(sock, None))
+            inst.handle_accept()
+        self.assertEqual(
+            L,
+            [
+                ("loop1", inst, socks[0], None),
+                ("loop2", inst, socks[1], None),
+                ("server", inst, socks[2], None, inst.adj),
+                ("loop1", inst, socks[3], None),
+            ],
+        )
+
+    def test_readable_counts_event_loop_connections(self):
+        inst = self._makeOneWithMap()
+        inst.adj = DummyAdj
+        inst.adj.connection_limit = 3
+        loop = DummyEventLoop()
+        loop.map = {1: object(), 2: object()}
+        inst.event_loops = [loop]
+        try:
+            self.assertEqual(inst.connection_count(), 4)
+            self.assertEqual(inst.readable(), False)
+        finally:
+            inst.adj.connection_limit = 1
+            inst.event_loops = []
+
+    def test_run_starts_and_closes_event_loops(self):
+        inst = self._makeOneWithMap(_start=False)
+        inst.asyncore = DummyAsyncore()
+        inst.task_dispatcher = DummyTaskDispatcher()
+        loop = DummyEventLoop()
+        inst.event_loops = [loop]
+        inst.run()
+        self.assertTrue(loop.started)
+        self.assertTrue(loop.closed)
+        inst.event_loops = []
+
     def test_maintenance(self):
+        import time
+
         inst = self._makeOneWithMap()
+        now = time.time()
 
-        class DummyChannel:
-            requests = []
+        class DummyLoop:
+            def __init__(self):
+                self.thunks = []
 
-        zombie = DummyChannel()
-        zombie.last_activity = 0
-        zombie.running_tasks = False
-        inst.active_channels[100] = zombie
-        inst.maintenance(10000)
-        self.assertEqual(zombie.will_close, True)
+            def pull_trigger(self, thunk):
+                self.thunks.append(thunk)
+
+        class DummyChannel:
+            loop = None
+
+            def __init__(self, deadline):
+                self.deadline = deadline
+
+            def timeout_deadline(self):
+                return self.deadline
+
+            def handle_timeout(self):  # pragma: no cover
+                pass
+
+        zombie = DummyChannel(0)
+        busy = DummyChannel(None)
+        active = DummyChannel(now + 1000)
+        elsewhere = DummyChannel(0)
+        elsewhere.loop = DummyLoop()
+        for channel in (zombie, busy, active, elsewhere):
+            inst.timers.schedule(channel, 0)
+        thunks = []
+        inst.trigger.pull_trigger = thunks.append
+        inst.maintenance(now)
+        self.assertEqual(thunks, [zombie.handle_timeout])
+        self.assertEqual(inst.timers.deadline(busy), None)
+        self.assertEqual(inst.timers.deadline(active), now + 1000)
+        # closed by its own loop
+        self.assertEqual(elsewhere.loop.thunks, [elsewhere.handle_timeout])
 
     def test_backward_compatibility(self):
         from waitress.adjustments import Adjustments
@@ -312,6 +529,92 @@ class TestWSGIServer(unittest.TestCase):
         self.assertEqual(L, [(inst, innersock, None, inst.adj)])
 
 
+class TestEventLoop(unittest.TestCase):
+    def _makeOne(self):
+        from waitress.adjustments import Adjustments
+        from waitress.server import EventLoop
+
+        self.inst = EventLoop(Adjustments(), name="waitress-loop-test")
+        return self.inst
+
+    def tearDown(self):
+        self.inst.close()
+
+    def test_ctor(self):
+        inst = self._makeOne()
+        self.assertEqual(list(inst.map.values()), [inst.trigger])
+        self.assertEqual(inst.thread, None)
+
+    def test_connection_count(self):
+        inst = self._makeOne()
+        # the trigger isn't counted
+        self.assertEqual(inst.connection_count(), 0)
+        inst.map[-1] = object()
+        self.assertEqual(inst.connection_count(), 1)
+        del inst.map[-1]
+        inst.close()
+        self.assertEqual(inst.connection_count(), 0)
+
+    def test_run(self):
+        inst = self._makeOne()
+        inst.asyncore = DummyAsyncore()
+        self.assertRaises(SystemExit, inst.run)
+
+    def test_start(self):
+        inst = self._makeOne()
+        inst.asyncore = DummyLoopAsyncore()
+        inst.start()
+        inst.thread.join(5)
+        self.assertEqual(inst.thread.name, "waitress-loop-test")
+        self.assertEqual(inst.asyncore.map, inst.map)
+
+    def test_add_channel(self):
+        inst = self._makeOne()
+        server = DummyServer()
+        sock = DummySock()
+        inst.add_channel(server, sock, ("127.0.0.1", 1234))
+        self.assertEqual(server.channels, [])
+        inst.trigger.handle_read()
+        (channel,) = server.channels
+        self.assertEqual(channel.args, (server, sock, ("127.0.0.1", 1234), server.adj))
+        self.assertEqual(channel.kw, {"map": inst.map})
+        self.assertIs(channel.loop, inst)
+
+    def test_add_channel_fails_closes_socket(self):
+        inst = self._makeOne()
+        server = DummyServer()
+
+        def channel_class(*arg, **kw):
+            raise OSError
+
+        server.channel_class = channel_class
+        sock = DummySock()
+        sock.closed = False
+        sock.close = lambda: setattr(sock, "closed", True)
+        inst.add_channel(server, sock, None)
+        inst.trigger.log_info = lambda *arg: None
+        inst.trigger.handle_read()
+        self.assertTrue(sock.closed)
+
+    def test_close_not_started(self):
+        inst = self._makeOne()
+        trigger = inst.trigger
+        inst.close()
+        self.assertTrue(inst.closed)
+        self.assertEqual(inst.map, {})
+        self.assertTrue(trigger._closed)
+        inst.start()
+        self.assertEqual(inst.thread, None)
+
+    def test_close_started(self):
+        inst = self._makeOne()
+        inst.thread = object()
+        inst.close()
+        self.assertEqual(len(inst.trigger.thunks), 1)
+        inst.trigger.handle_read()
+        self.assertEqual(inst.map, {})
+
+
 if hasattr(socket, "AF_UNIX"):
 
     class TestUnixWSGIServer(unittest.TestCase):
@@ -436,6 +739,9 @@ class DummySock(socket.socket):
     def accept(self):
         if self.toraise:
             raise self.toraise
+        if self.accepted:
+            # the backlog only held the one connection
+            raise socket.error(errno.EAGAIN)
         self.accepted = True
         return self.acceptresult
 
@@ -461,7 +767,18 @@ class DummySock(socket.socket):
         return self.bound
 
     def close(self):
-        pass
+        self.closed = True
+
+
+class DummyBacklogSock(DummySock):
+    def __init__(self, backlog):
+        DummySock.__init__(self)
+        self.backlog = backlog
+
+    def accept(self):
+        if not self.backlog:
+            raise socket.error(errno.EAGAIN)
+        return self.backlog.pop(0)
 
 
 class DummyTaskDispatcher:
@@ -491,14 +808,19 @@ class DummyTask:
 
 class DummyAdj:
     connection_limit = 1
+    accept_budget = 64
     log_socket_errors = True
     socket_options = [("level", "optname", "value")]
+    tcp_notsent_lowat = 0
+    tcp_quickack = False
     cleanup_interval = 900
     channel_timeout = 300
 
 
 class DummyAsyncore:
-    def loop(self, timeout=30.0, use_poll=False, map=None, count=None):
+    def loop(
+        self, timeout=30.0, use_poll=False, map=None, count=None, use_selector=False
+    ):
         raise SystemExit
 
 
@@ -516,3 +838,47 @@ class DummyLogger:
 
     def warning(self, msg, **kw):
         self.logged.append(msg)
+
+
+class DummyLoopAsyncore:
+    def loop(
+        self, timeout=30.0, use_poll=False, map=None, count=None, use_selector=False
+    ):
+        self.map = map
+
+
+class DummyEventLoop:
+    started = False
+    closed = False
+
+    def __init__(self):
+        self.map = {}
+
+    def start(self):
+        self.started = True
+
+    def connection_count(self):
+        return len(self.map)
+
+    def close(self):
+        self.closed = True
+
+
+class DummyChannel:
+    loop = None
+
+    def __init__(self, *args, **kw):
+        self.args = args
+        self.kw = kw
+
+
+class DummyServer:
+    adj = DummyAdj
+
+    def __init__(self):
+        self.channels = []
+
+    def channel_class(self, *args, **kw):
+        channel = DummyChannel(*args, **kw)
+        self.channels.append(channel)
+        return channel
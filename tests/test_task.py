@@ -768,6 +768,79 @@ class TestWSGITask(unittest.TestCase):
         self.assertEqual(environ["PATH_INFO"], "")
         self.assertEqual(environ["SCRIPT_NAME"], "/foo")
 
+    def test_get_environment_workers(self):
+        inst = self._makeOne()
+        inst.channel.server.adj.workers = 2
+        environ = inst.get_environment()
+        # the application runs in several processes
+        self.assertEqual(environ["wsgi.multiprocess"], True)
+
+    def test_get_environment_lazy_headers(self):
+        from waitress.parser import LazyHeaders
+
+        inst = self._makeOne()
+        request = DummyParser()
+        request.headers = LazyHeaders(b"X-Foo: a\r\nX-Bar:  b \r\nX-Foo: c")
+        inst.request = request
+        environ = inst.get_environment()
+        # a plain dict with every value decoded, as PEP 3333 requires
+        self.assertIs(environ.__class__, dict)
+        self.assertEqual(environ["HTTP_X_FOO"], "a, c")
+        self.assertEqual(environ["HTTP_X_BAR"], "b")
+
+    def test_get_environment_templates(self):
+        inst = self._makeOne()
+        environ = inst.get_environment()
+        self.assertEqual(environ.__class__, dict)
+        channel = inst.channel
+        server = channel.server
+        self.assertEqual(
+            server.environ_template,
+            {
+                "SERVER_PORT": "80",
+                "SERVER_NAME": "localhost",
+                "SERVER_SOFTWARE": "waitress",
+                "SCRIPT_NAME": "",
+                "wsgi.version": (1, 0),
+                "wsgi.multithread": True,
+                "wsgi.multiprocess": False,
+                "wsgi.run_once": False,
+                "wsgi.file_wrapper": environ["wsgi.file_wrapper"],
+                "wsgi.input_terminated": True,
+            },
+        )
+        self.assertEqual(
+            channel.environ_template,
+            dict(
+                server.environ_template,
+                REMOTE_ADDR="127.0.0.1",
+                REMOTE_HOST="127.0.0.1",
+                REMOTE_PORT="39830",
+            ),
+        )
+
+    def test_get_environment_reuses_templates(self):
+        inst = self._makeOne()
+        environ = inst.get_environment()
+        environ["REMOTE_ADDR"] = "changed"
+        environ["wsgi.version"] = None
+        inst.channel.server.adj.ident = "changed"
+        request = DummyParser()
+        request.version = "1.1"
+        other = self._makeOne(channel=inst.channel, request=request)
+        environ = other.get_environment()
+        self.assertIsNot(environ, inst.environ)
+        self.assertEqual(environ["REMOTE_ADDR"], "127.0.0.1")
+        self.assertEqual(environ["wsgi.version"], (1, 0))
+        self.assertEqual(environ["SERVER_SOFTWARE"], "waitress")
+        self.assertEqual(environ["SERVER_PROTOCOL"], "HTTP/1.1")
+
+    def test_get_environment_other_version(self):
+        inst = self._makeOne()
+        inst.version = "2.0"
+        environ = inst.get_environment()
+        self.assertEqual(environ["SERVER_PROTOCOL"], "HTTP/2.0")
+
     def test_get_environment_values(self):
         import sys
 
@@ -804,6 +877,7 @@ class TestWSGITask(unittest.TestCase):
                 "SERVER_PROTOCOL",
                 "SERVER_SOFTWARE",
                 "waitress.client_disconnected",
+                "waitress.input_view",
                 "wsgi.errors",
                 "wsgi.file_wrapper",
                 "wsgi.input",
@@ -840,9 +914,41 @@ class TestWSGITask(unittest.TestCase):
         self.assertEqual(environ["wsgi.run_once"], False)
         self.assertEqual(environ["wsgi.input"], "stream")
         self.assertEqual(environ["wsgi.input_terminated"], True)
+        self.assertEqual(environ["waitress.input_view"](), "view")
         self.assertEqual(inst.environ, environ)
 
 
+class Test_environ_key(unittest.TestCase):
+    def setUp(self):
+        from waitress import task
+
+        self.task = task
+        self.saved = dict(task.environ_keys)
+
+    def tearDown(self):
+        self.task.environ_keys.clear()
+        self.task.environ_keys.update(self.saved)
+
+    def _callFUT(self, key):
+        return self.task.environ_key(key)
+
+    def test_renamed_headers(self):
+        self.assertEqual(self.task.environ_keys["CONTENT_TYPE"], "CONTENT_TYPE")
+        self.assertEqual(self.task.environ_keys["CONTENT_LENGTH"], "CONTENT_LENGTH")
+
+    def test_translates_and_caches(self):
+        result = self._callFUT("X_FOO")
+        self.assertEqual(result, "HTTP_X_FOO")
+        self.assertIs(self.task.environ_keys["X_FOO"], result)
+
+    def test_bounded(self):
+        self.task.environ_keys.update(
+            ("X_%d" % i, "HTTP_X_%d" % i) for i in range(self.task.MAX_ENVIRON_KEYS)
+        )
+        self.assertEqual(self._callFUT("FOO"), "HTTP_FOO")
+        self.assertNotIn("FOO", self.task.environ_keys)
+
+
 class TestErrorTask(unittest.TestCase):
     def _makeOne(self, channel=None, request=None):
         if channel is None:
@@ -942,6 +1048,7 @@ class DummyTask:
 class DummyAdj:
     log_socket_errors = True
     ident = "waitress"
+    workers = 0
     host = "127.0.0.1"
     port = 80
     url_prefix = ""
@@ -950,6 +1057,7 @@ class DummyAdj:
 class DummyServer:
     server_name = "localhost"
     effective_port = 80
+    environ_template = None
 
     def __init__(self):
         self.adj = DummyAdj()
@@ -960,6 +1068,7 @@ class DummyChannel:
     adj = DummyAdj()
     creation_time = 0
     addr = ("127.0.0.1", 39830)
+    environ_template = None
 
     def check_client_disconnected(self):
         # For now, until we have tests handling this feature
@@ -996,6 +1105,9 @@ class DummyParser:
     def get_body_stream(self):
         return "stream"
 
+    def get_body_view(self):
+        return "view"
+
 
 def filter_lines(s):
     return list(filter(None, s.split(b"\r\n")))
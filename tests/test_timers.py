@@ -0,0 +1,84 @@
+import unittest
+
+
+class TestTimerWheel(unittest.TestCase):
+    def _makeOne(self, resolution=1, slots=8, now=100):
+        from waitress.timers import TimerWheel
+
+        return TimerWheel(resolution=resolution, slots=slots, now=now)
+
+    def test_ctor(self):
+        inst = self._makeOne()
+        self.assertEqual(inst.tick, 100)
+        self.assertEqual(len(inst), 0)
+
+    def test_schedule(self):
+        inst = self._makeOne()
+        inst.schedule("a", 103.5)
+        self.assertEqual(inst.deadline("a"), 103.5)
+        self.assertEqual(len(inst), 1)
+        self.assertEqual(inst.slots[103 % 8], {"a"})
+
+    def test_schedule_replaces(self):
+        inst = self._makeOne()
+        inst.schedule("a", 103)
+        inst.schedule("a", 105)
+        self.assertEqual(inst.deadline("a"), 105)
+        self.assertEqual(inst.slots[103 % 8], set())
+        self.assertEqual(inst.slots[105 % 8], {"a"})
+
+    def test_schedule_past(self):
+        inst = self._makeOne()
+        inst.schedule("a", 50)
+        self.assertEqual(inst.slots[100 % 8], {"a"})
+        self.assertEqual(inst.expire(100), ["a"])
+
+    def test_cancel(self):
+        inst = self._makeOne()
+        inst.schedule("a", 103)
+        inst.cancel("a")
+        inst.cancel("b")
+        self.assertEqual(inst.deadline("a"), None)
+        self.assertEqual(len(inst), 0)
+        self.assertEqual(inst.expire(200), [])
+
+    def test_expire(self):
+        inst = self._makeOne()
+        inst.schedule("a", 101)
+        inst.schedule("b", 102.5)
+        inst.schedule("c", 104)
+        self.assertEqual(inst.expire(100.5), [])
+        self.assertEqual(inst.expire(102), ["a"])
+        self.assertEqual(inst.tick, 102)
+        self.assertEqual(inst.expire(102.4), [])
+        self.assertEqual(inst.expire(102.5), ["b"])
+        self.assertEqual(sorted(inst.expire(110)), ["c"])
+        self.assertEqual(len(inst), 0)
+
+    def test_expire_beyond_one_turn(self):
+        inst = self._makeOne()
+        inst.schedule("a", 120)
+        # same slot, one turn of the wheel earlier
+        self.assertEqual(inst.expire(112), [])
+        self.assertEqual(inst.deadline("a"), 120)
+        self.assertEqual(inst.expire(120), ["a"])
+
+    def test_expire_after_long_pause(self):
+        inst = self._makeOne()
+        inst.schedule("a", 101)
+        inst.schedule("b", 107)
+        self.assertEqual(sorted(inst.expire(1000)), ["a", "b"])
+        self.assertEqual(inst.tick, 1000)
+
+    def test_expire_does_not_go_back(self):
+        inst = self._makeOne()
+        inst.expire(105)
+        inst.expire(104)
+        self.assertEqual(inst.tick, 105)
+
+    def test_resolution(self):
+        inst = self._makeOne(resolution=0.5, now=50)
+        self.assertEqual(inst.tick, 100)
+        inst.schedule("a", 50.6)
+        self.assertEqual(inst.expire(50.5), [])
+        self.assertEqual(inst.expire(50.6), ["a"])
@@ -6,9 +6,9 @@ if not sys.platform.startswith("win"):
 
     class Test_trigger(unittest.TestCase):
         def _makeOne(self, map):
-            from waitress.trigger import trigger
+            from waitress.trigger import pipe_trigger
 
-            self.inst = trigger(map)
+            self.inst = pipe_trigger(map)
             return self.inst
 
         def tearDown(self):
@@ -71,6 +71,28 @@ if not sys.platform.startswith("win"):
             r = os.read(inst._fds[0], 1)
             self.assertEqual(r, b"x")
 
+        def test_pull_trigger_coalesced(self):
+            map = {}
+            inst = self._makeOne(map)
+            inst.pull_trigger()
+            inst.pull_trigger(True)
+            self.assertEqual(len(inst.thunks), 1)
+            self.assertEqual(inst.pulls, 2)
+            self.assertEqual(inst.coalesced_pulls, 1)
+            r = os.read(inst._fds[0], 2)
+            self.assertEqual(r, b"x")
+
+        def test_pull_trigger_after_handle_read(self):
+            map = {}
+            inst = self._makeOne(map)
+            inst.pull_trigger()
+            inst.handle_read()
+            inst.pull_trigger()
+            self.assertEqual(inst.pulls, 2)
+            self.assertEqual(inst.coalesced_pulls, 0)
+            r = os.read(inst._fds[0], 1)
+            self.assertEqual(r, b"x")
+
         def test_handle_read_socket_error(self):
             map = {}
             inst = self._makeOne(map)
@@ -109,3 +131,83 @@ if not sys.platform.startswith("win"):
             self.assertEqual(result, None)
             self.assertEqual(len(L), 1)
             self.assertEqual(inst.thunks, [])
+
+    if hasattr(os, "eventfd"):
+
+        class Test_eventfd_trigger(unittest.TestCase):
+            def _makeOne(self, map):
+                from waitress.trigger import eventfd_trigger
+
+                self.inst = eventfd_trigger(map)
+                return self.inst
+
+            def tearDown(self):
+                self.inst.close()
+
+            def test_default(self):
+                from waitress.trigger import eventfd_trigger, trigger
+
+                self.inst = trigger({})
+                self.assertIs(trigger, eventfd_trigger)
+
+            def test__close(self):
+                map = {}
+                inst = self._makeOne(map)
+                (fd,) = inst._fds
+                inst.close()
+                self.assertRaises(OSError, os.eventfd_read, fd)
+                self.assertEqual(map, {})
+
+            def test__physical_pull(self):
+                map = {}
+                inst = self._makeOne(map)
+                inst._physical_pull()
+                inst._physical_pull()
+                self.assertEqual(os.eventfd_read(inst.trigger), 2)
+
+            def test_pull_trigger_coalesced(self):
+                map = {}
+                inst = self._makeOne(map)
+                inst.pull_trigger()
+                inst.pull_trigger()
+                self.assertEqual(inst.pulls, 2)
+                self.assertEqual(inst.coalesced_pulls, 1)
+                self.assertEqual(os.eventfd_read(inst.trigger), 1)
+
+            def test_handle_read_thunk(self):
+                map = {}
+                inst = self._makeOne(map)
+                L = []
+                inst.pull_trigger(lambda: L.append(1))
+                inst.pull_trigger(lambda: L.append(2))
+                inst.handle_read()
+                self.assertEqual(L, [1, 2])
+                self.assertEqual(inst.thunks, [])
+                self.assertRaises(BlockingIOError, os.eventfd_read, inst.trigger)
+
+            def test_pull_trigger_while_handle_read(self):
+                map = {}
+                inst = self._makeOne(map)
+                L = []
+                inst.pull_trigger()
+                recv = inst.recv
+
+                def recv_then_pull(size):
+                    # another thread pulls once the wakeup was consumed
+                    data = recv(size)
+                    inst.pull_trigger(lambda: L.append(1))
+                    return data
+
+                inst.recv = recv_then_pull
+                inst.handle_read()
+                self.assertEqual(L, [1])
+                self.assertEqual(inst.coalesced_pulls, 1)
+                # the next pull isn't taken for a pending one
+                inst.pull_trigger()
+                self.assertEqual(inst.coalesced_pulls, 1)
+                self.assertEqual(os.eventfd_read(inst.trigger), 1)
+
+            def test_handle_read_nothing_pending(self):
+                map = {}
+                inst = self._makeOne(map)
+                self.assertEqual(inst.handle_read(), None)
@@ -12,6 +12,9 @@
 #
 ##############################################################################
 
+import os
+import socket
+import tempfile
 import unittest
 
 
@@ -96,6 +99,40 @@ class Test_find_double_newline(unittest.TestCase):
         self.assertEqual(self._callFUT(b"\n\n00\r\n\r\n"), 8)
 
 
+class Test_lazy_attribute(unittest.TestCase):
+    def _makeClass(self):
+        from waitress.utilities import lazy_attribute
+
+        class Dummy:
+            lock = lazy_attribute(list)
+
+        return Dummy
+
+    def test_class_access(self):
+        from waitress.utilities import lazy_attribute
+
+        cls = self._makeClass()
+        self.assertEqual(cls.lock.__class__, lazy_attribute)
+        self.assertEqual(cls.lock.name, "lock")
+
+    def test_created_on_first_access(self):
+        inst = self._makeClass()()
+        self.assertNotIn("lock", inst.__dict__)
+        value = inst.lock
+        self.assertEqual(value, [])
+        self.assertIs(inst.__dict__["lock"], value)
+        self.assertIs(inst.lock, value)
+
+    def test_per_instance(self):
+        cls = self._makeClass()
+        self.assertIsNot(cls().lock, cls().lock)
+
+    def test_assign(self):
+        inst = self._makeClass()()
+        inst.lock = "other"
+        self.assertEqual(inst.lock, "other")
+
+
 class TestBadRequest(unittest.TestCase):
     def _makeOne(self):
         from waitress.utilities import BadRequest
@@ -139,3 +176,62 @@ class Test_undquote(unittest.TestCase):
 
     def test_invalid_quoting_single_quote(self):
         self.assertRaises(ValueError, self._callFUT, '"')
+
+
+class Test_bind_sockets(unittest.TestCase):
+    def _callFUT(self, **kw):
+        from waitress.adjustments import Adjustments
+        from waitress.utilities import bind_sockets
+
+        sockets = bind_sockets(Adjustments(**kw))
+        for sock in sockets:
+            self.addCleanup(sock.close)
+        return sockets
+
+    def test_listen(self):
+        sockets = self._callFUT(listen="127.0.0.1:0 127.0.0.1:0")
+        self.assertEqual(len(sockets), 2)
+        for sock in sockets:
+            host, port = sock.getsockname()
+            self.assertEqual(host, "127.0.0.1")
+            self.assertNotEqual(port, 0)
+            # listening already
+            client = socket.create_connection((host, port))
+            client.close()
+
+    def test_sockets(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(sock.close)
+        self.assertEqual(self._callFUT(sockets=[sock]), [sock])
+
+    @unittest.skipIf(not hasattr(socket, "SO_REUSEPORT"), "needs SO_REUSEPORT")
+    def test_reuse_port(self):
+        (sock,) = self._callFUT(listen="127.0.0.1:0", reuse_port=True)
+        self.assertTrue(sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT))
+
+    @unittest.skipIf(not hasattr(socket, "TCP_DEFER_ACCEPT"), "needs TCP_DEFER_ACCEPT")
+    def test_tcp_defer_accept(self):
+        (sock,) = self._callFUT(listen="127.0.0.1:0", tcp_defer_accept=5)
+        self.assertTrue(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT))
+
+    def test_bind_error_closes_sockets(self):
+        from waitress.adjustments import Adjustments
+        from waitress.utilities import bind_sockets
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(sock.close)
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(1)
+        port = sock.getsockname()[1]
+        adj = Adjustments(listen=f"127.0.0.1:0 127.0.0.1:{port}")
+        self.assertRaises(OSError, bind_sockets, adj)
+
+    if hasattr(socket, "AF_UNIX"):
+
+        def test_unix_socket(self):
+            path = os.path.join(tempfile.mkdtemp(), "waitress.sock")
+            sockets = self._callFUT(unix_socket=path, unix_socket_perms="600")
+            self.assertEqual(len(sockets), 1)
+            self.assertEqual(sockets[0].getsockname(), path)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+            os.unlink(path)
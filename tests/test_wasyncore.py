@@ -806,6 +806,8 @@ class BaseClient(BaseTestHandler):
 
 
 class BaseTestAPI:
+    use_selector = False
+
     def tearDown(self):
         asyncore.close_all(ignore_all=True)
 
@@ -814,7 +816,12 @@ class BaseTestAPI:
         count = 100
 
         while asyncore.socket_map and count > 0:
-            asyncore.loop(timeout=0.01, count=1, use_poll=self.use_poll)
+            asyncore.loop(
+                timeout=0.01,
+                count=1,
+                use_poll=self.use_poll,
+                use_selector=self.use_selector,
+            )
 
             if instance.flag:
                 return
@@ -968,6 +975,9 @@ class BaseTestAPI:
         if sys.platform == "darwin" and self.use_poll:  # pragma: no cover
             self.skipTest("poll may fail on macOS; see issue #28087")
 
+        if self.use_selector:
+            self.skipTest("selectors do not report exceptional conditions")
+
         class TestClient(BaseClient):
             def handle_expt(self):
                 self.socket.recv(1024, socket.MSG_OOB)
@@ -1012,7 +1022,12 @@ class BaseTestAPI:
         self.assertFalse(client.accepting)
 
         # execute some loops so that client connects to server
-        asyncore.loop(timeout=0.01, use_poll=self.use_poll, count=100)
+        asyncore.loop(
+            timeout=0.01,
+            use_poll=self.use_poll,
+            use_selector=self.use_selector,
+            count=100,
+        )
         self.assertFalse(server.connected)
         self.assertTrue(server.accepting)
         self.assertTrue(client.connected)
@@ -1151,6 +1166,21 @@ class TestAPI_UseUnixSocketsPoll(BaseTestAPI_UseUnixSockets, unittest.TestCase):
     use_poll = True
 
 
+class TestAPI_UseIPv4Selector(BaseTestAPI_UseIPv4Sockets, unittest.TestCase):
+    use_poll = False
+    use_selector = True
+
+
+class TestAPI_UseIPv6Selector(BaseTestAPI_UseIPv6Sockets, unittest.TestCase):
+    use_poll = False
+    use_selector = True
+
+
+class TestAPI_UseUnixSocketsSelector(BaseTestAPI_UseUnixSockets, unittest.TestCase):
+    use_poll = False
+    use_selector = True
+
+
 class Test__strerror(unittest.TestCase):
     def _callFUT(self, err):
         from waitress.wasyncore import _strerror
@@ -1410,6 +1440,237 @@ class Test_poll2(unittest.TestCase):
         self.assertEqual(pollster.polled, [0.0])
 
 
+class Test_selector_poll(unittest.TestCase):
+    def _makeOne(self, selector=None):
+        from waitress.wasyncore import selector_poll
+
+        if selector is None:
+            selector = DummySelector()
+        inst = selector_poll(selector)
+        self.addCleanup(inst.close)
+        return inst
+
+    def test_nothing_registered_sleeps(self):
+        dummy_time = DummyTime()
+        map = {0: DummyDispatcher()}
+        inst = self._makeOne()
+        try:
+            from waitress import wasyncore
+
+            old_time = wasyncore.time
+            wasyncore.time = dummy_time
+            result = inst(map=map)
+        finally:
+            wasyncore.time = old_time
+        self.assertEqual(result, None)
+        self.assertEqual(dummy_time.sleepvals, [0.0])
+        self.assertEqual(inst.selector.registered, {})
+
+    def test_registers_once(self):
+        import selectors
+
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        map = {0: disp}
+        inst = self._makeOne()
+        inst(map=map)
+        inst(map=map)
+        self.assertEqual(inst.selector.calls, [("register", 0, selectors.EVENT_READ)])
+        self.assertEqual(inst.selector.selected, [0.0, 0.0])
+
+    def test_modifies_on_state_change(self):
+        import selectors
+
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        map = {0: disp}
+        inst = self._makeOne()
+        inst(map=map)
+        disp.writable = lambda: True
+        inst(map=map)
+        self.assertEqual(
+            inst.selector.calls,
+            [
+                ("register", 0, selectors.EVENT_READ),
+                ("modify", 0, selectors.EVENT_READ | selectors.EVENT_WRITE),
+            ],
+        )
+
+    def test_accepting_never_writable(self):
+        import selectors
+
+        disp = DummyDispatcher()
+        disp.accepting = True
+        disp.readable = lambda: True
+        disp.writable = lambda: True
+        inst = self._makeOne()
+        inst(map={0: disp})
+        self.assertEqual(inst.selector.calls, [("register", 0, selectors.EVENT_READ)])
+
+    def test_unregisters_when_no_interest(self):
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        map = {0: disp}
+        inst = self._makeOne()
+        inst(map=map)
+        disp.readable = lambda: False
+        inst(map=map)
+        self.assertEqual(inst.selector.calls[-1], ("unregister", 0))
+        self.assertEqual(inst.registered, {})
+
+    def test_unregisters_removed_from_map(self):
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        map = {0: disp}
+        inst = self._makeOne()
+        inst(map=map)
+        del map[0]
+        inst(map=map)
+        self.assertEqual(inst.selector.calls[-1], ("unregister", 0))
+        self.assertEqual(inst.registered, {})
+
+    def test_reregisters_reused_fd(self):
+        import selectors
+
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        map = {0: disp}
+        inst = self._makeOne()
+        inst(map=map)
+        disp2 = DummyDispatcher()
+        disp2.readable = lambda: True
+        map[0] = disp2
+        inst(map=map)
+        self.assertEqual(
+            inst.selector.calls,
+            [
+                ("register", 0, selectors.EVENT_READ),
+                ("unregister", 0),
+                ("register", 0, selectors.EVENT_READ),
+            ],
+        )
+        self.assertEqual(inst.registered[0], (disp2, selectors.EVENT_READ))
+
+    def test_dispatches_events(self):
+        import selectors
+
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        disp.writable = lambda: True
+        inst = self._makeOne()
+        inst.selector.ready = [(0, selectors.EVENT_READ | selectors.EVENT_WRITE)]
+        inst(map={0: disp})
+        self.assertTrue(disp.read_event_handled)
+        self.assertTrue(disp.write_event_handled)
+
+    def test_register_raises_disconnected(self):
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        inst = self._makeOne()
+        inst.selector.exc = OSError(errno.EBADF, "bad fd")
+        inst(map={0: disp})
+        self.assertTrue(disp.close_handled)
+        self.assertEqual(inst.registered, {})
+
+    def test_register_raises_other(self):
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        inst = self._makeOne()
+        inst.selector.exc = OSError(errno.ENOMEM, "no memory")
+        inst(map={0: disp})
+        self.assertTrue(disp.error_handled)
+        self.assertEqual(inst.registered, {})
+
+    def test_close(self):
+        disp = DummyDispatcher()
+        disp.readable = lambda: True
+        inst = self._makeOne()
+        inst(map={0: disp})
+        inst.close()
+        self.assertEqual(inst.registered, {})
+        self.assertTrue(inst.selector.closed)
+
+    def test_tracked_dispatcher_only_reevaluated_when_dirty(self):
+        import selectors
+
+        disp = DummyDispatcher()
+        disp.tracks_readiness = True
+        disp.readable = lambda: True
+        map = {0: disp}
+        inst = self._makeOne()
+        inst(map=map)
+        disp.writable = lambda: True
+        inst(map=map)
+        self.assertEqual(inst.selector.calls, [("register", 0, selectors.EVENT_READ)])
+        inst.mark_dirty(0)
+        inst(map=map)
+        self.assertEqual(
+            inst.selector.calls[-1],
+            ("modify", 0, selectors.EVENT_READ | selectors.EVENT_WRITE),
+        )
+        self.assertEqual(inst.untracked, set())
+
+    def test_untracked_dispatcher_reevaluated_every_time(self):
+        disp = DummyDispatcher()
+        calls = []
+        disp.readable = lambda: calls.append(True)
+        map = {0: disp}
+        inst = self._makeOne()
+        inst(map=map)
+        inst(map=map)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(inst.untracked, {0})
+
+    def test_handled_event_marks_dirty(self):
+        import selectors
+
+        disp = DummyDispatcher()
+        disp.tracks_readiness = True
+        disp.readable = lambda: True
+        inst = self._makeOne()
+        inst.selector.ready = [(0, selectors.EVENT_READ)]
+        inst(map={0: disp})
+        self.assertTrue(disp.read_event_handled)
+        self.assertEqual(inst.dirty, {0})
+
+    def test_dispatcher_mark_dirty(self):
+        from waitress.wasyncore import dispatcher
+
+        map = {}
+        inst = self._makeOne()
+        inst(map=map)
+        disp = dispatcher(sock=dummysocket(), map=map)
+        fd = disp._fileno
+        self.assertEqual(inst.dirty, {fd})
+        inst.dirty.clear()
+        disp.mark_dirty()
+        self.assertEqual(inst.dirty, {fd})
+        inst.dirty.clear()
+        disp.del_channel()
+        self.assertEqual(inst.dirty, {fd})
+
+    def test_close_detaches(self):
+        from waitress import wasyncore
+
+        map = {}
+        inst = self._makeOne()
+        inst(map=map)
+        self.assertIs(wasyncore._selector_polls[id(map)], inst)
+        inst.close()
+        self.assertNotIn(id(map), wasyncore._selector_polls)
+
+    def test_default_selector(self):
+        import selectors
+
+        from waitress.wasyncore import selector_poll
+
+        inst = selector_poll()
+        try:
+            self.assertIsInstance(inst.selector, selectors.BaseSelector)
+        finally:
+            inst.close()
+
+
 class Test_dispatcher(unittest.TestCase):
     def _makeOne(self, sock=None, map=None):
         from waitress.wasyncore import dispatcher
@@ -1497,6 +1758,139 @@ class Test_dispatcher(unittest.TestCase):
         inst = self._makeOne(sock=sock, map=map)
         self.assertRaises(socket.error, inst.send, "a")
 
+    def test_sendmsg(self):
+        sock = dummysocket()
+        sock.sendmsg = lambda buffers: sum(len(b) for b in buffers)
+        inst = self._makeOne(sock=sock, map={})
+        self.assertEqual(inst.sendmsg([b"ab", b"c"]), 3)
+
+    def test_sendmsg_raise_EWOULDBLOCK(self):
+        sock = dummysocket()
+
+        def sendmsg(*arg, **kw):
+            raise OSError(errno.EWOULDBLOCK)
+
+        sock.sendmsg = sendmsg
+        inst = self._makeOne(sock=sock, map={})
+        self.assertEqual(inst.sendmsg([b"a"]), 0)
+
+    def test_sendmsg_raises_disconnect(self):
+        sock = dummysocket()
+
+        def sendmsg(*arg, **kw):
+            raise OSError(errno.ECONNRESET)
+
+        sock.sendmsg = sendmsg
+        inst = self._makeOne(sock=sock, map={})
+        inst.handle_close = lambda: setattr(inst, "closed", True)
+        self.assertEqual(inst.sendmsg([b"a"]), 0)
+        self.assertTrue(inst.closed)
+
+    def test_sendmsg_raise_unexpected_socketerror(self):
+        sock = dummysocket()
+
+        def sendmsg(*arg, **kw):
+            raise OSError(122)
+
+        sock.sendmsg = sendmsg
+        inst = self._makeOne(sock=sock, map={})
+        self.assertRaises(socket.error, inst.sendmsg, [b"a"])
+
+    @unittest.skipUnless(hasattr(os, "sendfile"), "os.sendfile required")
+    def test_sendfile(self):
+        import tempfile
+
+        a, b = socket.socketpair()
+        self.addCleanup(b.close)
+        inst = self._makeOne(sock=a, map={})
+        self.addCleanup(inst.close)
+        with tempfile.TemporaryFile() as f:
+            f.write(b"abcdef")
+            f.flush()
+            result = inst.sendfile(f.fileno(), 2, 3)
+        self.assertEqual(result, 3)
+        self.assertEqual(b.recv(10), b"cde")
+
+    @unittest.skipUnless(hasattr(os, "sendfile"), "os.sendfile required")
+    def test_sendfile_raises_disconnect(self):
+        import tempfile
+
+        a, b = socket.socketpair()
+        b.close()
+        inst = self._makeOne(sock=a, map={})
+        self.addCleanup(inst.close)
+        inst.handle_close = lambda: setattr(inst, "closed", True)
+        with tempfile.TemporaryFile() as f:
+            f.write(b"abcdef")
+            f.flush()
+            result = inst.sendfile(f.fileno(), 0, 6)
+        self.assertEqual(result, 0)
+        self.assertTrue(inst.closed)
+
+    def test_recv_into(self):
+        a, b = socket.socketpair()
+        self.addCleanup(b.close)
+        inst = self._makeOne(sock=a, map={})
+        self.addCleanup(inst.close)
+        b.send(b"abc")
+        buf = bytearray(10)
+        self.assertEqual(inst.recv_into(buf), 3)
+        self.assertEqual(buf[:3], b"abc")
+
+    def test_recv_into_closed(self):
+        a, b = socket.socketpair()
+        b.close()
+        inst = self._makeOne(sock=a, map={})
+        self.addCleanup(inst.close)
+        inst.handle_close = lambda: setattr(inst, "close_handled", True)
+        self.assertEqual(inst.recv_into(bytearray(10)), 0)
+        self.assertTrue(inst.close_handled)
+
+    def test_recv_into_raises_disconnect(self):
+        sock = dummysocket()
+
+        def recv_into(*arg, **kw):
+            raise OSError(errno.ECONNRESET)
+
+        sock.recv_into = recv_into
+        inst = self._makeOne(sock=sock, map={})
+        inst.handle_close = lambda: setattr(inst, "close_handled", True)
+        self.assertEqual(inst.recv_into(bytearray(1)), 0)
+        self.assertTrue(inst.close_handled)
+
+    def test_recv_into_raise_unexpected_socketerror(self):
+        sock = dummysocket()
+
+        def recv_into(*arg, **kw):
+            raise OSError(122)
+
+        sock.recv_into = recv_into
+        inst = self._makeOne(sock=sock, map={})
+        self.assertRaises(socket.error, inst.recv_into, bytearray(1))
+
+    def test_recv_into_raise_EWOULDBLOCK(self):
+        sock = dummysocket()
+
+        def recv_into(*arg, **kw):
+            raise OSError(errno.EWOULDBLOCK)
+
+        sock.recv_into = recv_into
+        inst = self._makeOne(sock=sock, map={})
+        # unlike a send, 0 would mean that the connection was closed
+        self.assertRaises(socket.error, inst.recv_into, bytearray(1))
+
+    def test_sendmsg_raises_disconnect_no_close(self):
+        sock = dummysocket()
+
+        def sendmsg(*arg, **kw):
+            raise OSError(errno.ECONNRESET)
+
+        sock.sendmsg = sendmsg
+        inst = self._makeOne(sock=sock, map={})
+        inst.handle_close = lambda: setattr(inst, "close_handled", True)
+        self.assertEqual(inst.sendmsg([b"a"], do_close=False), 0)
+        self.assertFalse(hasattr(inst, "close_handled"))
+
     def test_recv_raises_disconnect(self):
         sock = dummysocket()
         map = {}
@@ -1731,3 +2125,41 @@ class DummyPollster:
             raise self.exc
         else:  # pragma: no cover
             return []
+
+
+class DummySelector:
+    closed = False
+    exc = None
+
+    def __init__(self):
+        self.registered = {}
+        self.calls = []
+        self.selected = []
+        self.ready = []
+
+    def register(self, fd, mask, data):
+        if self.exc is not None:
+            raise self.exc
+        self.calls.append(("register", fd, mask))
+        self.registered[fd] = (mask, data)
+
+    def modify(self, fd, mask, data):
+        self.calls.append(("modify", fd, mask))
+        self.registered[fd] = (mask, data)
+
+    def unregister(self, fd):
+        self.calls.append(("unregister", fd))
+        del self.registered[fd]
+
+    def select(self, timeout):
+        import selectors
+
+        self.selected.append(timeout)
+        result = []
+        for fd, events in self.ready:
+            mask, data = self.registered[fd]
+            result.append((selectors.SelectorKey(fd, fd, mask, data), events))
+        return result
+
+    def close(self):
+        self.closed = True